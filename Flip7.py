@@ -1,37 +1,248 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
+import argparse
+import importlib
+import json
+import os
 import random
+import sys
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # ---------------------------
-# Deck mapping
+# Rules
 # ---------------------------
-deck_of_cards = {
-    1: 0,
-    2: 1,
-    3: 2, 4: 2,
-    5: 3, 6: 3, 7: 3,
-    8: 4, 9: 4, 10: 4, 11: 4,
-    12: 5, 13: 5, 14: 5, 15: 5, 16: 5,
-    17: 6, 18: 6, 19: 6, 20: 6, 21: 6, 22: 6,
-    23: 7, 24: 7, 25: 7, 26: 7, 27: 7, 28: 7, 29: 7,
-    30: 8, 31: 8, 32: 8, 33: 8, 34: 8, 35: 8, 36: 8, 37: 8,
-    38: 9, 39: 9, 40: 9, 41: 9, 42: 9, 43: 9, 44: 9, 45: 9, 46: 9,
-    47: 10, 48: 10, 49: 10, 50: 10, 51: 10, 52: 10, 53: 10, 54: 10, 55: 10, 56: 10,
-    57: 11, 58: 11, 59: 11, 60: 11, 61: 11, 62: 11, 63: 11, 64: 11, 65: 11, 66: 11, 67: 11,
-    68: 12, 69: 12, 70: 12, 71: 12, 72: 12, 73: 12, 74: 12, 75: 12, 76: 12, 77: 12, 78: 12, 79: 12,
-    80: "+2", 81: "+4", 82: "+6", 83: "+8", 84: "+10", 85: "x2",
-    86: "Freeze", 87: "Freeze", 88: "Freeze",
-    89: "Flip Three", 90: "Flip Three", 91: "Flip Three",
-    92: "Second Chance", 93: "Second Chance", 94: "Second Chance"
+# number cards are packed into a 13-bit mask (bit n set = holding n), so the
+# sum and count of the distinct numbers in a hand are single table lookups
+MASK_SUM = [0]
+MASK_COUNT = [0]
+for _n in range(13):
+    # masks with bit _n set are the existing ones shifted up by 1 << _n
+    MASK_SUM += [total + _n for total in MASK_SUM]
+    MASK_COUNT += [count + 1 for count in MASK_COUNT]
+del _n
+
+# what a card does to a hand
+NUMBER, ADD, DOUBLE, SECOND_CHANCE, ACTION = range(5)
+ACTION_CARDS = ("Freeze", "Flip Three", "Second Chance")
+
+# the published game; a rules file (--rules PATH, or FLIP7_RULES in the
+# environment) overrides any of these keys
+STANDARD_RULES = {
+    "target_score": 200,
+    "seven_unique_bonus": 15,
+    "min_players": 3,
+    "max_players": 200,
+    # one deck covers this many players; bigger tables shuffle more decks together
+    "players_per_deck": 18,
+    # copies per number card: a single 0, then n copies of n
+    "numbers": {n: max(n, 1) for n in range(13)},
+    "modifiers": {"+2": 1, "+4": 1, "+6": 1, "+8": 1, "+10": 1, "x2": 1},
+    "actions": {"Freeze": 3, "Flip Three": 3, "Second Chance": 3},
 }
-discard_pile = [0]
+RULES_ENV = "FLIP7_RULES"
+
+
+def card_effect(card):
+    """ (kind, amount) of a card value: a number and its value, or a modifier and its bonus """
+    if isinstance(card, int):
+        return NUMBER, card
+    if card == "x2":
+        return DOUBLE, 0
+    if card == "Second Chance":
+        return SECOND_CHANCE, 0
+    if isinstance(card, str) and card.startswith('+'):
+        try:
+            return ADD, int(card[1:])
+        except ValueError:
+            pass
+    return ACTION, 0
+
+
+class Rules:
+    """
+    One rule variant, checked and compiled into flat tables:
+
+        cards       the deck, card id -> card value
+        effects     card value -> (kind, amount)
+        mask_bonus  the 7-unique bonus by number mask (0 below seven numbers)
+
+    Build it once; use_rules() makes it the rules of the whole process.
+    """
+
+    def __init__(self, config=None):
+        unknown = set(config or ()) - set(STANDARD_RULES)
+        if unknown:
+            raise ValueError(f"unknown rules: {', '.join(sorted(unknown))}")
+        settings = dict(STANDARD_RULES, **(config or {}))
+        self.target_score = int(settings["target_score"])
+        self.seven_unique_bonus = int(settings["seven_unique_bonus"])
+        self.min_players = int(settings["min_players"])
+        self.max_players = int(settings["max_players"])
+        self.players_per_deck = int(settings["players_per_deck"])
+        if not 1 <= self.min_players <= self.max_players:
+            raise ValueError("player limits must satisfy 1 <= min_players <= max_players")
+        if self.players_per_deck < 1:
+            raise ValueError("players_per_deck must be at least 1")
+
+        # JSON object keys are strings
+        numbers = {int(n): int(count) for n, count in settings["numbers"].items()}
+        modifiers = {card: int(count) for card, count in settings["modifiers"].items()}
+        actions = {card: int(count) for card, count in settings["actions"].items()}
+        if any(not 0 <= n <= 12 for n in numbers):
+            raise ValueError("number cards must be between 0 and 12")
+        if any(card_effect(card)[0] not in (ADD, DOUBLE) for card in modifiers):
+            raise ValueError("modifiers must be '+N' or 'x2'")
+        if any(card not in ACTION_CARDS for card in actions):
+            raise ValueError(f"action cards must be among {', '.join(ACTION_CARDS)}")
+        counts = {**numbers, **modifiers, **actions}
+        if any(count < 0 for count in counts.values()) or sum(numbers.values()) < 2:
+            raise ValueError("card counts must not be negative, with at least two number cards")
+
+        self.counts = {card: count for card, count in counts.items() if count}
+        self.cards = tuple(card for card, count in self.counts.items() for _ in range(count))
+        self.effects = {card: card_effect(card) for card in self.counts}
+        self.additive = {card: amount for card, (kind, amount) in self.effects.items()
+                         if kind == ADD}
+        self.mask_bonus = [self.seven_unique_bonus if count == 7 else 0 for count in MASK_COUNT]
+        self.config = dict(settings, numbers={str(n): c for n, c in sorted(numbers.items())},
+                           modifiers=modifiers, actions=actions)
+        # tells apart files written under different rules (policy tables, saves)
+        self.fingerprint = zlib.crc32(json.dumps(self.config, sort_keys=True).encode())
+
+
+def read_rules(path):
+    """ the config in a JSON rules file """
+    with open(path) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path} does not hold a JSON object")
+    return config
+
+
+def use_rules(rules):
+    """
+    Makes `rules` the rules of this process. The tables are plain module
+    globals, so the game reads them exactly as it reads the standard ones;
+    modules that import them by name keep what they saw, so this runs
+    before the tools are imported.
+    """
+    global RULES, deck_of_cards, CARD_EFFECT, ADDITIVE_MODIFIERS, MASK_BONUS, TARGET_SCORE
+    global SEVEN_UNIQUE_BONUS, MIN_PLAYERS, MAX_PLAYERS, PLAYERS_PER_DECK
+    RULES = rules
+    deck_of_cards = rules.cards
+    CARD_EFFECT = rules.effects
+    ADDITIVE_MODIFIERS = rules.additive
+    MASK_BONUS = rules.mask_bonus
+    TARGET_SCORE = rules.target_score
+    SEVEN_UNIQUE_BONUS = rules.seven_unique_bonus
+    MIN_PLAYERS = rules.min_players
+    MAX_PLAYERS = rules.max_players
+    PLAYERS_PER_DECK = rules.players_per_deck
+
+
+def load_rules(path):
+    """ reads, compiles and applies a rules file; worker processes pick it up from the environment """
+    use_rules(Rules(read_rules(path)))
+    os.environ[RULES_ENV] = os.path.abspath(path)
+
+
+use_rules(Rules(read_rules(os.environ[RULES_ENV]) if os.environ.get(RULES_ENV) else None))
+STANDARD_FINGERPRINT = Rules().fingerprint
+
+# default saves, policy tables and statistics go here, not the working directory
+DATA_DIR = os.environ.get("FLIP7_HOME") or os.path.join(os.path.expanduser("~"), ".flip7")
+
+
+def data_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+def make_data_dir(path):
+    """ creates DATA_DIR when PATH lies in it; if that fails, writing PATH reports it """
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(DATA_DIR):
+        try:
+            os.makedirs(DATA_DIR, exist_ok=True)
+        except OSError:
+            pass
+
+
+# ---------------------------
+# Deck mapping
+# ---------------------------
+def decks_for(num_players):
+    return 1 + (max(num_players, 1) - 1) // PLAYERS_PER_DECK
+
+
+def shoe(decks):
+    """ card values of `decks` decks shuffled together; card ids stay unique """
+    return _shoe(RULES, decks)
+
+
+@lru_cache(maxsize=None)
+def _shoe(rules, decks):
+    return rules.cards * decks
+
+
+class Deck:
+    """Shuffled draw pile of card ids, indexes into a tuple of card values.
+
+    Cards are shuffled once and popped off the end, so every draw is O(1).
+    Drawn keys stay "in play" until discard_in_play() is called at the end
+    of a round; when the draw pile runs out the discard pile is shuffled
+    back in, in key order so the new pile depends only on the rng and the
+    cards, not on how the discard set was built up. `effects` holds each card's (kind, amount) by id, so dealing
+    a card into a hand is two index lookups.
+    """
+
+    def __init__(self, cards=None, seed=None, rng=None):
+        self.cards = deck_of_cards if cards is None else tuple(cards)
+        self.effects = tuple(map(CARD_EFFECT.__getitem__, self.cards))
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.draw_pile = list(range(len(self.cards)))
+        self.rng.shuffle(self.draw_pile)
+        self.in_play = set()
+        self.discard_pile = set()
+
+    def __len__(self):
+        return len(self.draw_pile)
+
+    def draw(self):
+        """Pop the next card key, reshuffling the discards if needed."""
+        if not self.draw_pile:
+            self.reshuffle()
+        key = self.draw_pile.pop()
+        self.in_play.add(key)
+        return key
+
+    def draw_value(self):
+        """Draw a card and return its face value from the card mapping."""
+        return self.cards[self.draw()]
+
+    def reshuffle(self):
+        """Move the discard pile back under the draw pile and shuffle it."""
+        if not self.discard_pile:
+            raise IndexError("no cards left to draw")
+        self.draw_pile.extend(sorted(self.discard_pile))
+        self.discard_pile.clear()
+        self.rng.shuffle(self.draw_pile)
+
+    def exhausted(self):
+        """ every card is in play: nothing left to draw or reshuffle """
+        return not self.draw_pile and not self.discard_pile
+
+    def discard_in_play(self):
+        """Send every card dealt this round to the discard pile."""
+        self.discard_pile |= self.in_play
+        self.in_play.clear()
 
 # ---------------------------
 # User manual text
 # ---------------------------
 instructions_list = [
     "Flip 7 - Instructions (How to Play)\n",
-    "1. Setup: Decide the number of players (minimum 3, max 18). Each player starts with an empty hand.\n",
+    "1. Setup: Decide the number of players (minimum {min_players}, max {max_players}; every {players_per_deck} players add another deck). Each player starts with an empty hand.\n",
     "2. Take Turns: On your turn, choose to either Hit (draw a card) or Stay (end your turn and bank points).\n",
     "3. Play Cards:\n",
     "   - Number cards add points to your hand.\n",
@@ -46,53 +257,215 @@ instructions_list = [
     "           - If you draw a Second Chance card, save it and finish drawing however many cards remain in your Flip Three.\n",
     "           - If, while drawing for Flip 3, you draw enough cards to make a Flip 7, gameplay stops because you just won the round. Don't finish the Flip 3 action.\n",
     "4. Avoid Busts: Do not draw a duplicate Number card, or your round ends with 0 points.\n",
-    "5. 7 Unique Bonus: If you collect 7 different Number cards in one round, get +15 points and your round ends.\n",
+    "5. 7 Unique Bonus: If you collect 7 different Number cards in one round, get +{seven_unique_bonus} points and your round ends.\n",
     "6. Round End: The round ends when all players stayed, busted, or someone hits the 7 Unique Bonus.\n",
-    "7. Winning: Continue rounds until a player reaches 200+ points. Highest score wins if multiple players pass 200 in the same round.\n\n"
+    "7. Winning: Continue rounds until a player reaches {target_score}+ points. Highest score wins if multiple players pass {target_score} in the same round.\n\n"
 ]
 
 rules_list = [
     "Flip 7 - Rules\n"
-    "1. Objective: Be the first to reach 200 or more points.\n"
+    "1. Objective: Be the first to reach {target_score} or more points.\n"
     "2. Number Cards (0-12): Add to your total score. Drawing a duplicate busts your round.\n"
     "3. Modifier Cards (+2, +4, x2, etc.): Alter your score for that round.\n"
     "4. Action Cards (Freeze!, Flip Three!, Second Chance): Trigger special effects. Check instructions to understand how they work.\n"
     "5. Bust: Drawing a duplicate Number card ends your turn and scores 0 points unless Second Chance is used.\n"
-    "6. 7 Unique Bonus: Collecting 7 different Number cards in a round gives +15 points and ends the round immediately."
+    "6. 7 Unique Bonus: Collecting 7 different Number cards in a round gives +{seven_unique_bonus} points and ends the round immediately."
 ]
 
-with open("instructions.txt", "w") as ins:
-    ins.writelines(instructions_list)
-    ins.writelines(rules_list)
+
+def get_manual():
+    """ the user manual text for the rules in use, built once on first use """
+    return _manual(RULES)
+
+
+@lru_cache(maxsize=None)
+def _manual(rules):
+    return ("".join(instructions_list) + "".join(rules_list)).format(**vars(rules))
+
+
+def export_manual(args):
+    """ writes the user manual to a text file """
+    with open(args.path, "w") as ins:
+        ins.write(get_manual())
+    print(f"Wrote the user manual to {args.path}")
+
+
+# ---------------------------
+# Lazy Tkinter import
+# ---------------------------
+tk = None
+messagebox = None
+
+
+def load_tk():
+    """ imports Tkinter on first use, so headless users never pay for it """
+    global tk, messagebox
+    if tk is None:
+        import tkinter
+        from tkinter import messagebox as tk_messagebox
+        tk, messagebox = tkinter, tk_messagebox
+    return tk
 
 
 # ---------------------------
 # Game logic helpers
 # ---------------------------
-def calculate_round_score(hand):
-    """Calculate numeric score of a hand (numbers + additive modifiers + x2 multiplier)."""
-    number_cards = [card for card in hand if isinstance(card, int)]
-    modifier_cards = [card for card in hand if isinstance(card, str) and (card.startswith('+') or card == 'x2')]
+def effect_of(card):
+    """ CARD_EFFECT[card], also for values no deck in these rules holds (old logs) """
+    effect = CARD_EFFECT.get(card)
+    return effect if effect is not None else card_effect(card)
 
-    number_value = sum(number_cards)
-    multiplier = 1
 
-    for mod in modifier_cards:
-        if mod.startswith('+'):
-            try:
-                number_value += int(mod[1:])
-            except ValueError:
-                pass
-        elif mod == 'x2':
-            multiplier *= 2
+def pack_hand(hand):
+    """
+    Returns (mask, dup_sum, dup_count, modifier_sum, x2_count) for a hand.
+    dup_sum / dup_count cover number cards already present in the mask.
+    """
+    mask = dup_sum = dup_count = modifier_sum = x2_count = 0
+    for card in hand:
+        kind, amount = effect_of(card)
+        if kind == NUMBER:
+            bit = 1 << amount
+            if mask & bit:
+                dup_sum += amount
+                dup_count += 1
+            else:
+                mask |= bit
+        elif kind == ADD:
+            modifier_sum += amount
+        elif kind == DOUBLE:
+            x2_count += 1
+    return mask, dup_sum, dup_count, modifier_sum, x2_count
+
+
+def score_packed(mask, dup_sum, modifier_sum, x2_count):
+    """Round score of a packed hand; batch_scoring.score_hands is the vectorized twin."""
+    # MASK_BONUS holds the 7 unique bonus
+    return ((MASK_SUM[mask] + dup_sum + modifier_sum) << x2_count) + MASK_BONUS[mask]
+
+
+class Hand:
+    """
+    A player's cards for one round, with the packed counters kept up to
+    date on every append so scoring and duplicate checks are O(1).
+    Behaves like the plain list it replaces (iteration, len, indexing, in).
+    """
+    __slots__ = ("cards", "mask", "number_sum", "dup_sum", "dup_count",
+                 "modifier_sum", "x2_count", "second_chances", "last_number")
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.mask = self.number_sum = self.dup_sum = self.dup_count = 0
+        self.modifier_sum = self.x2_count = self.second_chances = 0
+        self.last_number = None
+        for card in cards:
+            self.add(card, *effect_of(card))
+
+    def append(self, card):
+        self.add(card, *effect_of(card))
+
+    def add(self, card, kind, amount):
+        """ append() for a card whose (kind, amount) is already known, e.g. from Deck.effects """
+        self.cards.append(card)
+        if kind == NUMBER:
+            bit = 1 << amount
+            if self.mask & bit:
+                self.dup_sum += amount
+                self.dup_count += 1
+            else:
+                self.mask |= bit
+                self.number_sum += amount
+            self.last_number = amount
+        elif kind == ADD:
+            self.modifier_sum += amount
+        elif kind == DOUBLE:
+            self.x2_count += 1
+        elif kind == SECOND_CHANCE:
+            self.second_chances += 1
+
+    def _rebuild(self):
+        cards = self.cards
+        self.__init__(cards)
+
+    def remove(self, card):
+        self.cards.remove(card)
+        if card == "Second Chance":
+            self.second_chances -= 1
+        else:
+            self._rebuild()
+
+    def pop(self, index=-1):
+        card = self.cards.pop(index)
+        if card == "Second Chance":
+            self.second_chances -= 1
+        else:
+            self._rebuild()
+        return card
 
-    final = number_value * multiplier
+    def score(self):
+        """ same result as calculate_round_score on the card list """
+        return (((self.number_sum + self.dup_sum + self.modifier_sum) << self.x2_count)
+                + MASK_BONUS[self.mask])
 
-    # 7 unique bonus
-    if len(set(number_cards)) == 7:
-        final += 15
+    def check_round_end(self):
+        """ check_round_end for a hand whose last card was just appended """
+        if self.dup_count:
+            if self.second_chances:
+                # use Second Chance: drop one Second Chance + the duplicate just drawn
+                number = self.last_number
+                cards = self.cards
+                cards.remove("Second Chance")
+                for i in range(len(cards) - 1, -1, -1):
+                    if cards[i] == number:
+                        cards.pop(i)
+                        break
+                self.second_chances -= 1
+                self.dup_count -= 1
+                self.dup_sum -= number
+                return (False, False, self.score())
+            return (True, False, 0)
 
-    return final
+        if MASK_COUNT[self.mask] == 7:
+            return (False, True, self.score())
+
+        return (False, False, self.score())
+
+    def pack(self):
+        """ (mask, dup_sum, dup_count, modifier_sum, x2_count), as pack_hand """
+        return self.mask, self.dup_sum, self.dup_count, self.modifier_sum, self.x2_count
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __reversed__(self):
+        return reversed(self.cards)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __contains__(self, card):
+        return card in self.cards
+
+    def __eq__(self, other):
+        if isinstance(other, Hand):
+            return self.cards == other.cards
+        return self.cards == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.cards)
+
+
+def calculate_round_score(hand):
+    """Calculate numeric score of a hand (numbers + additive modifiers + x2 multiplier)."""
+    if type(hand) is Hand:
+        return hand.score()
+    mask, dup_sum, _, modifier_sum, x2_count = pack_hand(hand)
+    return score_packed(mask, dup_sum, modifier_sum, x2_count)
 
 
 def check_round_end(player_id, current_hand):
@@ -100,6 +473,9 @@ def check_round_end(player_id, current_hand):
     Returns (is_busted, is_7_unique, current_score).
     Handles Second Chance logic.
     """
+    if type(current_hand) is Hand:
+        return current_hand.check_round_end()
+
     number_cards = [card for card in current_hand if isinstance(card, int)]
 
     # duplicate → possible bust
@@ -133,33 +509,736 @@ def check_round_end(player_id, current_hand):
 
 
 # ---------------------------
-# Tkinter GUI and state
+# Headless game engine
 # ---------------------------
-class Flip7GUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Flip 7")
-        self.root.geometry("980x620")
-        self.root.configure(bg="#00BFFF")
+GameEvent = namedtuple("GameEvent", "kind player value target score")
+GameEvent.__new__.__defaults__ = (None, None, None, None)
 
-        """ game state """
-        self.num_players = 0
-        self.player_scores = {}
-        self.cards_in_hand = {}
+# read-only view of a table handed to bots; hands are tuples of card values
+GameSnapshot = namedtuple(
+    "GameSnapshot",
+    "num_players player scores hands finished busted stayed frozen round_number pending_action "
+    "unseen"
+)
+
+
+class TurnRing:
+    """
+    Seats still playing this round, as a circular linked list.
+
+    Finishing a seat unlinks it in O(1) but leaves its own next pointer
+    alone, so a seat that just finished still leads to whoever plays
+    after it; runs of finished seats are shortened as they are walked.
+    """
+
+    __slots__ = ("nxt", "prv", "playing", "size")
+
+    def __init__(self, num_players, finished=()):
+        self.reset(num_players, finished)
+
+    def reset(self, num_players, finished=()):
+        self.playing = [p not in finished for p in range(num_players)]
+        # finished seats just point at the seat after them
+        self.nxt = list(range(1, num_players)) + [0]
+        self.prv = [num_players - 1] + list(range(num_players - 1))
+        seats = [p for p in range(num_players) if self.playing[p]]
+        self.size = len(seats)
+        for p, q in zip(seats, seats[1:] + seats[:1]):
+            self.nxt[p] = q
+            self.prv[q] = p
+
+    def finish(self, p):
+        if not self.playing[p]:
+            return
+        self.playing[p] = False
+        self.size -= 1
+        after, before = self.nxt[p], self.prv[p]
+        self.nxt[before] = after
+        self.prv[after] = before
+
+    def after(self, p):
+        """ next seat still playing after p (p itself if nobody else is), or None """
+        if not self.size:
+            return None
+        nxt, playing = self.nxt, self.playing
+        seat = nxt[p]
+        if not playing[seat]:
+            skipped = []
+            while not playing[seat]:
+                skipped.append(seat)
+                seat = nxt[seat]
+            for q in skipped:
+                nxt[q] = seat
+        return seat
+
+
+class Flip7Game:
+    """
+    Pure-Python rules state for one table, with no Tkinter dependency.
+
+    hit(), stay() and resolve_action() return the GameEvents they
+    produced; the same events are passed to every subscribed callback
+    as they happen, which is how the GUI keeps its widgets in sync.
+    """
+
+    def __init__(self, num_players, seed=None, deck=None):
+        self.num_players = num_players
+        if deck is None:
+            deck = Deck(shoe(decks_for(num_players)), seed=seed)
+        self.deck = deck
+        self.player_scores = {i: 0 for i in range(num_players)}
+        self.cards_in_hand = {i: Hand() for i in range(num_players)}
         self.active_players = set()
         self.stayed_players = set()
         self.busted_players = set()
         self.finished_players = set()
         self.skip_turn = set()
+        self.turns = TurnRing(num_players, self.finished_players)
         self.current_player = 0
         self.round_number = 1
         self.round_active = False
-        self.temp_targets = []
+        self.pending_action = None
+        self.flip_target = None
+        self.flips_left = 0
         self.last_drawn = None
+        self.winner = None
+        # stable across save and resume, so the stats database sees one game; None when unused
+        self.uid = None
+        self.listeners = []
+        self._events = []
+
+    # ---------------------------
+    # Events
+    # ---------------------------
+    def subscribe(self, callback):
+        """ callback(event) runs for every event the game emits """
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self.listeners.remove(callback)
+
+    def _emit(self, kind, player=None, value=None, target=None, score=None):
+        event = GameEvent(kind, player, value, target, score)
+        self._events.append(event)
+        for callback in self.listeners:
+            callback(event)
+
+    def _flush(self):
+        events, self._events = self._events, []
+        return events
+
+    # ---------------------------
+    # Round flow
+    # ---------------------------
+    def start_round(self):
+        """ starts new round """
+        if self.winner is not None:
+            raise ValueError("the game is already over")
+        self.round_active = True
+        self.deck.discard_in_play()
+        self.cards_in_hand = {i: Hand() for i in range(self.num_players)}
+        self.active_players = set(range(self.num_players))
+        self.stayed_players = set()
+        self.busted_players = set()
+        self.finished_players = set()
+        self.skip_turn = set()
+        self.turns.reset(self.num_players, self.finished_players)
+        self.pending_action = None
+        self.flip_target = None
+        self.flips_left = 0
+        self.current_player = 0
+        self._emit("round_start", value=self.round_number)
+        return self._flush()
+
+    def resync(self):
+        """ rebuilds the turn order after finished_players was set from outside (a load, a mirror) """
+        self.turns.reset(self.num_players, self.finished_players)
+
+    def next_turn(self):
+        """Move to next non-finished player, or end round."""
+        seat = self.turns.after(self.current_player)
+        if seat is None:
+            # all players finished
+            self.end_round_and_bank()
+            return
+
+        self.current_player = seat
+        self._emit("turn", seat)
+
+    def end_round_and_bank(self):
+        """Bank all round scores, busted players get 0."""
+        for p in range(self.num_players):
+            if p in self.busted_players:
+                round_score = 0
+            else:
+                round_score = calculate_round_score(self.cards_in_hand.get(p, []))
+            self.player_scores[p] += round_score
+            self._emit("bank", p, value=round_score, score=self.player_scores[p])
+
+        self.round_active = False
+        self._emit("round_end", value=self.round_number)
+
+        winner = self.checking_winner()
+        if winner is not None:
+            self.winner = winner
+            self._emit("winner", winner, score=self.player_scores[winner])
+
+        self.round_number += 1
+
+    def checking_winner(self):
+        """ checks for winner """
+        if not self.player_scores:
+            return None
+        max_score = max(self.player_scores.values())
+        if max_score < TARGET_SCORE:
+            return None
+        for player, score in self.player_scores.items():
+            if score == max_score:
+                return player
+
+    def snapshot(self):
+        """ immutable copy of what the player to act can see """
+        deck = self.deck
+        keys = deck.draw_pile or deck.discard_pile
+        return GameSnapshot(
+            self.num_players,
+            self.pending_action[1] if self.pending_action else self.current_player,
+            tuple(self.player_scores.values()),
+            tuple(tuple(hand.cards) for hand in self.cards_in_hand.values()),
+            frozenset(self.finished_players),
+            frozenset(self.busted_players),
+            frozenset(self.stayed_players),
+            frozenset(self.skip_turn),
+            self.round_number,
+            self.pending_action[0] if self.pending_action else None,
+            tuple(map(deck.cards.__getitem__, keys)),
+        )
+
+    def apply_event(self, event):
+        """
+        Replays one recorded event onto this game's state without touching
+        the deck, so a log of events rebuilds scores, hands and turn state.
+        """
+        kind, p = event.kind, event.player
+        if kind == "flip":
+            self.flips_left -= 1
+        if kind == "draw" or kind == "flip":
+            self.last_drawn = event.value
+            hand = self.cards_in_hand[p]
+            hand.append(event.value)
+            check_round_end(p, hand)
+        elif kind == "bust":
+            self.busted_players.add(p)
+            self._finish(p)
+        elif kind == "seven_unique":
+            self._finish(p)
+        elif kind == "stay":
+            self.stayed_players.add(p)
+            self._finish(p)
+        elif kind == "frozen":
+            self.skip_turn.discard(p)
+        elif kind == "action":
+            self.pending_action = (event.value, p)
+        elif kind == "freeze":
+            self.pending_action = None
+            self.skip_turn.add(event.target)
+        elif kind == "flip_three":
+            self.pending_action = None
+            self.flip_target = event.target
+            self.flips_left = 3
+        elif kind == "turn":
+            self.current_player = p
+            self.flip_target = None
+            self.flips_left = 0
+        elif kind == "bank":
+            self.player_scores[p] = event.score
+        elif kind == "round_start":
+            self.round_number = event.value
+            self.round_active = True
+            self.cards_in_hand = {i: Hand() for i in range(self.num_players)}
+            self.active_players = set(range(self.num_players))
+            self.stayed_players = set()
+            self.busted_players = set()
+            self.finished_players = set()
+            self.skip_turn = set()
+            self.turns.reset(self.num_players, self.finished_players)
+            self.pending_action = None
+            self.current_player = 0
+        elif kind == "round_end":
+            self.round_active = False
+            self.flip_target = None
+            self.flips_left = 0
+            self.round_number = event.value + 1
+        elif kind == "winner":
+            self.winner = p
+
+    # ---------------------------
+    # Player actions
+    # ---------------------------
+    def controls(self, seat):
+        """ whether moves for `seat` are made here (a remote table may own only some) """
+        return True
+
+    def _check_turn(self, player):
+        if not self.round_active:
+            raise ValueError("no round in progress")
+        if self.pending_action is not None:
+            raise ValueError("waiting for a target for %s" % self.pending_action[0])
+        if self.flip_target is not None:
+            raise ValueError("a Flip Three is still being resolved")
+        if player is None:
+            return self.current_player
+        if player != self.current_player:
+            raise ValueError(f"it is Player {self.current_player + 1}'s turn")
+        return player
+
+    def _finish(self, p):
+        """ p is out of the turn order until the next round """
+        self.finished_players.add(p)
+        self.turns.finish(p)
+
+    def _deal(self, p):
+        """Give player p one card and apply the bust / 7-unique rules.
+        Returns (value, hand size before the check, is_busted, is_7_unique, current_val)."""
+        deck = self.deck
+        key = deck.draw()
+        value = deck.cards[key]
+        self.last_drawn = value
+        hand = self.cards_in_hand[p]
+        hand.add(value, *deck.effects[key])
+        size = len(hand)
+        is_busted, is_7_unique, current_val = check_round_end(p, hand)
+        return value, size, is_busted, is_7_unique, current_val
+
+    def _after_deal(self, p, value, size, is_busted, is_7_unique, current_val):
+        if len(self.cards_in_hand[p]) < size:
+            self._emit("second_chance_used", p, value=value, score=current_val)
+        if is_busted:
+            self.busted_players.add(p)
+            self._finish(p)
+            self._emit("bust", p, value=value, score=0)
+        elif is_7_unique:
+            self._finish(p)
+            self._emit("seven_unique", p, score=current_val)
+
+    def hit(self, player=None):
+        """One hit per turn, then move on (unless choosing target)."""
+        p = self._check_turn(player)
+
+        if p in self.skip_turn:
+            self.skip_turn.remove(p)
+            self._emit("frozen", p)
+            self.next_turn()
+            return self._flush()
+
+        if self.deck.exhausted():
+            self._out_of_cards()
+            return self._flush()
+
+        value, size, is_busted, is_7_unique, current_val = self._deal(p)
+        self._emit("draw", p, value=value, score=current_val)
+        self._after_deal(p, value, size, is_busted, is_7_unique, current_val)
+
+        if not (is_busted or is_7_unique) and value in ("Freeze", "Flip Three"):
+            self.pending_action = (value, p)
+            self._emit("action", p, value=value)
+            return self._flush()
+
+        self.next_turn()
+        return self._flush()
+
+    def stay(self, player=None):
+        """ player stays and banks their hand at round end """
+        p = self._check_turn(player)
+        self.stayed_players.add(p)
+        self._finish(p)
+        current_val = calculate_round_score(self.cards_in_hand[p])
+        self._emit("stay", p, score=current_val)
+        self.next_turn()
+        return self._flush()
+
+    def resolve_action(self, source_player, target_player, stepwise=False):
+        """
+        Action card functions. With stepwise=True a Flip Three only starts
+        here; the caller then calls flip_step() once per card.
+        """
+        if self.pending_action is None or self.pending_action[1] != source_player:
+            raise ValueError(f"Player {source_player + 1} has no action to resolve")
+        # checked before anything changes, so a bad target leaves the action pending
+        if type(target_player) is not int or not 0 <= target_player < self.num_players:
+            raise ValueError(f"there is no seat {target_player!r} to target")
+        if target_player in self.finished_players:
+            raise ValueError(f"Player {target_player + 1} already finished this round")
+        action = self.pending_action[0]
+        self.pending_action = None
+
+        if action == "Freeze":
+            self.skip_turn.add(target_player)
+            self._emit("freeze", source_player, target=target_player)
+
+        elif action == "Flip Three":
+            self._emit("flip_three", source_player, target=target_player)
+            self.flip_target = target_player
+            self.flips_left = 3
+            if stepwise:
+                return self._flush()
+            while self.flip_target is not None:
+                self._flip_one()
+            return self._flush()
+
+        self.next_turn()
+        return self._flush()
+
+    def _out_of_cards(self):
+        """ every card is on the table: the round ends as if everyone still playing stayed """
+        self.flip_target = None
+        self.flips_left = 0
+        self.end_round_and_bank()
+
+    def _flip_one(self):
+        target = self.flip_target
+        if self.deck.exhausted():
+            self._out_of_cards()
+            return
+        dealt = self._deal(target)
+        self._emit("flip", target, value=dealt[0], score=dealt[4])
+        self._after_deal(target, *dealt)
+        self.flips_left -= 1
+        if dealt[2] or dealt[3] or self.flips_left == 0:
+            self.flip_target = None
+            self.flips_left = 0
+            self.next_turn()
+
+    def flip_step(self):
+        """ flips the next card of a stepwise Flip Three """
+        if self.flip_target is None:
+            raise ValueError("no Flip Three in progress")
+        self._flip_one()
+        return self._flush()
+
+
+# ---------------------------
+# Tkinter GUI and state
+# ---------------------------
+BOT_DELAY_MS = 600
+REMOTE_POLL_MS = 30
+ADVICE_POLL_MS = 20
+FLIP_DELAY_MS = 450
+LOG_MAX_LINES = 500
+PANEL_WIDTH = 240
+PANEL_HEIGHT = 122
+PANEL_STRIDE = PANEL_WIDTH + 8
+OVERVIEW_HEIGHT = 14
+# width assumed for the strip until Tk reports the real view
+VIEW_WIDTH = 980
+# more seats than this and action targets are picked from a spinbox
+TARGET_BUTTONS_MAX = 18
+
+
+class LogView:
+    """
+    Bounded, batched writer for the game log Text widget.
+
+    Lines written during one event-loop tick are joined into a single
+    insert on after_idle. The widget keeps at most max_lines lines, and
+    the oldest are trimmed from the top, so every flush costs the same
+    however long the game runs. If history_path is given, every line
+    is also appended to that file.
+    """
+
+    def __init__(self, root, text, max_lines=LOG_MAX_LINES, history_path=None):
+        self.root = root
+        self.text = text
+        self.max_lines = max_lines
+        self.lines = 0
+        self.pending = []
+        self.flush_job = None
+        self.history = open(history_path, "a", encoding="utf-8") if history_path else None
+
+    def write(self, line):
+        self.pending.append(line)
+        if self.flush_job is None:
+            self.flush_job = self.root.after_idle(self.flush)
+
+    def flush(self):
+        self.flush_job = None
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        if self.history is not None:
+            self.history.write("\n".join(pending) + "\n")
+            self.history.flush()
+
+        # lines that would be trimmed straight away never reach the widget
+        shown = pending[-self.max_lines:]
+        self.text.insert("end", "\n".join(shown) + "\n")
+        self.lines += len(shown)
+        excess = self.lines - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.lines -= excess
+        self.text.see("end")
+
+    def clear(self):
+        if self.flush_job is not None:
+            self.root.after_cancel(self.flush_job)
+            self.flush_job = None
+        self.pending = []
+        self.lines = 0
+        self.text.delete("1.0", "end")
+
+    def close(self):
+        self.flush()
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+
+
+class PanelStrip:
+    """
+    Virtualized row of player panels.
+
+    Every panel has the same size, so the scroll region is fixed when the
+    table is set up and the seats in view follow from the scroll position
+    alone. Only the panels in view exist as widgets: a small pool of them
+    is re-bound to whichever seats scroll in, and seats out of view just
+    keep their text in `texts` until they come back. Above the strip an
+    overview draws every seat as one rectangle coloured by its status;
+    clicking it scrolls there.
+    """
+
+    STATUS_COLORS = (("Busted", "#aa3333"), ("Frozen", "#ff9f1c"), ("Stayed", "#33aa33"),
+                     ("7-Unique", "#ffd700"), ("Finished", "#33aa33"))
+
+    def __init__(self, parent):
+        self.overview = tk.Canvas(parent, bg="#101010", highlightthickness=0,
+                                  height=OVERVIEW_HEIGHT)
+        self.overview.pack(fill="x", padx=8)
+        self.overview.bind("<Configure>", self.draw_overview)
+        self.overview.bind("<Button-1>", self.on_overview_click)
+
+        self.canvas = tk.Canvas(parent, bg="#151515", highlightthickness=0,
+                                height=PANEL_HEIGHT + 8)
+        self.canvas.pack(fill="x")
+        self.scrollbar = tk.Scrollbar(parent, orient="horizontal", command=self.canvas.xview)
+        self.scrollbar.pack(fill="x")
+        self.canvas.configure(xscrollcommand=self.on_scroll)
+
+        self.texts = []
+        self.slots = []
+        self.bound = {}
+        self.colors = []
+        self.cells = []
+        self.turn = None
+        self.view = (0.0, 1.0)
+        self.overview_width = VIEW_WIDTH
+
+    def reset(self, texts):
+        """ shows a new table; texts[p] holds the name/score/hand/status lines of seat p """
+        self.texts = texts
+        for slot in self.slots:
+            slot["player"] = None
+            self.canvas.itemconfigure(slot["window"], state="hidden")
+        self.bound = {}
+        self.colors = [self.status_color(t["status"]) for t in texts]
+        self.turn = None
+        total = max(len(texts) * PANEL_STRIDE, 1)
+        self.canvas.configure(scrollregion=(0, 0, total, PANEL_HEIGHT + 8))
+        self.canvas.xview_moveto(0)
+        self.draw_overview()
+        self.on_scroll(0.0, min(1.0, VIEW_WIDTH / total))
+
+    def new_slot(self):
+        frame = tk.Frame(self.canvas, bg="#1b1b1b", bd=1, relief="solid", padx=6, pady=6)
+        slot = {"frame": frame, "player": None}
+        for key, font, fg in (("name", ("Helvetica", 14, "bold"), "white"),
+                              ("score", ("Helvetica", 12), "lightgreen"),
+                              ("hand", ("Helvetica", 11), "lightgray"),
+                              ("status", ("Helvetica", 10), "cyan")):
+            label = tk.Label(frame, font=font, bg="#1b1b1b", fg=fg,
+                             wraplength=PANEL_WIDTH - 16, justify="left")
+            label.pack(anchor="w")
+            slot[key] = label
+        slot["window"] = self.canvas.create_window(0, 4, window=frame, anchor="nw",
+                                                   width=PANEL_WIDTH, height=PANEL_HEIGHT,
+                                                   state="hidden")
+        self.slots.append(slot)
+        return slot
+
+    def on_scroll(self, first, last):
+        """ xscrollcommand: keep the scrollbar in step and re-bind panels """
+        self.scrollbar.set(first, last)
+        self.view = (float(first), float(last))
+        self.layout()
+        self.draw_viewport()
+
+    def visible(self):
+        """ range of seats with any part in view """
+        total = len(self.texts) * PANEL_STRIDE
+        first, last = self.view
+        start = int(first * total) // PANEL_STRIDE
+        stop = -(-int(last * total) // PANEL_STRIDE)
+        return range(max(start, 0), min(stop, len(self.texts)))
+
+    def layout(self):
+        seats = self.visible()
+        free = []
+        for p in list(self.bound):
+            if p not in seats:
+                slot = self.bound.pop(p)
+                slot["player"] = None
+                free.append(slot)
+        for p in seats:
+            if p in self.bound:
+                continue
+            slot = free.pop() if free else self.spare_slot()
+            self.bind_slot(slot, p)
+        for slot in free:
+            self.canvas.itemconfigure(slot["window"], state="hidden")
+
+    def spare_slot(self):
+        for slot in self.slots:
+            if slot["player"] is None:
+                return slot
+        return self.new_slot()
+
+    def bind_slot(self, slot, p):
+        slot["player"] = p
+        self.bound[p] = slot
+        texts = self.texts[p]
+        for key in ("name", "score", "hand", "status"):
+            slot[key].config(text=texts[key])
+        self.canvas.coords(slot["window"], p * PANEL_STRIDE + 4, 4)
+        self.canvas.itemconfigure(slot["window"], state="normal")
+
+    def update(self, p, key):
+        """ pushes texts[p][key] to the screen; False if seat p is out of view """
+        if key == "status":
+            color = self.status_color(self.texts[p]["status"])
+            if color != self.colors[p]:
+                self.colors[p] = color
+                if p < len(self.cells):
+                    self.overview.itemconfigure(self.cells[p], fill=color)
+        slot = self.bound.get(p)
+        if slot is None:
+            return False
+        slot[key].config(text=self.texts[p][key])
+        return True
+
+    def status_color(self, status):
+        for word, color in self.STATUS_COLORS:
+            if word in status:
+                return color
+        return "#555555"
+
+    # overview
+    def cell_width(self):
+        return self.overview_width / max(len(self.texts), 1)
+
+    def draw_overview(self, event=None):
+        if event is not None:
+            self.overview_width = event.width
+        self.overview.delete("all")
+        width = self.cell_width()
+        self.cells = [self.overview.create_rectangle(p * width, 2, (p + 1) * width - 1,
+                                                     OVERVIEW_HEIGHT - 2, fill=color, width=0)
+                      for p, color in enumerate(self.colors)]
+        self.overview.create_rectangle(0, 0, 0, OVERVIEW_HEIGHT, outline="white", tags="viewport")
+        self.overview.create_rectangle(0, 0, 0, OVERVIEW_HEIGHT, outline="cyan", width=2,
+                                       tags="turn")
+        self.draw_viewport()
+        if self.turn is not None:
+            self.set_turn(self.turn)
+
+    def draw_viewport(self):
+        first, last = self.view
+        self.overview.coords("viewport", first * self.overview_width, 0,
+                             last * self.overview_width - 1, OVERVIEW_HEIGHT - 1)
+
+    def set_turn(self, p):
+        """ outlines whoever is up and scrolls their panel into view """
+        self.turn = p
+        width = self.cell_width()
+        self.overview.coords("turn", p * width, 1, (p + 1) * width, OVERVIEW_HEIGHT - 1)
+        if p not in self.visible():
+            self.scroll_to(p)
+
+    def scroll_to(self, p):
+        total = len(self.texts) * PANEL_STRIDE
+        first, last = self.view
+        left = p * PANEL_STRIDE - (last - first) * total / 2 + PANEL_STRIDE / 2
+        self.canvas.xview_moveto(max(left, 0) / total)
+
+    def on_overview_click(self, event):
+        if self.texts:
+            self.scroll_to(min(int(event.x / self.cell_width()), len(self.texts) - 1))
+
+
+class Flip7GUI:
+    def __init__(self, root, record_path=None, history_path=None, log_lines=LOG_MAX_LINES,
+                 flip_delay_ms=FLIP_DELAY_MS, connect=None, table=None, seats=None,
+                 instrument_path=None, profile_path=None, save_path=None, stats_path=None):
+        load_tk()
+        self.instrument_path = instrument_path
+        self.profile_path = profile_path
+        if instrument_path is not None:
+            # before any widget holds a bound method, so every hook is timed
+            import instrument
+            instrument.enable()
+        self.root = root
+        self.root.title("Flip 7")
+        self.root.geometry("980x620")
+        self.root.configure(bg="#00BFFF")
+
+        """ game state """
+        self.game = None
+        self.rendered = []
+        self.dirty = set()
+        self.repaint_job = None
+        self.render_stats = {"repaints": 0, "label_updates": 0, "skipped": 0, "offscreen": 0,
+                             "seconds": 0.0}
+        self.temp_targets = []
+        self.flipping = False
+        self.bots = {}
+        self.bot_job = None
+        self.flip_delay_ms = flip_delay_ms
+        self.flip_job = None
+        self.connect = connect
+        self.table = table
+        self.seats = seats
+        self.poll_job = None
+        self.save_path = save_path
+        self.autosaver = None
+        self.save_job = None
+        self.save_warned = False
+        self.advisor = None
+        # one thread runs the advisor's searches so Tk keeps drawing
+        self.advice_runner = None
+        self.advice_job = None
+        # policy.Depletion for the table's advice, made once a table exists
+        self.depletion = None
+        self.policy_warned = False
+        self.stats_path = stats_path
+        self.stats_store = None
+        self.stats = None
+        self.stats_game = None
+        self.history = None
+        self.changed = None
+        self.remember_job = None
+        self.recorder = None
+        if record_path is not None:
+            import gamelog
+            self.recorder = gamelog.GameRecorder(record_path)
         self.card_label_bg = "#931B1B"
 
         self.build_start_frame()
         self.build_game_frame()
+        self.log_view = LogView(self.root, self.log_text, log_lines, history_path)
+        self.root.bind("<F12>", self.show_render_stats)
+        self.root.bind("<F9>", self.dump_instrumentation)
+        self.root.bind("<Control-z>", self.undo_move)
+        self.root.bind("<Control-y>", self.redo_move)
+        self.root.protocol("WM_DELETE_WINDOW", self.close_window)
 
     # ---------------------------
     # Start / Setup UI
@@ -174,23 +1253,43 @@ class Flip7GUI:
         title.pack()
 
         subtitle = tk.Label(self.start_frame,
-                            text="Select number of players (3-18):",
+                            text=f"Select number of players ({MIN_PLAYERS}-{MAX_PLAYERS}):",
                             fg="white", bg="#00BFFF",
                             font=("Helvetica", 14))
         subtitle.pack(pady=20)
 
-        self.player_count_var = tk.IntVar(value=3)
-        spin = tk.Spinbox(self.start_frame, from_=3, to=18,
+        self.player_count_var = tk.IntVar(value=MIN_PLAYERS)
+        spin = tk.Spinbox(self.start_frame, from_=MIN_PLAYERS, to=MAX_PLAYERS,
                           textvariable=self.player_count_var,
                           width=5, font=("Helvetica", 14))
         spin.pack(pady=20)
 
+        bots_label = tk.Label(self.start_frame,
+                              text="Computer players (taking the last seats):",
+                              fg="white", bg="#00BFFF",
+                              font=("Helvetica", 12))
+        bots_label.pack()
+
+        self.bot_count_var = tk.IntVar(value=0)
+        bot_spin = tk.Spinbox(self.start_frame, from_=0, to=MAX_PLAYERS,
+                              textvariable=self.bot_count_var,
+                              width=5, font=("Helvetica", 14))
+        bot_spin.pack(pady=10)
+
         start_btn = tk.Button(self.start_frame, text="Start Game",
                               font=("Helvetica", 14),
                               bg="green", fg="white",
                               command=self.start_game)
         start_btn.pack(pady=20)
 
+        if (self.save_path is not None and self.connect is None
+                and os.path.exists(self.save_path)):
+            resume_btn = tk.Button(self.start_frame, text="Resume Saved Game",
+                                   font=("Helvetica", 14),
+                                   bg="#3da5d9", fg="white",
+                                   command=self.resume_game)
+            resume_btn.pack()
+
         rules_btn = tk.Button(self.start_frame,
                               text="Show User Manual\n(for beginner's, please read)",
                               font=("Helvetica", 12),
@@ -201,10 +1300,8 @@ class Flip7GUI:
         self.start_frame.pack(expand=True, anchor="center")
 
     def show_rules(self):
-        """ File I/O """
-        with open("instructions.txt", "r") as ins:
-            manual_text = ins.read()
-        messagebox.showinfo("User Manual", manual_text)
+        """ shows the cached user manual """
+        messagebox.showinfo("User Manual", get_manual())
 
     # ---------------------------
     # Main Game UI
@@ -246,34 +1343,26 @@ class Flip7GUI:
                                  command=self.end_game)
         self.end_btn.pack(side="right", padx=10)
 
+        self.redo_btn = tk.Button(top_frame, text="Redo",
+                                  font=("Helvetica", 12),
+                                  command=self.redo_move,
+                                  state="disabled")
+        self.redo_btn.pack(side="right", padx=4)
+
+        self.undo_btn = tk.Button(top_frame, text="Undo",
+                                  font=("Helvetica", 12),
+                                  command=self.undo_move,
+                                  state="disabled")
+        self.undo_btn.pack(side="right", padx=4)
+
         # little cyan bar
         below_top = tk.Frame(self.game_frame, bg="cyan", width=1000)
         below_top.pack()
 
-        # scrollable players row
+        # scrollable players row; only the panels in view are real widgets
         player_scroll_frame = tk.Frame(self.game_frame, bg="#151515")
         player_scroll_frame.pack(fill="x", pady=5)
-
-        player_canvas = tk.Canvas(player_scroll_frame, bg="#151515",
-                                  highlightthickness=0, height=130)
-        player_canvas.pack(side="left", fill="x", expand=True)
-
-        x_scrollbar = tk.Scrollbar(player_scroll_frame, orient="horizontal",
-                                   command=player_canvas.xview)
-        x_scrollbar.pack(side="bottom", fill="x")
-
-        player_canvas.configure(xscrollcommand=x_scrollbar.set)
-
-        self.players_container = tk.Frame(player_canvas, bg="#151515")
-        player_canvas.create_window((0, 0),
-                                    window=self.players_container,
-                                    anchor="nw")
-
-        def update_scroll_region(event):
-            """ scroll bar functions when there's more than 10 players """
-            player_canvas.configure(scrollregion=player_canvas.bbox("all"))
-
-        self.players_container.bind("<Configure>", update_scroll_region)
+        self.strip = PanelStrip(player_scroll_frame)
 
         # center stuff
         center_frame = tk.Frame(self.game_frame, bg="#151515")
@@ -307,6 +1396,11 @@ class Flip7GUI:
                                   state="disabled")
         self.stay_btn.grid(row=0, column=1, padx=6)
 
+        self.odds_label = tk.Label(controls, text="",
+                                   font=("Helvetica", 12),
+                                   bg="#151515", fg="#9fe2bf")
+        self.odds_label.grid(row=1, column=0, columnspan=2, pady=6)
+
         self.info_label = tk.Label(center_frame, text="",
                                    font=("Helvetica", 12),
                                    bg="#151515", fg="lightgray",
@@ -325,125 +1419,130 @@ class Flip7GUI:
     def start_game(self):
         """ begins a new game """
         n = self.player_count_var.get()
-        if not (3 <= n <= 18):
-            messagebox.showwarning("Players", "Choose between 3 and 18 players.")
+        if not (MIN_PLAYERS <= n <= MAX_PLAYERS):
+            messagebox.showwarning("Players",
+                                   f"Choose between {MIN_PLAYERS} and {MAX_PLAYERS} players.")
+            return
+        b = self.bot_count_var.get()
+        if not (0 <= b <= n):
+            messagebox.showwarning("Players", f"Choose between 0 and {n} computer players.")
             return
 
-        self.num_players = int(n)
-        self.player_scores = {i: 0 for i in range(self.num_players)}
-        self.cards_in_hand = {i: [] for i in range(self.num_players)}
+        import bots
+        if self.connect is not None:
+            import server
+            host, port = server.parse_address(self.connect)
+            # by default a new table is ours to fill; joining someone else's takes one seat
+            seats = self.seats
+            if seats is None:
+                seats = "all" if self.table is None else 1
+            try:
+                self.game = server.RemoteGame.connect(host, port, players=int(n),
+                                                      table=self.table, seats=seats)
+            except (OSError, ValueError) as exc:
+                messagebox.showerror("Server", f"Could not join {self.connect}: {exc}")
+                return
+            n = self.game.num_players
+            self.poll_job = self.root.after(REMOTE_POLL_MS, self.poll_remote)
+            self.log(f"Connected to {self.connect}: table {self.game.table_id}, "
+                     f"your seats {sorted(p + 1 for p in self.game.seats)}")
+        else:
+            self.game = Flip7Game(int(n))
+        self.bots = {seat: bots.ProbabilityBot() for seat in range(n - b, n)
+                     if self.game.controls(seat)}
+        self.show_game()
+        self.start_new_round()
+
+    def resume_game(self):
+        """ picks up the autosaved game where it stopped """
+        import bots
+        import checkpoint
+        try:
+            game, bot_specs = checkpoint.load(self.save_path)
+            self.bots = {seat: bots.make_bot(spec) for seat, spec in bot_specs.items()}
+        except (OSError, ValueError) as exc:
+            messagebox.showerror("Resume", f"Could not load {self.save_path}: {exc}")
+            return
+        self.game = game
+        self.show_game()
+        self.log(f"--- Resumed round {self.game.round_number} from {self.save_path} ---")
+        self.show_position()
+
+    def show_position(self):
+        """ brings every widget in line with a game loaded or set back mid-play """
+        game = self.game
+        self.round_label.config(text=f"Round: {game.round_number}")
+        self.turn_label.config(text=f"Turn: Player {game.current_player + 1}")
+        self.strip.set_turn(game.current_player)
+        self.update_all_player_panels()
+        if not game.round_active:
+            self.card_display.config(text="Round over. Press 'Next Round'.",
+                                     bg=self.card_label_bg)
+            self.hit_btn.config(state="disabled")
+            self.stay_btn.config(state="disabled")
+            self.next_round_btn.config(state="normal" if game.winner is None else "disabled")
+        elif game.flip_target is not None:
+            self.flipping = True
+            self.hit_btn.config(state="disabled")
+            self.stay_btn.config(state="disabled")
+            self.flip_job = self.root.after(max(self.flip_delay_ms, 0), self.flip_step)
+        elif game.pending_action is not None and game.pending_action[1] not in self.bots:
+            self.show_target_buttons(*game.pending_action)
+        else:
+            self.card_display.config(text=f"Player {game.current_player + 1}'s turn – Hit or Stay",
+                                     bg=self.card_label_bg)
+            self.update_odds_display()
+            self.refresh_turn_controls()
+
+    def show_game(self):
+        """ hooks the new game up to the view and swaps in the game screen """
+        if self.game.uid is None:
+            self.game.uid = random.getrandbits(63)
+        self.game.subscribe(self.on_game_event)
+        if self.save_path is not None and self.connect is None and self.autosaver is None:
+            import checkpoint
+            self.autosaver = checkpoint.Autosaver(self.save_path)
+        if self.recorder is not None:
+            self.recorder.record(self.game)
+        if self.stats_path is not None:
+            import statsdb
+            if self.stats_store is None:
+                self.stats_store = statsdb.StatsStore(self.stats_path)
+            self.store_stats()
+            self.stats = statsdb.StatsCollector(keep_events=True)
+            self.stats_game = self.stats.watch(self.game)
+        if self.connect is None:
+            import gamestate
+            self.history = gamestate.UndoHistory()
+            self.changed = None
+        if self.profile_path is not None:
+            import instrument
+            instrument.ProfileRound(self.game, self.profile_path, on_done=lambda path:
+                                    self.log(f"Profile of one round written to {path}"))
+            self.profile_path = None
 
         self.start_frame.pack_forget()
         self.game_frame.pack(fill="both", expand=True)
         self.setup_player_panels()
-        self.start_new_round()
 
     def setup_player_panels(self):
         """ setup for player panel """
-        for widget in self.players_container.winfo_children():
-            widget.destroy()
-
-        self.player_frames = []
-        for i in range(self.num_players):
-            f = tk.Frame(self.players_container, bg="#1b1b1b",
-                         bd=1, relief="solid", padx=6, pady=6)
-            f.pack(side="left", padx=8, pady=4)
-
-            lbl = tk.Label(f, text=f"Player {i+1}",
-                           font=("Helvetica", 14, "bold"),
-                           bg="#1b1b1b", fg="white")
-            lbl.pack(anchor="w")
-
-            score_lbl = tk.Label(f, text=f"Total: {self.player_scores[i]}",
-                                 font=("Helvetica", 12),
-                                 bg="#1b1b1b", fg="lightgreen")
-            score_lbl.pack(anchor="w")
-
-            hand_lbl = tk.Label(f, text="Hand: []",
-                                font=("Helvetica", 11),
-                                bg="#1b1b1b", fg="lightgray",
-                                wraplength=300, justify="left")
-            hand_lbl.pack(anchor="w")
-
-            status_lbl = tk.Label(f, text="Status: Ready",
-                                  font=("Helvetica", 10),
-                                  bg="#1b1b1b", fg="cyan")
-            status_lbl.pack(anchor="w")
-
-            self.player_frames.append({
-                "frame": f,
-                "score": score_lbl,
-                "hand": hand_lbl,
-                "status": status_lbl
-            })
+        self.dirty.clear()
+        self.rendered = [{
+            "name": f"Player {i+1}" + (" (bot)" if i in self.bots else ""),
+            "score": f"Total: {self.game.player_scores[i]}",
+            "hand": "Hand: []",
+            "status": "Status: Ready"
+        } for i in range(self.game.num_players)]
+        self.strip.reset(self.rendered)
 
     def log(self, text):
         """ shows end of game """
-        self.log_text.insert("end", text + "\n")
-        self.log_text.see("end")
+        self.log_view.write(text)
 
     def start_new_round(self):
         """ starts new round """
-        self.round_active = True
-        self.cards_in_hand = {i: [] for i in range(self.num_players)}
-        self.active_players = set(range(self.num_players))
-        self.stayed_players = set()
-        self.busted_players = set()
-        self.finished_players = set()
-        self.skip_turn = set()
-        self.current_player = 0
-
-        self.round_label.config(text=f"Round: {self.round_number}")
-        self.turn_label.config(text=f"Turn: Player {self.current_player + 1}")
-        self.update_all_player_panels()
-
-        self.card_display.config(
-            text="Round started. Player 1's turn – Hit or Stay.",
-            bg=self.card_label_bg
-        )
-        self.info_label.config(text="")
-        self.hit_btn.config(state="normal")
-        self.stay_btn.config(state="normal")
-        self.next_round_btn.config(state="disabled")
-        self.log(f"--- Round {self.round_number} started ---")
-
-    def end_round_and_bank(self):
-        """Bank all round scores, busted players get 0."""
-        for p in range(self.num_players):
-            if p in self.busted_players:
-                round_score = 0
-            else:
-                round_score = calculate_round_score(self.cards_in_hand.get(p, []))
-            self.player_scores[p] += round_score
-
-        self.round_active = False
-        self.hit_btn.config(state="disabled")
-        self.stay_btn.config(state="disabled")
-        self.next_round_btn.config(state="normal")
-        self.log("Round ended. Scores banked.")
-        self.update_all_player_panels()
-
-        winner = self.checking_winner()
-        if winner is not None:
-            messagebox.showinfo("Winner!",
-                                f"Player {winner+1} wins with {self.player_scores[winner]} points!")
-            self.log(f"Player {winner+1} wins the game with {self.player_scores[winner]} points!")
-            self.hit_btn.config(state="disabled")
-            self.stay_btn.config(state="disabled")
-            self.next_round_btn.config(state="disabled")
-
-        self.round_number += 1
-
-    def checking_winner(self):
-        """ checks for winner """
-        if not self.player_scores:
-            return None
-        max_score = max(self.player_scores.values())
-        if max_score < 200:
-            return None
-        for player, score in self.player_scores.items():
-            if score == max_score:
-                return player
+        self.game.start_round()
 
     def restart_game(self):
         """ function to restart game """
@@ -451,24 +1550,43 @@ class Flip7GUI:
 
             self.game_frame.pack_forget()
 
-            self.num_players = 0
-            self.player_scores = {}
-            self.cards_in_hand = {}
-            self.active_players = set()
-            self.stayed_players = set()
-            self.busted_players = set()
-            self.finished_players = set()
-            self.skip_turn = set()
-            self.current_player = 0
-            self.round_active = False
-            self.last_drawn = None
-            self.round_number = 1
-
-            self.log_text.delete("1.0", "end")
+            self.store_stats()
+            if self.game is not None:
+                self.game.unsubscribe(self.on_game_event)
+                if self.connect is not None:
+                    self.game.close()
+            self.game = None
+            self.flipping = False
+            if self.repaint_job is not None:
+                self.root.after_cancel(self.repaint_job)
+                self.repaint_job = None
+            if self.flip_job is not None:
+                self.root.after_cancel(self.flip_job)
+                self.flip_job = None
+            if self.bot_job is not None:
+                self.root.after_cancel(self.bot_job)
+                self.bot_job = None
+            if self.poll_job is not None:
+                self.root.after_cancel(self.poll_job)
+                self.poll_job = None
+            if self.save_job is not None:
+                self.root.after_cancel(self.save_job)
+                self.save_job = None
+            if self.remember_job is not None:
+                self.root.after_cancel(self.remember_job)
+                self.remember_job = None
+            if self.advice_job is not None:
+                self.root.after_cancel(self.advice_job)
+                self.advice_job = None
+            self.history = None
+            self.update_undo_buttons()
+            self.bots = {}
+
+            self.log_view.clear()
 
             self.start_frame.destroy()
             self.build_start_frame()
-            self.player_count_var.set(3)
+            self.player_count_var.set(MIN_PLAYERS)
             self.start_frame.pack(expand=True, anchor="center")
 
     def end_game(self):
@@ -480,125 +1598,343 @@ class Flip7GUI:
                                  font=("Helvetica", 80),
                                  bg="#00BFFF")
             endscreen.pack(fill="both", expand=True)
+            if self.recorder is not None:
+                self.recorder.close()
+            self.save_now()
+            self.store_stats()
+            self.close_advisor()
+            if self.instrument_path is not None:
+                import instrument
+                instrument.dump(self.instrument_path)
+            self.log_view.close()
             self.root.update()
             self.root.after(1000, self.root.destroy)
 
+    def close_window(self):
+        """ closing the window keeps the game on disk for Resume """
+        self.save_now()
+        self.store_stats()
+        self.close_advisor()
+        self.root.destroy()
+
+    def close_advisor(self):
+        if self.advice_runner is not None:
+            self.advice_runner.shutdown(cancel_futures=True)
+        if self.advisor is not None:
+            self.advisor.close()
+
+    # ---------------------------
+    # Saving
+    # ---------------------------
+    def autosave(self):
+        """ hands the encoded table to the background writer """
+        self.save_job = None
+        if self.game is None or self.autosaver is None:
+            return
+        self.report_save_error()
+        if self.autosaver is None:
+            return
+        if self.game.winner is not None:
+            self.autosaver.discard()
+            return
+        import checkpoint
+        self.autosaver.submit(checkpoint.encode_game(self.game, self.bots))
+
+    def save_now(self):
+        """ writes any pending save before the program exits """
+        if self.autosaver is None:
+            return
+        if self.save_job is not None:
+            self.root.after_cancel(self.save_job)
+        self.autosave()
+        if self.autosaver is None:
+            return
+        self.autosaver.flush()
+        self.report_save_error()
+
+    def report_save_error(self):
+        """
+        a failed background write turns autosave off until the next game,
+        so an unwritable path is reported once rather than on every move
+        """
+        error = self.autosaver.take_error()
+        if error is None:
+            return
+        self.autosaver.close()
+        self.autosaver = None
+        self.log(f"Autosave to {self.save_path} failed, so it is off for this game: {error}")
+        if not self.save_warned:
+            self.save_warned = True
+            messagebox.showwarning("Autosave", f"Could not save the game to {self.save_path}: "
+                                               f"{error}\nResume may not find this game.")
+
+    def store_stats(self):
+        """ writes the rounds played so far to the stats database, once per game """
+        if self.stats is not None and self.stats.games:
+            self.stats_store.ingest(self.stats)
+        self.stats = None
+
+    # ---------------------------
+    # Undo / Redo
+    # ---------------------------
+    def remember_soon(self):
+        """ a player is about to decide: keep this position once the move has settled """
+        if self.history is not None and self.remember_job is None:
+            self.remember_job = self.root.after_idle(self.remember)
+
+    def remember(self):
+        self.remember_job = None
+        if self.game is not None and self.game.flip_target is None:
+            self.record_position()
+
+    def record_position(self):
+        """ pushes the current position unless nothing has happened since the last one """
+        history = self.history
+        if history is None or (history.present is not None and self.changed == set()):
+            return
+        import gamestate
+        # seats nobody touched share their hand with the previous position
+        history.push(gamestate.capture(self.game, history.present, self.changed))
+        self.changed = set()
+        self.update_undo_buttons()
+
+    def undo_move(self, event=None):
+        """ Ctrl+Z: back to the last position a player decided on """
+        if self.history is None or self.game is None:
+            return
+        self.cancel_moves()
+        # keep where we are, so Redo can come back to it
+        self.record_position()
+        state = self.history.undo()
+        if state is not None:
+            self.show_state(state, "Undo")
+
+    def redo_move(self, event=None):
+        """ Ctrl+Y: forward again to a position that was undone """
+        if self.history is None or self.game is None:
+            return
+        # a move made since the last undo starts a new line; there is nothing to redo
+        self.record_position()
+        if not self.history.can_redo():
+            return
+        self.cancel_moves()
+        self.show_state(self.history.redo(), "Redo")
+
+    def cancel_moves(self):
+        """ drops scheduled bot moves and Flip Three cards """
+        for name in ("bot_job", "flip_job", "remember_job"):
+            job = getattr(self, name)
+            if job is not None:
+                self.root.after_cancel(job)
+                setattr(self, name, None)
+
+    def show_state(self, state, label):
+        import gamestate
+        gamestate.restore(state, self.game)
+        self.changed = set()
+        self.flipping = False
+        if self.stats is not None:
+            self.stats.rewind(self.stats_game, self.game)
+        if self.recorder is not None:
+            self.recorder.mark()
+        self.clear_temp_targets()
+        self.log(f"--- {label}: round {self.game.round_number}, "
+                 f"Player {self.game.current_player + 1}'s turn ---")
+        self.show_position()
+        self.update_undo_buttons()
+        if self.autosaver is not None and self.save_job is None:
+            self.save_job = self.root.after_idle(self.autosave)
+
+    def update_undo_buttons(self):
+        history = self.history
+        self.undo_btn.config(state="normal" if history is not None and history.can_undo()
+                             else "disabled")
+        self.redo_btn.config(state="normal" if history is not None and history.can_redo()
+                             else "disabled")
+
     # ---------------------------
     # Player actions (Hit / Stay)
     # ---------------------------
     def hit_action(self):
-        card_key = 0
         """One hit per turn, then move on (unless choosing target)."""
-        if not self.round_active:
+        if self.game is None or not self.game.round_active or self.game.flip_target is not None:
             return
+        self.game.hit(self.game.current_player)
 
-        p = self.current_player
-
-        if p in self.skip_turn:
-            self.log(f"Player {p+1} loses this turn due to Freeze.")
-            self.card_display.config(
-                text=f"Player {p+1} was frozen and misses this turn.",
-                bg="#555555"
-            )
-            self.skip_turn.remove(p)
-            self.next_turn()
+    def stay_action(self):
+        """ function for stay """
+        if self.game is None or not self.game.round_active or self.game.flip_target is not None:
             return
+        self.game.stay(self.game.current_player)
 
-        while card_key in discard_pile:
-            card_key = random.randint(1, 94)
-        discard_pile.append(card_key)
-        value = deck_of_cards[card_key]
-        self.last_drawn = value
-        self.cards_in_hand[p].append(value)
+    # ---------------------------
+    # Game events → widgets
+    # ---------------------------
+    def on_game_event(self, event):
+        """ redraws whatever a game event changed """
+        handler = getattr(self, "on_" + event.kind, None)
+        if handler is not None:
+            handler(event)
+
+        if event.kind in ("round_start", "bank", "round_end"):
+            self.update_all_player_panels()
+            self.changed = None
+        elif event.target is not None:
+            self.mark_dirty(event.player, event.target)
+            if self.changed is not None:
+                self.changed.update((event.player, event.target))
+        elif event.player is not None:
+            self.mark_dirty(event.player)
+            if self.changed is not None:
+                self.changed.add(event.player)
+
+        if self.autosaver is not None and self.save_job is None:
+            # after_idle: save once the whole move has been applied
+            self.save_job = self.root.after_idle(self.autosave)
+
+    def on_round_start(self, event):
+        self.round_label.config(text=f"Round: {event.value}")
+        self.turn_label.config(text=f"Turn: Player {self.game.current_player + 1}")
+
+        self.card_display.config(
+            text="Round started. Player 1's turn – Hit or Stay.",
+            bg=self.card_label_bg
+        )
+        self.info_label.config(text="")
+        self.hit_btn.config(state="normal")
+        self.stay_btn.config(state="normal")
+        self.next_round_btn.config(state="disabled")
+        self.log(f"--- Round {event.value} started ---")
+        self.update_odds_display()
+        self.refresh_turn_controls()
+
+    def on_frozen(self, event):
+        p = event.player
+        self.log(f"Player {p+1} loses this turn due to Freeze.")
+        self.card_display.config(
+            text=f"Player {p+1} was frozen and misses this turn.",
+            bg="#555555"
+        )
 
+    def on_draw(self, event):
+        p, value = event.player, event.value
         self.update_player_hand_display(p)
         bg = self.card_color(value)
         self.card_display.config(text=f"Player {p+1} drew: {value}", bg=bg)
         self.log(f"Player {p+1} drew {value}")
 
-        is_busted, is_7_unique, current_val = check_round_end(
-            p, self.cards_in_hand[p]
+        if isinstance(value, int):
+            self.update_player_status(p, f"Score: {event.score}")
+        elif value == "Second Chance":
+            self.log(f"Player {p+1} holds a Second Chance card.")
+            self.update_player_status(p, "Has Second Chance")
+        elif value not in ("Freeze", "Flip Three"):
+            self.update_player_status(p, "Modifier in hand")
+
+    def on_flip(self, event):
+        p, v = event.player, event.value
+        # 👉 show each flipped card in the big center bar
+        self.card_display.config(
+            text=f"Player {p+1} flipped: {v}",
+            bg=self.card_color(v)
         )
 
-        if is_busted:
-            self.busted_players.add(p)
-            self.finished_players.add(p)
-            self.card_display.config(
-                text=f"Player {p+1} busted with a duplicate. Round score: 0",
-                bg="#660000"
-            )
-            self.log(f"Player {p+1} busted.")
-            self.update_player_status(p, "Busted")
-            self.next_turn()
-            return
+        self.update_player_hand_display(p)
+        self.log(f"Player {p+1} flipped {v}")
 
-        if is_7_unique:
-            self.finished_players.add(p)
-            self.update_player_status(p, "7-Unique! Finished")
-            self.log(f"Player {p+1} hit 7 unique numbers. Banking {current_val} points.")
-            self.next_turn()
-            return
+    def on_second_chance_used(self, event):
+        p = event.player
+        self.log(f"Player {p+1} used Second Chance to discard a duplicate {event.value}.")
+        self.update_player_hand_display(p)
 
-        if isinstance(value, str):
-            if value == "Freeze":
-                self.show_target_buttons(action="Freeze", source_player=p)
-                return
-            elif value == "Flip Three":
-                self.show_target_buttons(action="Flip Three", source_player=p)
-                return
-            elif value == "Second Chance":
-                self.log(f"Player {p+1} holds a Second Chance card.")
-                self.update_player_status(p, "Has Second Chance")
-                self.next_turn()
-                return
-            else:
-                self.update_player_status(p, "Modifier in hand")
-                self.next_turn()
-                return
+    def on_bust(self, event):
+        p = event.player
+        if self.flipping:
+            self.update_player_status(p, "Busted from Flip Three")
+            self.log(f"Player {p+1} busted during Flip Three.")
+            return
+        self.card_display.config(
+            text=f"Player {p+1} busted with a duplicate. Round score: 0",
+            bg="#660000"
+        )
+        self.log(f"Player {p+1} busted.")
+        self.update_player_status(p, "Busted")
+
+    def on_seven_unique(self, event):
+        p = event.player
+        if self.flipping:
+            self.update_player_status(p, f"7-Unique! ({event.score})")
+            self.log(f"Player {p+1} got 7-Unique during Flip Three.")
+            return
+        self.update_player_status(p, "7-Unique! Finished")
+        self.log(f"Player {p+1} hit 7 unique numbers. Banking {event.score} points.")
 
-        self.update_player_status(p, f"Score: {current_val}")
-        self.next_turn()
+    def on_stay(self, event):
+        p = event.player
+        self.update_player_status(p, f"Stayed (round {event.score})")
+        self.log(f"Player {p+1} stays and banks (at round end) {event.score} points.")
 
-    def stay_action(self):
-        """ function for stay """
-        if not self.round_active:
+    def on_action(self, event):
+        if event.player in self.bots or not self.game.controls(event.player):
+            self.refresh_turn_controls()
             return
+        self.show_target_buttons(action=event.value, source_player=event.player)
+        self.remember_soon()
 
-        p = self.current_player
-        self.stayed_players.add(p)
-        self.finished_players.add(p)
-        current_val = calculate_round_score(self.cards_in_hand[p])
-        self.update_player_status(p, f"Stayed (round {current_val})")
-        self.log(f"Player {p+1} stays and banks (at round end) {current_val} points.")
-        self.next_turn()
-
-    # ---------------------------
-    # NEXT TURN (for...else)
-    # ---------------------------
-    def next_turn(self):
-        """Move to next non-finished player, or end round."""
-        search_order = list(range(self.current_player + 1, self.num_players)) + \
-                       list(range(0, self.current_player + 1))
+    def on_freeze(self, event):
+        self.clear_temp_targets()
+        target = event.target
+        self.log(f"Player {event.player+1} used Freeze on Player {target+1}.")
+        self.update_player_status(target, "Frozen (loses next turn)")
+        self.card_display.config(
+            text=f"Player {target+1} will lose their next turn (Freeze).",
+            bg="#ffdd88"
+        )
 
-        # for...else required by rubric – logic stays the same
-        for idx in search_order:
-            if idx not in self.finished_players:
-                self.current_player = idx
-                break
-        else:
-            # this runs only if we never broke the loop → all players finished
-            self.log("All players finished for this round.")
-            self.end_round_and_bank()
-            return
+    def on_flip_three(self, event):
+        self.clear_temp_targets()
+        target = event.target
+        self.flipping = True
+        self.log(f"Player {event.player+1} used Flip Three on Player {target+1}.")
+        self.card_display.config(
+            text=f"Player {target+1} must Flip Three cards.",
+            bg="#ffcc77"
+        )
 
-        self.turn_label.config(text=f"Turn: Player {self.current_player + 1}")
+    def on_turn(self, event):
+        self.flipping = False
+        self.turn_label.config(text=f"Turn: Player {event.player + 1}")
+        self.strip.set_turn(event.player)
         self.card_display.config(
-            text=f"Player {self.current_player + 1}'s turn – Hit or Stay",
+            text=f"Player {event.player + 1}'s turn – Hit or Stay",
             bg=self.card_label_bg
         )
 
-        self.root.update_idletasks()
-        self.update_all_player_panels()
+        self.update_odds_display()
+        self.refresh_turn_controls()
+
+    def on_round_end(self, event):
+        self.flipping = False
+        self.log("All players finished for this round.")
+        self.hit_btn.config(state="disabled")
+        self.stay_btn.config(state="disabled")
+        self.next_round_btn.config(state="normal")
+        self.log("Round ended. Scores banked.")
+        self.odds_label.config(text="")
+        self.remember_soon()
+
+    def on_winner(self, event):
+        messagebox.showinfo("Winner!",
+                            f"Player {event.player+1} wins with {event.score} points!")
+        self.log(f"Player {event.player+1} wins the game with {event.score} points!")
+        # after the event has reached every listener, the collector included
+        self.root.after_idle(self.store_stats)
+        self.hit_btn.config(state="disabled")
+        self.stay_btn.config(state="disabled")
+        self.next_round_btn.config(state="disabled")
+
+    def on_error(self, event):
+        self.log(f"Server: {event.value}")
 
     # ---------------------------
     # Action card target UI
@@ -618,23 +1954,95 @@ class Flip7GUI:
         prompt.pack(side="left", padx=6)
         self.temp_targets.append(prompt)
 
-        for t in range(self.num_players):
+        # rank the targets once the buttons are on screen
+        self.root.after_idle(self.show_target_advice, prompt)
+        if self.game.num_players > TARGET_BUTTONS_MAX:
+            self.show_target_picker(action, source_player)
+            return
+
+        for t in range(self.game.num_players):
             state = "normal"
-            if t in self.finished_players:
+            if t in self.game.finished_players:
                 state = "disabled"
             btn = tk.Button(
                 self.target_frame,
                 text=f"P{t+1}",
                 width=4,
                 command=lambda target=t, act=action, src=source_player:
-                    (self.resolve_action_target(act, src, target),
-                     self.hit_btn.config(state="normal"),
-                     self.stay_btn.config(state="normal")),
+                    self.resolve_action_target(act, src, target),
                 state=state
             )
             btn.pack(side="left", padx=4)
             self.temp_targets.append(btn)
 
+    def show_target_picker(self, action, source_player):
+        """ one spinbox of open seats instead of a button per player """
+        open_seats = [str(t + 1) for t in range(self.game.num_players)
+                      if t not in self.game.finished_players]
+        picker = tk.Spinbox(self.target_frame, values=open_seats, width=5,
+                            font=("Helvetica", 12))
+        picker.pack(side="left", padx=4)
+        btn = tk.Button(
+            self.target_frame,
+            text="Target",
+            command=lambda act=action, src=source_player:
+                self.pick_target(act, src, picker.get())
+        )
+        btn.pack(side="left", padx=4)
+        self.target_picker = picker
+        self.temp_targets += [picker, btn]
+
+    def pick_target(self, action, source_player, text):
+        """ the spinbox's seat, once it is checked to be an open one """
+        try:
+            target = int(text) - 1
+        except ValueError:
+            target = None
+        if (target is None or not 0 <= target < self.game.num_players
+                or target in self.game.finished_players):
+            messagebox.showwarning("Target", f"{text!r} is not an open seat.")
+            return
+        self.resolve_action_target(action, source_player, target)
+
+    def show_target_advice(self, prompt):
+        """ starts a short Monte Carlo search for the best target off the Tk thread """
+        if (prompt not in self.temp_targets or self.game is None
+                or self.game.pending_action is None):
+            return
+        import advisor
+        if self.advisor is None:
+            self.advisor = advisor.Advisor()
+            self.advice_runner = ThreadPoolExecutor(max_workers=1)
+        if self.advice_job is not None:
+            self.root.after_cancel(self.advice_job)
+        future = self.advice_runner.submit(self.advisor.advise, self.game.snapshot())
+        self.advice_job = self.root.after(ADVICE_POLL_MS, self.poll_target_advice, prompt, future)
+
+    def poll_target_advice(self, prompt, future):
+        """ names the best target in the prompt once the search is done """
+        if not future.done():
+            self.advice_job = self.root.after(ADVICE_POLL_MS, self.poll_target_advice,
+                                              prompt, future)
+            return
+        self.advice_job = None
+        # the prompt is gone if the target was picked while the search ran
+        if (prompt not in self.temp_targets or self.game is None
+                or self.game.pending_action is None):
+            return
+        ranked = future.result()
+        if not ranked:
+            return
+        best = ranked[0]
+        margin = f"{best.mean:+.1f}"
+        if best.rollouts > 1:
+            margin += f" ± {best.high - best.mean:.1f}"
+        prompt.config(text=f"Action: {self.game.pending_action[0]}. Suggested: "
+                           f"P{best.target + 1} ({margin} points vs. the leader). "
+                           f"Choose a target:")
+        if self.game.num_players > TARGET_BUTTONS_MAX:
+            self.target_picker.delete(0, "end")
+            self.target_picker.insert(0, str(best.target + 1))
+
     def clear_temp_targets(self):
         """ targets """
         for w in self.temp_targets:
@@ -643,100 +2051,190 @@ class Flip7GUI:
 
     def resolve_action_target(self, action, source_player, target_player):
         """ Action card functions """
-        self.clear_temp_targets()
-        self.log(f"Player {source_player+1} used {action} on Player {target_player+1}.")
-
-        if action == "Freeze":
-            self.skip_turn.add(target_player)
-            self.update_player_status(target_player, "Frozen (loses next turn)")
-            self.card_display.config(
-                text=f"Player {target_player+1} will lose their next turn (Freeze).",
-                bg="#ffdd88"
-            )
-            self.next_turn()
-
-        elif action == "Flip Three":
-            self.card_display.config(
-                text=f"Player {target_player+1} must Flip Three cards.",
-                bg="#ffcc77"
-            )
-            self.root.update()
-            for i in range(3):
-                card_key = 0
-                while card_key in discard_pile:
-                    card_key = random.randint(1, 94)
-                discard_pile.append(card_key)
-                v = deck_of_cards[card_key]
-                self.cards_in_hand[target_player].append(v)
-
-                # 👉 show each flipped card in the big center bar
-                self.card_display.config(
-                    text=f"Player {target_player+1} flipped: {v}",
-                    bg=self.card_color(v)
-                )
-                self.root.update()
-
-                self.update_player_hand_display(target_player)
-                self.log(f"Player {target_player+1} flipped {v}")
-
-                is_busted, is_7_unique, cur_val = check_round_end(
-                    target_player, self.cards_in_hand[target_player]
-                )
-                if is_busted:
-                    self.busted_players.add(target_player)
-                    self.finished_players.add(target_player)
-                    self.update_player_status(target_player, "Busted from Flip Three")
-                    self.log(f"Player {target_player+1} busted during Flip Three.")
-                    break
-                if is_7_unique:
-                    self.finished_players.add(target_player)
-                    self.update_player_status(target_player, f"7-Unique! ({cur_val})")
-                    self.log(f"Player {target_player+1} got 7-Unique during Flip Three.")
-                    break
-
-            self.next_turn()
+        # the next turn event re-enables the buttons for whoever is up
+        self.hit_btn.config(state="disabled")
+        self.stay_btn.config(state="disabled")
+        if self.flip_delay_ms <= 0:
+            self.game.resolve_action(source_player, target_player)
+            return
+        self.game.resolve_action(source_player, target_player, stepwise=True)
+        if self.game.flip_target is not None:
+            self.flip_job = self.root.after(self.flip_delay_ms, self.flip_step)
+
+    def flip_step(self):
+        """ one scheduled card of a Flip Three; Tk keeps running in between """
+        self.flip_job = None
+        game = self.game
+        if game is None or game.flip_target is None:
+            return
+        game.flip_step()
+        if game.flip_target is not None:
+            self.flip_job = self.root.after(self.flip_delay_ms, self.flip_step)
 
+    # ---------------------------
+    # Computer players
+    # ---------------------------
+    def refresh_turn_controls(self):
+        """ humans get the Hit/Stay buttons; bots get a scheduled move """
+        game = self.game
+        seat = game.pending_action[1] if game.pending_action else game.current_player
+        if not game.controls(seat):
+            # another client's seat: wait for its moves to arrive from the server
+            self.hit_btn.config(state="disabled")
+            self.stay_btn.config(state="disabled")
+            return
+        if seat not in self.bots:
+            if game.pending_action is None:
+                self.hit_btn.config(state="normal")
+                self.stay_btn.config(state="normal")
+            self.remember_soon()
+            return
+        self.hit_btn.config(state="disabled")
+        self.stay_btn.config(state="disabled")
+        if self.bot_job is None:
+            # after() keeps the Tk event loop running while the bot "thinks"
+            self.bot_job = self.root.after(BOT_DELAY_MS, self.play_bot_turn)
+
+    def play_bot_turn(self):
+        """ lets the bot in the current seat make one move """
+        self.bot_job = None
+        game = self.game
+        if game is None or not game.round_active or game.flip_target is not None:
+            return
+        if game.pending_action is not None:
+            action, seat = game.pending_action
+            if seat in self.bots:
+                target = self.bots[seat].decide(game.snapshot())
+                self.resolve_action_target(action, seat, target)
+            return
+        seat = game.current_player
+        if seat not in self.bots:
+            return
+        if self.bots[seat].decide(game.snapshot()) == "hit":
+            self.hit_action()
         else:
-            self.next_turn()
+            self.stay_action()
+
+    def poll_remote(self):
+        """ delivers the server's events for a remote table on the Tk thread """
+        self.poll_job = None
+        if self.game is None:
+            return
+        if self.game.poll():
+            self.poll_job = self.root.after(REMOTE_POLL_MS, self.poll_remote)
 
     # ---------------------------
     # UI helpers
     # ---------------------------
     def update_player_hand_display(self, p):
         """ player activity """
-        hand = self.cards_in_hand.get(p, [])
+        hand = self.game.cards_in_hand.get(p, [])
         hand_text = "[" + ", ".join(map(str, hand)) + "]"
-        self.player_frames[p]["hand"].config(text=f"Hand: {hand_text}")
+        self.set_panel_text(p, "hand", f"Hand: {hand_text}")
         round_val = calculate_round_score(hand)
-        self.player_frames[p]["score"].config(
-            text=f"Total: {self.player_scores[p]}"
-        )
-        status = self.player_frames[p]["status"].cget("text")
+        self.set_panel_text(p, "score", f"Total: {self.game.player_scores[p]}")
+        status = self.rendered[p]["status"]
         if ("Busted" in status or "Stayed" in status or
                 "7-Unique" in status or "Frozen" in status):
             return
-        self.player_frames[p]["status"].config(text=f"Round: {round_val}")
+        self.set_panel_text(p, "status", f"Round: {round_val}")
+
+    def update_odds_display(self):
+        """ bust chance and hit / stay values for whoever is up """
+        import odds
+        import policy
+        o = odds.player_odds(self.game, self.game.current_player)
+        hint = ""
+        try:
+            table = policy.get_policy()
+        except ValueError as exc:
+            # solved by another version or for other rules; the odds still show
+            if not self.policy_warned:
+                self.policy_warned = True
+                self.log(f"Policy advice is off: {exc}")
+            table = None
+        if table is not None:
+            if self.depletion is None or self.depletion.game is not self.game:
+                if self.depletion is not None:
+                    self.depletion.close()
+                self.depletion = policy.Depletion(self.game)
+            hand = self.game.cards_in_hand[self.game.current_player]
+            bucket = self.depletion.bucket(hand.mask)
+            hint = f"   Table says: {table.decide(hand, bucket=bucket)}"
+        self.odds_label.config(
+            text=f"Bust if you hit: {o.bust_probability:.0%}   "
+                 f"Hit ≈ {o.hit_score:.1f}   Stay = {o.stay_score}{hint}"
+        )
 
     def update_player_status(self, p, text):
         """ player activity """
-        self.player_frames[p]["status"].config(text=f"Status: {text}")
+        self.set_panel_text(p, "status", f"Status: {text}")
+
+    def set_panel_text(self, p, key, text):
+        """ configures a panel label only when its text actually changes """
+        rendered = self.rendered[p]
+        if rendered[key] == text:
+            self.render_stats["skipped"] += 1
+            return
+        rendered[key] = text
+        if self.strip.update(p, key):
+            self.render_stats["label_updates"] += 1
+        else:
+            # kept in self.rendered; the strip shows it if the seat scrolls into view
+            self.render_stats["offscreen"] += 1
+
+    def mark_dirty(self, *players):
+        """ queues panels for one coalesced repaint when Tk goes idle """
+        self.dirty.update(players)
+        if self.repaint_job is None:
+            self.repaint_job = self.root.after_idle(self.repaint_dirty_panels)
 
     def update_all_player_panels(self):
         """ player activity """
-        for p in range(self.num_players):
-            self.player_frames[p]["score"].config(
-                text=f"Total: {self.player_scores[p]}"
-            )
-            hand = self.cards_in_hand.get(p, [])
+        self.mark_dirty(*range(self.game.num_players))
+
+    def repaint_dirty_panels(self):
+        """ redraws only the players whose state changed since the last repaint """
+        self.repaint_job = None
+        if self.game is None or not self.dirty:
+            return
+        started = time.perf_counter()
+        game = self.game
+        for p in self.dirty:
+            self.set_panel_text(p, "score", f"Total: {game.player_scores[p]}")
+            hand = game.cards_in_hand.get(p, [])
             hand_text = "[" + ", ".join(map(str, hand)) + "]"
-            self.player_frames[p]["hand"].config(text=f"Hand: {hand_text}")
-            if p in self.finished_players:
+            self.set_panel_text(p, "hand", f"Hand: {hand_text}")
+            if p in game.finished_players:
                 st = "Finished"
-            elif p in self.skip_turn:
+            elif p in game.skip_turn:
                 st = "Frozen"
             else:
                 st = "Active"
-            self.player_frames[p]["status"].config(text=f"Status: {st}")
+            self.set_panel_text(p, "status", f"Status: {st}")
+        self.dirty.clear()
+        stats = self.render_stats
+        stats["repaints"] += 1
+        stats["seconds"] += time.perf_counter() - started
+
+    def show_render_stats(self, event=None):
+        """ F12: how much panel repainting has cost so far """
+        stats = self.render_stats
+        average = stats["seconds"] / stats["repaints"] * 1000 if stats["repaints"] else 0.0
+        self.log(f"Render: {stats['repaints']} repaints, {stats['label_updates']} label updates, "
+                 f"{stats['skipped']} unchanged labels skipped, {stats['offscreen']} off screen, "
+                 f"{average:.3f} ms per repaint")
+
+    def dump_instrumentation(self, event=None):
+        """ F9: latency histograms and event counts so far """
+        import instrument
+        if not instrument.enabled:
+            self.log("Instrumentation is off; start with --instrument PATH.")
+            return
+        snap = instrument.dump(self.instrument_path)
+        for line in instrument.format_snapshot(snap).splitlines():
+            self.log(line)
+        self.log(f"Instrumentation snapshot written to {self.instrument_path}")
 
     def card_color(self, value):
         """ changes color for action cards """
@@ -756,7 +2254,96 @@ class Flip7GUI:
 # ---------------------------
 # Run it
 # ---------------------------
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = Flip7GUI(root)
+# subcommand -> (module providing add_arguments / run, help text)
+COMMANDS = {
+    "simulate": ("simulator", "Monte Carlo tournament of headless games"),
+    "replay": ("gamelog", "show a game from a recorded log"),
+    "serve": ("server", "host many tables for network play"),
+    "loadtest": ("loadgen", "drive a running server with many bot tables"),
+    "bench": ("benchmark", "time draws, scoring, turns, rounds and games"),
+    "solve": ("policy", "precompute the optimal hit/stay table"),
+    "stats": ("statsdb", "bust rates, round scores and seat win rates from a stats database"),
+    "analyze": ("analytics", "streaming reports over simulated or logged game events"),
+    "columns": ("columnstore", "reports from memory-mapped column shards written by simulate"),
+}
+
+
+def main(argv=None):
+    """ no arguments launches the GUI; subcommands run headless tools """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # the rules come first: the tools below read them when they are imported
+    early = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    early.add_argument("--rules")
+    known, argv = early.parse_known_args(argv)
+    if known.rules is not None:
+        try:
+            load_rules(known.rules)
+        except (OSError, ValueError) as exc:
+            raise SystemExit(f"cannot use rules {known.rules}: {exc}")
+
+    parser = argparse.ArgumentParser(prog="Flip7.py", description="Flip 7 card game")
+    commands = parser.add_subparsers(dest="command")
+
+    for name, (module_name, help_text) in COMMANDS.items():
+        command = commands.add_parser(name, help=help_text)
+        # only the tool actually being run is imported
+        if name in argv:
+            module = importlib.import_module(module_name)
+            module.add_arguments(command)
+            command.set_defaults(run=module.run)
+
+    manual = commands.add_parser("export-manual", help="write the user manual to a text file")
+    manual.add_argument("path", nargs="?", default="instructions.txt")
+    manual.set_defaults(run=export_manual)
+
+    parser.add_argument("--rules", metavar="PATH",
+                        help="JSON rule variant: target_score, seven_unique_bonus, numbers, "
+                             "modifiers, actions, min_players, max_players, players_per_deck; "
+                             "works before any subcommand too")
+    parser.add_argument("--record", metavar="PATH",
+                        help="append every game played in the GUI to this log file")
+    parser.add_argument("--log-file", metavar="PATH",
+                        help="append the full text log of the GUI to this file")
+    parser.add_argument("--log-lines", type=int, default=LOG_MAX_LINES,
+                        help="lines kept in the on-screen log (default: %(default)s)")
+    parser.add_argument("--flip-delay", type=int, default=FLIP_DELAY_MS, metavar="MS",
+                        help="pause between Flip Three cards; 0 resolves instantly "
+                             "(default: %(default)s)")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="play on a Flip 7 server instead of locally")
+    parser.add_argument("--table", type=int, default=None,
+                        help="with --connect, join this table instead of creating one")
+    parser.add_argument("--seats", type=int, default=None,
+                        help="with --connect, seats to claim (default: all of a new "
+                             "table, one of an existing one)")
+    parser.add_argument("--instrument", metavar="PATH",
+                        help="time game and GUI actions; F9 and End Game write a JSON "
+                             "snapshot to PATH")
+    parser.add_argument("--profile-round", metavar="PATH",
+                        help="cProfile the first round played and save the stats to PATH")
+    parser.add_argument("--save", metavar="PATH", default=data_path("flip7.sav"),
+                        help="autosave file for resuming a game (default: %(default)s)")
+    parser.add_argument("--no-autosave", action="store_true",
+                        help="do not save the game while playing")
+    parser.add_argument("--stats", metavar="DB",
+                        help="store every game played in this SQLite statistics database")
+
+    args = parser.parse_args(argv)
+    if args.command is not None:
+        return args.run(args)
+
+    root = load_tk().Tk()
+    # the window's callbacks keep the GUI alive
+    Flip7GUI(root, record_path=args.record, history_path=args.log_file,
+             log_lines=max(1, args.log_lines), flip_delay_ms=args.flip_delay,
+             connect=args.connect, table=args.table, seats=args.seats,
+             instrument_path=args.instrument, profile_path=args.profile_round,
+             save_path=None if args.no_autosave else args.save,
+             stats_path=args.stats)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    # run through the importable module so helper modules share its classes
+    import Flip7
+    Flip7.main()
@@ -0,0 +1,190 @@
+"""
+Monte Carlo advice for aiming a Freeze or Flip Three.
+
+For every open target, rollouts rebuild the table from a GameSnapshot
+with the unseen cards shuffled into a fresh order (the determinization:
+players know what is left, not the order), resolve the action on that
+target and play the rest of the round out with a fixed policy: hit
+below STAY_AT, aim later actions at the leading opponent. A rollout is
+scored as the acting player's total minus the best opponent total once
+the round is banked.
+
+Rollouts go round-robin over the targets until the time budget is
+spent, in this process and in a pool of workers at once. Workers check
+the deadline between rollouts and return what they have; a worker that
+has not answered by the deadline plus GRACE is left out. Targets come
+back ranked by mean margin with a 95% confidence interval.
+
+A time budget depends on the machine, so bots give the Advisor a fixed
+number of rollouts instead: the same seed then gives the same advice.
+"""
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from Flip7 import Deck, Flip7Game, Hand, calculate_round_score
+
+BUDGET = 0.1
+GRACE = 0.05
+STAY_AT = 20
+Z = 1.96
+
+Advice = namedtuple("Advice", "target mean low high rollouts")
+
+
+# ---------------------------
+# Rollouts
+# ---------------------------
+def table_from_snapshot(snapshot, rng):
+    """ a live game matching `snapshot`, its unseen cards in a random order """
+    deck = Deck(snapshot.unseen, rng=rng)
+    game = Flip7Game(snapshot.num_players, deck=deck)
+    game.player_scores = dict(enumerate(snapshot.scores))
+    game.cards_in_hand = {p: Hand(hand) for p, hand in enumerate(snapshot.hands)}
+    game.finished_players = set(snapshot.finished)
+    game.busted_players = set(snapshot.busted)
+    game.stayed_players = set(snapshot.stayed)
+    game.skip_turn = set(snapshot.frozen)
+    game.current_player = snapshot.player
+    game.round_active = True
+    game.resync()
+    return game
+
+
+def leader(game, me):
+    """ the unfinished opponent with the highest total, else me """
+    best = me
+    for p, score in game.player_scores.items():
+        if p != me and p not in game.finished_players:
+            if best == me or score > game.player_scores[best]:
+                best = p
+    return best
+
+
+def rollout(snapshot, target, rng):
+    """ margin for the acting player after aiming at `target` and playing out the round """
+    game = table_from_snapshot(snapshot, rng)
+    me = snapshot.player
+    # if the unseen cards run out the engine banks the hands as they are
+    game.pending_action = (snapshot.pending_action, me)
+    game.resolve_action(me, target)
+    while game.round_active:
+        if game.pending_action is not None:
+            source = game.pending_action[1]
+            game.resolve_action(source, leader(game, source))
+        elif calculate_round_score(game.cards_in_hand[game.current_player]) >= STAY_AT:
+            game.stay(game.current_player)
+        else:
+            game.hit(game.current_player)
+    scores = game.player_scores
+    return scores[me] - max(score for p, score in scores.items() if p != me)
+
+
+def run_rollouts(snapshot, targets, seed, deadline=None, rollouts=None):
+    """
+    {target: [rollouts, sum, sum of squares]} from round-robin rollouts,
+    `rollouts` of them or as many as fit before `deadline`
+    """
+    rng = random.Random(seed)
+    totals = {target: [0, 0.0, 0.0] for target in targets}
+    done = 0
+    while True:
+        for target in targets:
+            if rollouts is not None:
+                if done >= rollouts:
+                    return totals
+            # checked per rollout, so a big table does not overrun by a whole sweep;
+            # one rollout always runs, so there is an answer
+            elif done and time.time() >= deadline:
+                return totals
+            margin = rollout(snapshot, target, rng)
+            entry = totals[target]
+            entry[0] += 1
+            entry[1] += margin
+            entry[2] += margin * margin
+            done += 1
+
+
+def rank(totals):
+    """ Advice per target, best mean margin first; one rollout gives no interval (infinite) """
+    advice = []
+    for target, (n, total, squares) in totals.items():
+        if not n:
+            continue
+        mean = total / n
+        if n < 2:
+            spread = math.inf
+        else:
+            spread = Z * math.sqrt(max(squares / n - mean * mean, 0.0) / (n - 1))
+        advice.append(Advice(target, mean, mean - spread, mean + spread, n))
+    advice.sort(key=lambda a: a.mean, reverse=True)
+    return advice
+
+
+# ---------------------------
+# Advisor
+# ---------------------------
+class Advisor:
+    """ ranks action targets; keeps its worker pool between calls """
+
+    def __init__(self, workers=None, budget=BUDGET, seed=None, rollouts=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.budget = budget
+        # a fixed number of rollouts per call replaces the time budget
+        self.rollouts = rollouts
+        self.rng = random.Random(seed)
+        self.pool = None
+
+    def advise(self, snapshot, budget=None):
+        """ ranked Advice for aiming snapshot.pending_action, within `budget` seconds """
+        if snapshot.pending_action is None:
+            raise ValueError("no Freeze or Flip Three to aim")
+        targets = [p for p in range(snapshot.num_players) if p not in snapshot.finished]
+        if not targets:
+            return []
+        if self.rollouts is not None:
+            deadline = None
+            shares = [self.rollouts // self.workers + (i < self.rollouts % self.workers)
+                      for i in range(self.workers)]
+        else:
+            budget = self.budget if budget is None else budget
+            # wall clock: the workers are other processes
+            deadline = time.time() + budget
+            shares = [None] * self.workers
+        futures = []
+        if self.workers > 1:
+            if self.pool is None:
+                # the GUI asks from a worker thread, and forking a threaded process
+                # can copy a lock some other thread holds, so workers start fresh
+                self.pool = ProcessPoolExecutor(max_workers=self.workers - 1,
+                                                mp_context=multiprocessing.get_context("spawn"))
+            futures = [self.pool.submit(run_rollouts, snapshot, targets, self.rng.getrandbits(64),
+                                        deadline, share)
+                       for share in shares[1:]]
+        # this process searches too, so a cold pool still leaves an answer
+        results = [run_rollouts(snapshot, targets, self.rng.getrandbits(64), deadline, shares[0])]
+        if futures:
+            timeout = None if deadline is None else max(deadline + GRACE - time.time(), 0)
+            done, late = wait(futures, timeout=timeout)
+            for future in late:
+                future.cancel()
+            # in submission order, so the sums come out the same every time
+            results += [future.result() for future in futures if future in done]
+
+        merged = {target: [0, 0.0, 0.0] for target in targets}
+        for totals in results:
+            for target, (n, total, squares) in totals.items():
+                entry = merged[target]
+                entry[0] += n
+                entry[1] += total
+                entry[2] += squares
+        return rank(merged)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
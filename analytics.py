@@ -0,0 +1,391 @@
+"""
+Streaming analytics over game event streams, in constant memory.
+
+Sources are generators of Records, one per GameEvent, tagged with the
+game, the round and the size of the hand the event is about:
+
+    simulated_records   plays seeded bot games chunk by chunk, exactly as
+                        simulate does, and yields their events game by game
+    logged_records      reads games back from --record logs
+
+Only one chunk of simulated games (or one log game's events) is alive
+at any time, so a run of 10^8 events holds no more than CHUNK_SIZE games
+in memory.
+
+Sinks take records one at a time with add() and give their answer with
+result(). They compose: Filter and Window pass records (or per-window
+values) on to another sink, GroupBy keeps one metric per key, and the
+metrics themselves (Mean, Rate, Quantiles) are a few numbers each. One
+pass feeds every report at once:
+
+    python Flip7.py analyze --games 100000 --players 4
+    python Flip7.py analyze games/*.f7log
+"""
+import time
+from bisect import bisect_right, insort
+from collections import namedtuple
+
+from Flip7 import MAX_PLAYERS, MIN_PLAYERS
+from bots import make_bot
+from gamelog import GameLog
+from simulator import chunk_bots, chunk_ranges, game_seed, play_tables
+
+# the kind, player, value, target and score of a GameEvent; size is the
+# player's hand before the card for dealt cards and what they lead to
+# (second_chance_used, bust, seven_unique), the current hand otherwise
+Record = namedtuple("Record", "game round kind player value target score size")
+
+DEALT = ("draw", "flip")
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+# ---------------------------
+# Sources
+# ---------------------------
+class _ChunkEvents:
+    """ the events of each game play_tables plays side by side, kept apart per game """
+
+    def __init__(self):
+        self.games = []
+
+    def watch(self, game, seed):
+        events = []
+        self.games.append(events)
+        game.subscribe(events.append)
+
+
+def tag(events, game, num_players):
+    """ Records for one game's GameEvents; tracks hand sizes from the events alone """
+    held = [0] * num_players
+    before = [0] * num_players
+    rnd = 0
+    for event in events:
+        kind, p = event.kind, event.player
+        if kind == "round_start":
+            rnd = event.value
+            held = [0] * num_players
+            size = None
+        elif kind in DEALT:
+            size = before[p] = held[p]
+            held[p] += 1
+        elif kind == "second_chance_used":
+            # the Second Chance and the duplicate both leave the hand
+            size = before[p]
+            held[p] -= 2
+        elif kind == "bust" or kind == "seven_unique":
+            size = before[p]
+        elif p is not None:
+            size = held[p]
+        else:
+            size = None
+        yield Record(game, rnd, kind, p, event.value, event.target, event.score, size)
+
+
+def simulated_records(games, num_players, master_seed=0, bot_specs=("threshold",)):
+    """ Records of the games `simulate` plays for the same seed, bots and player count """
+    for start, stop in chunk_ranges(games):
+        # the same chunks, bot seeds and lock-step order as the simulator's workers
+        chunk = _ChunkEvents()
+        play_tables(num_players, [game_seed(master_seed, index) for index in range(start, stop)],
+                    chunk_bots(bot_specs, num_players, master_seed, start), collector=chunk)
+        for index, events in enumerate(chunk.games, start):
+            yield from tag(events, index, num_players)
+
+
+def logged_records(paths):
+    """ Records of every game in the given log files, numbered across the files """
+    index = 0
+    for path in paths:
+        log = GameLog(path)
+        try:
+            for g, entry in enumerate(log.games):
+                yield from tag(log.events(g), index, entry.num_players)
+                index += 1
+        finally:
+            log.close()
+
+
+# ---------------------------
+# Metrics
+# ---------------------------
+class Mean:
+    """ running count, mean and variance (Welford) """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def result(self):
+        """ (count, mean) """
+        return self.count, self.mean
+
+
+class Rate:
+    """ `kind` records per other record, e.g. busts per card dealt """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.hits = 0
+        self.count = 0
+
+    def add(self, record):
+        if record.kind == self.kind:
+            self.hits += 1
+        else:
+            self.count += 1
+
+    def result(self):
+        """ (count, rate) """
+        return self.count, self.hits / self.count if self.count else 0.0
+
+
+class P2Quantile:
+    """
+    One quantile estimated with the P-square algorithm: five markers
+    whose heights are nudged toward the quantile as values arrive, so
+    nothing is stored but the markers.
+    """
+    __slots__ = ("p", "heights", "positions", "wanted", "steps")
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.wanted = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.steps = (0.0, p / 2, p, (1 + p) / 2, 1.0)
+
+    def add(self, x):
+        q = self.heights
+        if len(q) < 5:
+            insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect_right(q, x) - 1
+        n, wanted = self.positions, self.wanted
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            wanted[i] += self.steps[i]
+        for i in (1, 2, 3):
+            d = wanted[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    # the parabola overshot a neighbour; step linearly instead
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def result(self):
+        q = self.heights
+        if len(q) < 5:
+            return q[min(int(self.p * len(q)), len(q) - 1)] if q else None
+        return q[2]
+
+
+class Quantiles:
+    """ count, mean and a P-square sketch per quantile """
+
+    def __init__(self, quantiles=QUANTILES):
+        self.mean = Mean()
+        self.sketches = [P2Quantile(p) for p in quantiles]
+
+    def add(self, x):
+        self.mean.add(x)
+        for sketch in self.sketches:
+            sketch.add(x)
+
+    def result(self):
+        """ (count, mean, [estimate per quantile]) """
+        return self.mean.count, self.mean.mean, [sketch.result() for sketch in self.sketches]
+
+
+# ---------------------------
+# Stages
+# ---------------------------
+class Filter:
+    """ passes the records of the given kinds on to `sink` """
+
+    def __init__(self, kinds, sink):
+        self.kinds = frozenset(kinds)
+        self.sink = sink
+
+    def add(self, record):
+        if record.kind in self.kinds:
+            self.sink.add(record)
+
+    def result(self):
+        return self.sink.result()
+
+
+class GroupBy:
+    """ one metric per key(record), fed value(record) (the record itself by default) """
+
+    def __init__(self, key, make, value=None):
+        self.key = key
+        self.make = make
+        self.value = value
+        self.groups = {}
+
+    def add(self, record):
+        k = self.key(record)
+        metric = self.groups.get(k)
+        if metric is None:
+            metric = self.groups[k] = self.make()
+        metric.add(record if self.value is None else self.value(record))
+
+    def result(self):
+        """ {key: metric result}, in key order """
+        return {k: self.groups[k].result() for k in sorted(self.groups)}
+
+
+class Window:
+    """
+    Tumbling windows of consecutive records sharing key(record): each is
+    folded into one value, fold(value, record) from `start`, which goes
+    to `sink` when the next window begins.
+    """
+
+    def __init__(self, key, fold, start, sink):
+        self.key = key
+        self.fold = fold
+        self.start = start
+        self.sink = sink
+        self.current = None
+        self.value = None
+
+    def add(self, record):
+        k = self.key(record)
+        if k != self.current:
+            self.flush()
+            self.current = k
+            self.value = self.start
+        self.value = self.fold(self.value, record)
+
+    def flush(self):
+        if self.current is not None:
+            self.sink.add(self.value)
+            self.current = None
+
+    def result(self):
+        self.flush()
+        return self.sink.result()
+
+
+def feed(records, sinks):
+    """ one pass of `records` through every sink; returns how many there were """
+    adds = [sink.add for sink in sinks]
+    count = 0
+    for record in records:
+        count += 1
+        for add in adds:
+            add(record)
+    return count
+
+
+# ---------------------------
+# Reports
+# ---------------------------
+def reports():
+    """ name -> sink for the standard reports, in print order """
+    return {
+        "Bust rate by hand size": Filter(
+            DEALT + ("bust",), GroupBy(lambda r: r.size, lambda: Rate("bust"))),
+        "Score on staying by hand size": Filter(
+            ("stay",), GroupBy(lambda r: r.size, Mean, lambda r: r.score)),
+        "Round score by round": Filter(
+            ("bank",), GroupBy(lambda r: r.round, Quantiles, lambda r: r.value)),
+        "Round score by seat": Filter(
+            ("bank",), GroupBy(lambda r: r.player, Mean, lambda r: r.value)),
+        "Busts per round": Filter(
+            ("bust", "round_end"),
+            Window(lambda r: (r.game, r.round), lambda n, r: n + (r.kind == "bust"), 0,
+                   Quantiles())),
+    }
+
+
+def format_report(name, result):
+    lines = [f"{name}:"]
+    if name == "Bust rate by hand size":
+        lines += [f"  {size:>2} cards: {rate:7.2%} of {n} cards dealt"
+                  for size, (n, rate) in result.items()]
+    elif name == "Score on staying by hand size":
+        lines += [f"  {size:>2} cards: {mean:6.2f} ({n} stays)" for size, (n, mean) in result.items()]
+    elif name == "Round score by round":
+        lines += [f"  Round {rnd:>3}: mean {mean:6.2f}  "
+                  + "  ".join(f"p{p * 100:.0f} {q:5.1f}" for p, q in zip(QUANTILES, qs))
+                  + f"  ({n} hands)"
+                  for rnd, (n, mean, qs) in result.items()]
+    elif name == "Round score by seat":
+        lines += [f"  Seat {seat + 1:>3}: {mean:6.2f}" for seat, (n, mean) in result.items()]
+    else:
+        n, mean, qs = result
+        lines.append(f"  mean {mean:.2f}  "
+                     + "  ".join(f"p{p * 100:.0f} {q:.1f}" for p, q in zip(QUANTILES, qs) if q is not None)
+                     + f"  ({n} rounds)")
+    return "\n".join(lines)
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def add_arguments(parser):
+    parser.add_argument("logs", nargs="*", metavar="LOG",
+                        help="analyze these --record logs instead of simulating")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--bots", default="threshold",
+                        help="comma-separated bot per seat, repeated around the table")
+
+
+def run(args):
+    if args.logs:
+        records = logged_records(args.logs)
+    else:
+        if args.games < 1:
+            raise SystemExit("--games must be at least 1")
+        if not MIN_PLAYERS <= args.players <= MAX_PLAYERS:
+            raise SystemExit(f"--players must be between {MIN_PLAYERS} and {MAX_PLAYERS}")
+        if args.seed < 0:
+            raise SystemExit("--seed must not be negative")
+        bot_specs = tuple(spec.strip() for spec in args.bots.split(",") if spec.strip())
+        if not bot_specs:
+            raise SystemExit("--bots needs at least one bot")
+        try:
+            for spec in bot_specs:
+                make_bot(spec)
+        except ValueError as exc:
+            raise SystemExit(str(exc))
+        records = simulated_records(args.games, args.players, args.seed, bot_specs)
+    sinks = reports()
+    started = time.perf_counter()
+    try:
+        count = feed(records, sinks.values())
+    except (OSError, ValueError) as exc:
+        raise SystemExit(str(exc))
+    seconds = time.perf_counter() - started
+    print(f"{count} events in {seconds:.2f}s ({count / seconds if seconds else 0:.0f} events/s)")
+    for name, sink in sinks.items():
+        print()
+        print(format_report(name, sink.result()))
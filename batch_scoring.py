@@ -0,0 +1,70 @@
+"""
+Vectorized NumPy scoring for many Flip 7 hands at once.
+
+Each hand is one row of five columns, the same packing Flip7.pack_hand
+produces for a single hand:
+
+    mask          13-bit set of the distinct number cards held
+    dup_sum       sum of number cards that repeat a number in the mask
+    dup_count     how many such repeats there are
+    modifier_sum  total of the additive (+N) modifiers
+    x2            number of x2 cards
+
+round_scores() matches calculate_round_score row for row, and
+score_hands() matches the (is_busted, is_7_unique, current_score)
+verdict of check_round_end for a hand whose last card was just drawn.
+"""
+import numpy as np
+
+from Flip7 import MASK_BONUS, MASK_COUNT, MASK_SUM, pack_hand
+
+_MASK_SUM = np.array(MASK_SUM, dtype=np.int32)
+_MASK_COUNT = np.array(MASK_COUNT, dtype=np.int8)
+_MASK_BONUS = np.array(MASK_BONUS, dtype=np.int32)
+
+
+def pack_hands(hands):
+    """ packs a sequence of card lists into (mask, dup_sum, dup_count, modifier_sum, x2) arrays """
+    packed = np.array([pack_hand(hand) for hand in hands], dtype=np.int32).reshape(-1, 5)
+    return (packed[:, 0].astype(np.uint16), packed[:, 1], packed[:, 2],
+            packed[:, 3], packed[:, 4])
+
+
+def round_scores(mask, modifier_sum, x2, dup_sum=None):
+    """ calculate_round_score for every row """
+    mask = np.asarray(mask)
+    base = _MASK_SUM[mask] + np.asarray(modifier_sum, dtype=np.int32)
+    if dup_sum is not None:
+        base += np.asarray(dup_sum, dtype=np.int32)
+    scores = np.left_shift(base, np.asarray(x2, dtype=np.int32))
+    scores += _MASK_BONUS[mask]
+    return scores
+
+
+def score_hands(mask, modifier_sum, x2, dup_count=None, second_chance=None):
+    """
+    check_round_end for every row, returned as (scores, busted, seven_unique).
+
+    A row with a repeated number is busted unless it holds a Second
+    Chance, in which case the repeat is discarded before scoring. Busted
+    rows score 0. dup_sum is not needed: busted rows score 0 and saved
+    rows have their duplicate discarded.
+    """
+    mask = np.asarray(mask)
+    counts = _MASK_COUNT[mask]
+    scores = np.left_shift(_MASK_SUM[mask] + np.asarray(modifier_sum, dtype=np.int32),
+                           np.asarray(x2, dtype=np.int32))
+    scores += _MASK_BONUS[mask]
+
+    if dup_count is None:
+        busted = np.zeros(mask.shape, dtype=bool)
+        seven_unique = counts == 7
+    else:
+        has_dup = np.asarray(dup_count) > 0
+        if second_chance is None:
+            busted = has_dup
+        else:
+            busted = has_dup & (np.asarray(second_chance) == 0)
+        seven_unique = (counts == 7) & ~has_dup
+        scores[busted] = 0
+    return scores, busted, seven_unique
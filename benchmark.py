@@ -0,0 +1,416 @@
+"""
+Micro and macro benchmarks for the game engine.
+
+Each benchmark is a factory: make(n) does the setup for n operations and
+returns a callable that performs them, so only the operations are timed.
+The runner first doubles n until one block takes at least MIN_BLOCK
+seconds, then times `repeats` blocks. Each block gives the mean time per
+operation; the report shows the fastest, median and slowest block mean,
+and ops/sec comes from the median block, which keeps one slow block from
+skewing comparisons. These are spreads of block means, not the latency
+tail of single operations: instrument.py's histograms time those.
+
+    python Flip7.py bench --json results.json
+    python Flip7.py bench --compare results.json --tolerance 0.1
+
+Everything is headless; nothing here imports Tkinter.
+"""
+import copy
+import json
+import platform
+import random
+import time
+
+from Flip7 import (ADD, DOUBLE, Deck, Flip7Game, Hand, calculate_round_score, check_round_end,
+                   deck_of_cards, effect_of)
+from gamestate import capture, restore
+
+MIN_BLOCK = 0.005
+REPEATS = 20
+TOLERANCE = 0.10
+STAY_AT = 20
+# distinct hands generated per scoring benchmark; blocks cycle through them
+POOL = 1000
+
+
+# ---------------------------
+# Fixtures
+# ---------------------------
+def deck_at(depth, seed=0):
+    """ a deck with `depth` cards left to draw; depth 0 forces a reshuffle on the next draw """
+    deck = Deck(seed=seed)
+    while len(deck.draw_pile) > depth:
+        deck.draw()
+    deck.discard_in_play()
+    return deck
+
+
+def copy_deck(deck):
+    clone = Deck.__new__(Deck)
+    clone.cards = deck.cards
+    clone.rng = random.Random(len(deck.draw_pile))
+    clone.draw_pile = list(deck.draw_pile)
+    clone.in_play = set(deck.in_play)
+    clone.discard_pile = set(deck.discard_pile)
+    return clone
+
+
+MODIFIERS = [value for value in deck_of_cards if effect_of(value)[0] in (ADD, DOUBLE)]
+
+
+def sample_hands(size, count, seed=0):
+    """ `count` hands of `size` cards: distinct numbers plus up to two modifiers """
+    rng = random.Random(seed)
+    hands = []
+    for _ in range(count):
+        modifiers = rng.randint(0, min(2, size - 1))
+        hand = rng.sample(range(13), size - modifiers) + rng.sample(MODIFIERS, modifiers)
+        rng.shuffle(hand)
+        hands.append(hand)
+    return hands
+
+
+def play_policy(game):
+    """ one move for whoever is up: hit below STAY_AT, aim actions at the next open seat """
+    if game.pending_action is not None:
+        source = game.pending_action[1]
+        target = next((p for p in range(game.num_players)
+                       if p != source and p not in game.finished_players), source)
+        game.resolve_action(source, target)
+    elif calculate_round_score(game.cards_in_hand[game.current_player]) >= STAY_AT:
+        game.stay(game.current_player)
+    else:
+        game.hit(game.current_player)
+
+
+def mid_round(players, seed=0):
+    """ a game one move per seat into its first round, waiting on a hit or stay """
+    game = Flip7Game(players, seed=seed)
+    game.start_round()
+    moves = 0
+    while game.round_active and (moves < players or game.pending_action is not None):
+        play_policy(game)
+        moves += 1
+    return game
+
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+def bench_draw(depth):
+    template = deck_at(depth)
+
+    def make(n):
+        decks = [copy_deck(template) for _ in range(n)]
+
+        def run():
+            for deck in decks:
+                deck.draw()
+        return run
+    return make
+
+
+def bench_score(size, as_hand):
+    pool = []
+
+    def make(n):
+        if not pool:
+            pool.extend(sample_hands(size, POOL))
+            if as_hand:
+                pool[:] = [Hand(hand) for hand in pool]
+        hands = (pool * (n // POOL + 1))[:n]
+
+        def run():
+            for hand in hands:
+                calculate_round_score(hand)
+        return run
+    return make
+
+
+def bench_check(size):
+    pool = []
+
+    def make(n):
+        # hands without duplicates come back from check_round_end unchanged,
+        # so one pool serves every block
+        if not pool:
+            pool.extend(Hand(hand) for hand in sample_hands(size, POOL))
+        hands = (pool * (n // POOL + 1))[:n]
+
+        def run():
+            for p, hand in enumerate(hands):
+                check_round_end(p, hand)
+        return run
+    return make
+
+
+def bench_hit(players):
+    """ Flip7Game.hit for the first player of a fresh round: draw, checks, next_turn """
+    def make(n):
+        games = []
+        for seed in range(n):
+            game = Flip7Game(players, seed=seed)
+            game.start_round()
+            games.append(game)
+
+        def run():
+            for game in games:
+                game.hit(0)
+        return run
+    return make
+
+
+def bench_next_turn(players):
+    """ next_turn with half the table finished """
+    def make(n):
+        game = Flip7Game(players, seed=0)
+        game.start_round()
+        for p in range(0, players, 2):
+            game._finish(p)
+
+        def run():
+            next_turn, flush = game.next_turn, game._flush
+            for _ in range(n):
+                next_turn()
+                # hand the turn event over, as hit() and stay() do
+                flush()
+        return run
+    return make
+
+
+def bench_fork_state(players):
+    """ a hit on an immutable GameState: the old state stays usable, as in a search """
+    def make(n):
+        state = capture(mid_round(players))
+
+        def run():
+            for _ in range(n):
+                state.hit()
+        return run
+    return make
+
+
+def bench_fork_deepcopy(players):
+    """ the same fork done by copying the live game first """
+    def make(n):
+        game = mid_round(players)
+
+        def run():
+            for _ in range(n):
+                copy.deepcopy(game).hit()
+        return run
+    return make
+
+
+def bench_capture(players):
+    """ the undo snapshot taken after one seat's move, sharing everyone else's hand """
+    def make(n):
+        game = mid_round(players)
+        previous = capture(game)
+        changed = {game.current_player}
+
+        def run():
+            for _ in range(n):
+                capture(game, previous, changed)
+        return run
+    return make
+
+
+def bench_restore(players):
+    def make(n):
+        game = mid_round(players)
+        state = capture(game)
+
+        def run():
+            for _ in range(n):
+                restore(state, game)
+        return run
+    return make
+
+
+def bench_round(players):
+    def make(n):
+        games = [Flip7Game(players, seed=seed) for seed in range(n)]
+
+        def run():
+            for game in games:
+                game.start_round()
+                while game.round_active:
+                    play_policy(game)
+        return run
+    return make
+
+
+def bench_game(players):
+    def make(n):
+        games = [Flip7Game(players, seed=seed) for seed in range(n)]
+
+        def run():
+            for game in games:
+                while game.winner is None:
+                    game.start_round()
+                    while game.round_active:
+                        play_policy(game)
+        return run
+    return make
+
+
+def benchmarks():
+    """ name -> factory, in report order """
+    suite = {}
+    for depth in (94, 47, 1, 0):
+        suite[f"draw/depth={depth}"] = bench_draw(depth)
+    for size in range(1, 10):
+        suite[f"score/list/size={size}"] = bench_score(size, as_hand=False)
+        suite[f"score/hand/size={size}"] = bench_score(size, as_hand=True)
+        suite[f"check_round_end/size={size}"] = bench_check(size)
+    for players in (3, 10, 18, 100):
+        suite[f"hit/players={players}"] = bench_hit(players)
+        suite[f"next_turn/players={players}"] = bench_next_turn(players)
+    for players in (3, 18, 100):
+        suite[f"fork/state/players={players}"] = bench_fork_state(players)
+        suite[f"fork/deepcopy/players={players}"] = bench_fork_deepcopy(players)
+        suite[f"undo/capture/players={players}"] = bench_capture(players)
+        suite[f"undo/restore/players={players}"] = bench_restore(players)
+    for players in (3, 10, 18):
+        suite[f"round/players={players}"] = bench_round(players)
+    for players in (3, 6):
+        suite[f"game/players={players}"] = bench_game(players)
+    return suite
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _time(make, n):
+    run = make(n)
+    started = time.perf_counter()
+    run()
+    return time.perf_counter() - started
+
+
+def measure(make, repeats=REPEATS, min_block=MIN_BLOCK):
+    """ times `repeats` calibrated blocks; returns the result dict for one benchmark """
+    n = 1
+    while _time(make, n) < min_block and n < 1 << 20:
+        n *= 2
+    blocks = sorted(_time(make, n) / n for _ in range(repeats))
+    return {
+        "ops_per_sec": 1 / _percentile(blocks, 0.50),
+        # mean microseconds per operation of the fastest, median and slowest block
+        "block_min_us": blocks[0] * 1e6,
+        "block_median_us": _percentile(blocks, 0.50) * 1e6,
+        "block_max_us": blocks[-1] * 1e6,
+        "ops_per_block": n,
+        "blocks": repeats,
+    }
+
+
+def selected(name, names):
+    """ whether a NAME filter from the command line picks this benchmark """
+    return not names or any(part in name for part in names)
+
+
+def run_suite(names=None, repeats=REPEATS, min_block=MIN_BLOCK, progress=None):
+    results = {}
+    for name, make in benchmarks().items():
+        if not selected(name, names):
+            continue
+        results[name] = measure(make, repeats, min_block)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=TOLERANCE, names=None):
+    """
+    (name, baseline ops/s, current ops/s, ratio, regressed) for every
+    baseline benchmark the NAME filter selects; one the current run lacks
+    has None for current and ratio and counts as regressed
+    """
+    rows = []
+    for name, base in baseline["results"].items():
+        if not selected(name, names):
+            continue
+        result = current["results"].get(name)
+        if result is None:
+            rows.append((name, base["ops_per_sec"], None, None, True))
+            continue
+        ratio = result["ops_per_sec"] / base["ops_per_sec"]
+        rows.append((name, base["ops_per_sec"], result["ops_per_sec"], ratio,
+                     ratio < 1 - tolerance))
+    return rows
+
+
+# ---------------------------
+# Report / CLI
+# ---------------------------
+def format_result(name, result):
+    return (f"{name:<28} {result['ops_per_sec']:>14,.0f} ops/s   us/op per block: "
+            f"min {result['block_min_us']:>10.3f}  median {result['block_median_us']:>10.3f}  "
+            f"max {result['block_max_us']:>10.3f}")
+
+
+def format_comparison(rows, tolerance):
+    lines = [f"{'benchmark':<28} {'baseline':>14} {'current':>14} {'change':>8}"]
+    for name, base, current, ratio, regressed in rows:
+        if current is None:
+            lines.append(f"{name:<28} {base:>14,.0f} {'-':>14} {'':>8}  MISSING")
+            continue
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{name:<28} {base:>14,.0f} {current:>14,.0f} {ratio - 1:>+8.1%}{flag}")
+    missing = sum(1 for row in rows if row[2] is None)
+    regressions = sum(1 for row in rows if row[4]) - missing
+    lines.append(f"{regressions} of {len(rows)} benchmarks slower than the baseline "
+                 f"by more than {tolerance:.0%}")
+    if missing:
+        lines.append(f"{missing} baseline benchmarks missing from this run")
+    return "\n".join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument("names", nargs="*",
+                        help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help="timed blocks per benchmark (default: %(default)s)")
+    parser.add_argument("--min-block", type=float, default=MIN_BLOCK, metavar="SECONDS",
+                        help="calibrate each block to take at least this long")
+    parser.add_argument("--json", metavar="PATH", help="write the results to this file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare against a saved --json run; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown before a benchmark counts as regressed "
+                             "(default: %(default)s)")
+
+
+def run(args):
+    if args.repeats < 1:
+        raise SystemExit("--repeats must be at least 1")
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    current = run_suite(args.names, args.repeats, args.min_block,
+                        progress=lambda name, result: print(format_result(name, result),
+                                                            flush=True))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(current, f, indent=2)
+    if baseline is not None:
+        rows = compare(current, baseline, args.tolerance, args.names)
+        print()
+        print(format_comparison(rows, args.tolerance))
+        if any(row[4] for row in rows):
+            raise SystemExit(1)
@@ -0,0 +1,188 @@
+"""
+Computer players for Flip 7.
+
+A bot gets an immutable Flip7Game.snapshot() and returns "hit", "stay",
+or, when snapshot.pending_action is "Freeze" or "Flip Three", the seat
+to aim it at. decide_batch() takes the snapshots of many tables at once
+so the simulator can amortize a bot's work. The default just loops, and
+bots with a cheaper vectorized path override it.
+"""
+import os
+import random
+
+from Flip7 import calculate_round_score
+import odds
+import policy
+
+
+class Bot:
+    """ base strategy: subclasses override hit_or_stay() """
+    name = "bot"
+
+    def decide(self, snapshot):
+        if snapshot.pending_action is not None:
+            return self.choose_target(snapshot)
+        return self.hit_or_stay(snapshot)
+
+    def decide_batch(self, snapshots):
+        return [self.decide(snapshot) for snapshot in snapshots]
+
+    def hit_or_stay(self, snapshot):
+        raise NotImplementedError
+
+    def choose_target(self, snapshot):
+        """ aim actions at the unfinished opponent with the highest total """
+        me = snapshot.player
+        best = me
+        for p in range(snapshot.num_players):
+            if p == me or p in snapshot.finished:
+                continue
+            if best == me or snapshot.scores[p] > snapshot.scores[best]:
+                best = p
+        return best
+
+    def __repr__(self):
+        return self.name
+
+
+class ThresholdBot(Bot):
+    """ hits until the round score reaches stay_at """
+    name = "threshold"
+
+    def __init__(self, stay_at=20):
+        self.stay_at = int(stay_at)
+
+    def hit_or_stay(self, snapshot):
+        score = calculate_round_score(snapshot.hands[snapshot.player])
+        return "stay" if score >= self.stay_at else "hit"
+
+    def __repr__(self):
+        return f"threshold:{self.stay_at}"
+
+
+class ProbabilityBot(Bot):
+    """
+    Uses the exact odds from the odds module: hits while the expected
+    score of hitting beats staying and the bust chance is at most max_bust.
+    """
+    name = "probability"
+
+    def __init__(self, max_bust=1.0, depth=1):
+        self.max_bust = float(max_bust)
+        self.depth = int(depth)
+
+    def hit_or_stay(self, snapshot):
+        o = odds.hand_odds(snapshot.hands[snapshot.player], snapshot.unseen, self.depth)
+        if o.advice == "hit" and o.bust_probability <= self.max_bust:
+            return "hit"
+        return "stay"
+
+    def decide_batch(self, snapshots):
+        # identical (hand, unseen) pairs are common across tables early in a round
+        seen = {}
+        decisions = []
+        for snapshot in snapshots:
+            if snapshot.pending_action is not None:
+                decisions.append(self.choose_target(snapshot))
+                continue
+            key = (snapshot.hands[snapshot.player], snapshot.unseen)
+            if key not in seen:
+                seen[key] = self.hit_or_stay(snapshot)
+            decisions.append(seen[key])
+        return decisions
+
+    def __repr__(self):
+        return f"probability:{self.max_bust:g}"
+
+
+class SearchBot(ProbabilityBot):
+    """ exact odds for hit / stay; Monte Carlo rollouts to aim Freeze and Flip Three """
+    name = "search"
+
+    def __init__(self, rollouts=200, seed=None):
+        super().__init__()
+        self.rollouts = int(rollouts)
+        if self.rollouts < 1:
+            raise ValueError("search needs at least one rollout")
+        self.seed = seed
+        self.advisor = None
+
+    def choose_target(self, snapshot):
+        if self.advisor is None:
+            import advisor
+            # one process: the simulator already runs a set of bots per worker;
+            # a rollout count, not a time budget, so a seeded run plays the same every time
+            self.advisor = advisor.Advisor(workers=1, seed=self.seed, rollouts=self.rollouts)
+        ranked = self.advisor.advise(snapshot)
+        return ranked[0].target if ranked else snapshot.player
+
+    def __repr__(self):
+        return f"search:{self.rollouts}"
+
+
+class PolicyBot(Bot):
+    """ looks every decision up in the table written by `Flip7.py solve` """
+    name = "policy"
+
+    def __init__(self, path=policy.DEFAULT_PATH):
+        self.path = path
+        if not os.path.exists(path):
+            raise ValueError(f"no policy table at {path}; run `python Flip7.py solve` first")
+
+    def hit_or_stay(self, snapshot):
+        # the table is mapped on the first decision, once per process
+        table = policy.get_policy(self.path)
+        return table.decide(snapshot.hands[snapshot.player], snapshot.unseen)
+
+    def __repr__(self):
+        return "policy" if self.path == policy.DEFAULT_PATH else f"policy:{self.path}"
+
+
+class RandomBot(Bot):
+    """ hits with probability hit_chance and targets a random unfinished seat """
+    name = "random"
+
+    def __init__(self, hit_chance=0.5, seed=None):
+        self.hit_chance = float(hit_chance)
+        self.rng = random.Random(seed)
+
+    def hit_or_stay(self, snapshot):
+        return "hit" if self.rng.random() < self.hit_chance else "stay"
+
+    def choose_target(self, snapshot):
+        seats = [p for p in range(snapshot.num_players) if p not in snapshot.finished]
+        return self.rng.choice(seats)
+
+    def __repr__(self):
+        return f"random:{self.hit_chance:g}"
+
+
+BOTS = {
+    "threshold": ThresholdBot,
+    "probability": ProbabilityBot,
+    "policy": PolicyBot,
+    "search": SearchBot,
+    "random": RandomBot,
+}
+
+
+def make_bot(spec, seed=None):
+    """ builds a bot from "name" or "name:arg", e.g. "threshold:25" """
+    name, _, arg = spec.partition(":")
+    if name not in BOTS:
+        raise ValueError(f"unknown bot {name!r} (choose from {', '.join(BOTS)})")
+    args = [arg] if arg else []
+    if name in ("random", "search"):
+        return BOTS[name](*args, seed=seed)
+    return BOTS[name](*args)
+
+
+def apply_decision(game, decision):
+    """ plays a bot's decision on a Flip7Game and returns the events """
+    if game.pending_action is not None:
+        return game.resolve_action(game.pending_action[1], decision)
+    if decision == "hit":
+        return game.hit(game.current_player)
+    if decision == "stay":
+        return game.stay(game.current_player)
+    raise ValueError(f"bad decision {decision!r}")
@@ -0,0 +1,235 @@
+"""
+Save and resume an in-progress game.
+
+A save file is MAGIC, a version byte and these sections:
+
+    <I rules>                            fingerprint of the rules played
+    <Q uid>                              Flip7Game.uid, 0 for none (not in
+                                         version 2 files)
+    <H players> <B count> card names     value codec, as in gamelog
+    <I length> state                     gamelog.encode_state payload
+    <H flip target> <B flips left>       a Flip Three being dealt
+    <H draw> <H discard> <H in play>     deck pile sizes, then the keys
+                                         as uint16, draw pile in order
+    <H words> <I>*words <B> [<d>]        deck RNG state (+ gauss_next)
+    <H bots> (<H seat> <B len> spec)*    computer players, as make_bot specs
+
+so a resumed game deals exactly the cards the original would have.
+Loading checks that the piles hold every card of the shoe exactly once
+and that every card in a hand is in play.
+
+Autosaver writes files off the Tk thread: the GUI encodes the whole
+state each time (about 3 KB, tens of microseconds; no deltas) and the
+writer thread replaces the file atomically, keeping only the newest
+state if saves queue up.
+"""
+import os
+import struct
+import threading
+from collections import Counter
+
+from Flip7 import RULES, data_path, make_data_dir
+from gamelog import _Codec, _card_names, _seat, _unseat, decode_state, encode_state
+
+MAGIC = b"F7SAVE"
+VERSION = 3
+# still read: version 2 files have no uid
+OLD_VERSIONS = (2,)
+DEFAULT_PATH = data_path("flip7.sav")
+
+_HEAD = struct.Struct("<HB")
+_RULES = struct.Struct("<I")
+_UID = struct.Struct("<Q")
+_LENGTH = struct.Struct("<I")
+_FLIP = struct.Struct("<HB")
+_PILES = struct.Struct("<HHH")
+_COUNT = struct.Struct("<H")
+
+
+def encode_game(game, bots=None):
+    """ the whole table as bytes; bots maps seat -> bot """
+    codec = _Codec(_card_names())
+    deck = game.deck
+    parts = [MAGIC, bytes([VERSION]), _RULES.pack(RULES.fingerprint), _UID.pack(game.uid or 0),
+             _HEAD.pack(game.num_players, len(codec.names))]
+    for name in codec.names:
+        raw = name.encode()
+        parts.append(bytes([len(raw)]) + raw)
+
+    state = encode_state(game, codec, 0)
+    parts.append(_LENGTH.pack(len(state)) + state)
+    parts.append(_FLIP.pack(_seat(game.flip_target), game.flips_left))
+
+    draw, discard, in_play = deck.draw_pile, sorted(deck.discard_pile), sorted(deck.in_play)
+    parts.append(_PILES.pack(len(draw), len(discard), len(in_play)))
+    keys = draw + discard + in_play
+    parts.append(struct.pack(f"<{len(keys)}H", *keys))
+
+    version, words, gauss = deck.rng.getstate()
+    parts.append(struct.pack(f"<HI{len(words)}I", len(words), version, *words))
+    parts.append(b"\x00" if gauss is None else b"\x01" + struct.pack("<d", gauss))
+
+    bots = bots or {}
+    parts.append(_COUNT.pack(len(bots)))
+    for seat, bot in sorted(bots.items()):
+        spec = repr(bot).encode()
+        parts.append(struct.pack("<HB", seat, len(spec)) + spec)
+    return b"".join(parts)
+
+
+def decode_game(data):
+    """ (Flip7Game, {seat: bot spec}) from encode_game bytes; ValueError if they are damaged """
+    try:
+        return _decode_game(data)
+    except (struct.error, IndexError, KeyError, UnicodeDecodeError) as exc:
+        raise ValueError(f"damaged or truncated save file ({exc})") from exc
+
+
+def _decode_game(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a Flip 7 save file")
+    version = data[len(MAGIC)]
+    if version != VERSION and version not in OLD_VERSIONS:
+        raise ValueError(f"save file version {version} is not supported (expected {VERSION})")
+    offset = len(MAGIC) + 1
+    (fingerprint,) = _RULES.unpack_from(data, offset)
+    if fingerprint != RULES.fingerprint:
+        raise ValueError("the game was saved under other rules; use the same --rules file")
+    offset += _RULES.size
+    uid = None
+    if version >= 3:
+        (uid,) = _UID.unpack_from(data, offset)
+        offset += _UID.size
+    num_players, count = _HEAD.unpack_from(data, offset)
+    offset += _HEAD.size
+    names = []
+    for _ in range(count):
+        size = data[offset]
+        names.append(data[offset + 1:offset + 1 + size].decode())
+        offset += 1 + size
+
+    (size,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    game, _ = decode_state(data[offset:offset + size], _Codec(names), num_players)
+    game.uid = uid or None
+    offset += size
+    flip_target, game.flips_left = _FLIP.unpack_from(data, offset)
+    game.flip_target = _unseat(flip_target)
+    offset += _FLIP.size
+
+    draw, discard, in_play = _PILES.unpack_from(data, offset)
+    offset += _PILES.size
+    keys = struct.unpack_from(f"<{draw + discard + in_play}H", data, offset)
+    offset += 2 * len(keys)
+    deck = game.deck
+    if sorted(keys) != list(range(len(deck.cards))):
+        raise ValueError("damaged save file (the piles do not hold every card once)")
+    deck.draw_pile = list(keys[:draw])
+    deck.discard_pile = set(keys[draw:draw + discard])
+    deck.in_play = set(keys[draw + discard:])
+    held = Counter(card for hand in game.cards_in_hand.values() for card in hand)
+    if held - Counter(deck.cards[key] for key in deck.in_play):
+        raise ValueError("damaged save file (a hand holds a card that is not in play)")
+
+    (words,) = _COUNT.unpack_from(data, offset)
+    state = struct.unpack_from(f"<I{words}I", data, offset + 2)
+    offset += 2 + 4 * (words + 1)
+    gauss = None
+    if data[offset]:
+        (gauss,) = struct.unpack_from("<d", data, offset + 1)
+        offset += 8
+    offset += 1
+    deck.rng.setstate((state[0], state[1:], gauss))
+
+    (count,) = _COUNT.unpack_from(data, offset)
+    offset += 2
+    bots = {}
+    for _ in range(count):
+        seat, size = struct.unpack_from("<HB", data, offset)
+        bots[seat] = data[offset + 3:offset + 3 + size].decode()
+        offset += 3 + size
+    if offset != len(data):
+        raise ValueError("damaged or truncated save file (wrong length)")
+    return game, bots
+
+
+def write_atomic(path, data):
+    """ a crash mid-write leaves the previous save in place """
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def save(path, game, bots=None):
+    write_atomic(path, encode_game(game, bots))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return decode_game(f.read())
+
+
+class Autosaver:
+    """ writes the newest submitted save on a background thread """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        make_data_dir(path)
+        self.pending = None
+        self.busy = False
+        self.closed = False
+        # the last failed write, until take_error() hands it to the GUI
+        self.error = None
+        self.lock = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, data):
+        with self.lock:
+            self.pending = data
+            self.lock.notify()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while self.pending is None and not self.closed:
+                    self.lock.wait()
+                if self.pending is None:
+                    return
+                data, self.pending = self.pending, None
+                self.busy = True
+            try:
+                write_atomic(self.path, data)
+            except OSError as exc:
+                with self.lock:
+                    self.error = exc
+            with self.lock:
+                self.busy = False
+                self.lock.notify_all()
+
+    def take_error(self):
+        """ the OSError of the last failed write, once; None if there was none """
+        with self.lock:
+            error, self.error = self.error, None
+        return error
+
+    def flush(self):
+        """ blocks until everything submitted so far is on disk """
+        with self.lock:
+            while self.pending is not None or self.busy:
+                self.lock.wait()
+
+    def discard(self):
+        """ drops the save file, e.g. once the game has a winner """
+        self.flush()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.thread.join()
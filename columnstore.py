@@ -0,0 +1,320 @@
+"""
+Columnar, memory-mapped results for very large simulation runs.
+
+A result directory holds one shard per simulator process. A shard is a
+directory of raw little-endian column files plus a meta.json giving the
+row count and dtype of each column:
+
+    hands   one row per player per round
+            seed, players, seat, round, score (banked, 0 for a bust),
+            busted, seven_unique, drawn (cards dealt), freezes,
+            flip_threes (actions aimed), second_chances (used)
+    games   one row per game
+            seed, players, winner (-1 if abandoned), rounds, busts
+
+ShardWriter fills its columns through np.memmap as rounds end and
+trims the files to their rows after every chunk of games, so a shard on
+disk is always complete up to its meta.json. ColumnStore opens every
+shard as read-only memmaps: nothing is parsed or copied, and the
+reports reduce shard by shard.
+
+    python Flip7.py simulate --games 1000000 --columns results/
+    python Flip7.py columns results/ --players 4
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from Flip7 import RULES
+
+VERSION = 1
+META = "meta.json"
+# rows added to every column whenever a shard runs out of room
+GROW = 1 << 16
+
+HAND_COLUMNS = (
+    ("seed", "<u8"),
+    ("players", "<u2"),
+    ("seat", "<u2"),
+    ("round", "<u2"),
+    ("score", "<i4"),
+    ("busted", "?"),
+    ("seven_unique", "?"),
+    ("drawn", "u1"),
+    ("freezes", "u1"),
+    ("flip_threes", "u1"),
+    ("second_chances", "u1"),
+)
+GAME_COLUMNS = (
+    ("seed", "<u8"),
+    ("players", "<u2"),
+    ("winner", "<i2"),
+    ("rounds", "<u2"),
+    ("busts", "<u4"),
+)
+TABLES = {"hands": HAND_COLUMNS, "games": GAME_COLUMNS}
+
+
+# ---------------------------
+# Writing
+# ---------------------------
+class _TableWriter:
+    """ the column files of one table, mapped with room to spare while rows arrive """
+
+    def __init__(self, directory, name, columns):
+        self.columns = columns
+        self.paths = {col: os.path.join(directory, f"{name}.{col}") for col, _ in columns}
+        self.rows = 0
+        self.capacity = 0
+        self.arrays = {}
+        for path in self.paths.values():
+            open(path, "wb").close()
+
+    def _truncate(self, capacity):
+        self.arrays.clear()
+        self.capacity = capacity
+        for col, dtype in self.columns:
+            with open(self.paths[col], "r+b") as f:
+                f.truncate(capacity * np.dtype(dtype).itemsize)
+
+    def append(self, values):
+        """ values: {column: equal-length sequence} """
+        count = len(values[self.columns[0][0]])
+        end = self.rows + count
+        if end > self.capacity:
+            self.flush()
+            self._truncate(end + GROW)
+        if not self.arrays:
+            self.arrays = {col: np.memmap(self.paths[col], dtype, mode="r+", shape=(self.capacity,))
+                           for col, dtype in self.columns}
+        for col, column in values.items():
+            self.arrays[col][self.rows:end] = column
+        self.rows = end
+
+    def flush(self):
+        for array in self.arrays.values():
+            array.flush()
+
+    def trim(self):
+        """ drops the spare room; the next append maps the files again """
+        self.flush()
+        self._truncate(self.rows)
+
+    def meta(self):
+        return {"rows": self.rows, "columns": [list(column) for column in self.columns]}
+
+
+class ShardWriter:
+    """ one process's shard of a result directory """
+
+    def __init__(self, root):
+        os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix="shard-", dir=root)
+        self.hands = _TableWriter(self.path, "hands", HAND_COLUMNS)
+        self.games = _TableWriter(self.path, "games", GAME_COLUMNS)
+
+    def watch(self, game, seed):
+        """ appends a row per seat for every round `game` banks from now on """
+        n = game.num_players
+        seats = list(range(n))
+        counts = {}
+
+        def on_event(event):
+            kind, p = event.kind, event.player
+            if kind == "round_start":
+                for col in ("score", "drawn", "freezes", "flip_threes", "second_chances"):
+                    counts[col] = [0] * n
+                counts["seven_unique"] = [False] * n
+            elif not counts:
+                return  # watching began mid-round
+            elif kind == "draw" or kind == "flip":
+                counts["drawn"][p] += 1
+            elif kind == "seven_unique":
+                counts["seven_unique"][p] = True
+            elif kind == "second_chance_used":
+                counts["second_chances"][p] += 1
+            elif kind == "freeze":
+                counts["freezes"][p] += 1
+            elif kind == "flip_three":
+                counts["flip_threes"][p] += 1
+            elif kind == "bank":
+                counts["score"][p] = event.value
+            elif kind == "round_end":
+                busted = game.busted_players
+                self.hands.append(dict(
+                    counts, seed=[seed] * n, players=[n] * n, seat=seats,
+                    round=[event.value] * n, busted=[p in busted for p in seats]))
+
+        game.subscribe(on_event)
+
+    def add_game(self, seed, players, winner, rounds, busts):
+        self.games.append({"seed": [seed], "players": [players],
+                           "winner": [-1 if winner is None else winner],
+                           "rounds": [rounds], "busts": [busts]})
+
+    def sync(self):
+        """ trims the columns to their rows and writes meta.json, so readers see a whole shard """
+        self.hands.trim()
+        self.games.trim()
+        meta = {"version": VERSION, "rules": RULES.fingerprint,
+                "tables": {"hands": self.hands.meta(), "games": self.games.meta()}}
+        temp = os.path.join(self.path, META + ".tmp")
+        with open(temp, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp, os.path.join(self.path, META))
+
+
+_writers = {}
+
+
+def shard_writer(root):
+    """ this process's ShardWriter for `root`, made on first use """
+    writer = _writers.get(root)
+    if writer is None:
+        writer = _writers[root] = ShardWriter(root)
+    return writer
+
+
+# ---------------------------
+# Reading
+# ---------------------------
+def _open_column(path, dtype, rows):
+    if not rows:
+        return np.empty(0, dtype)
+    return np.memmap(path, dtype, mode="r", shape=(rows,))
+
+
+class ColumnStore:
+    """ every finished shard under `root`, as read-only memmaps """
+
+    def __init__(self, root):
+        self.root = root
+        self.shards = []
+        rules = set()
+        for name in sorted(os.listdir(root)):
+            meta_path = os.path.join(root, name, META)
+            if not os.path.exists(meta_path):
+                continue  # a shard whose first chunk is still running
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["version"] != VERSION:
+                raise ValueError(f"{meta_path} has version {meta['version']}, expected {VERSION}")
+            rules.add(meta["rules"])
+            self.shards.append({
+                table: {col: _open_column(os.path.join(root, name, f"{table}.{col}"), dtype,
+                                          info["rows"])
+                        for col, dtype in info["columns"]}
+                for table, info in meta["tables"].items()})
+        if len(rules) > 1:
+            raise ValueError(f"{root} mixes results from different rules")
+        self.rules = rules.pop() if rules else RULES.fingerprint
+
+    def rows(self, table):
+        return sum(len(shard[table]["seed"]) for shard in self.shards)
+
+    def columns(self, table, *names):
+        """ per shard, a tuple of the named columns; no copies """
+        for shard in self.shards:
+            yield tuple(shard[table][name] for name in names)
+
+    def column(self, table, name):
+        """ one column of the whole store in a single (copied) array """
+        parts = [shard[table][name] for shard in self.shards]
+        return np.concatenate(parts) if parts else np.empty(0, dict(TABLES[table])[name])
+
+
+# ---------------------------
+# Reports
+# ---------------------------
+def _sum_counts(pairs):
+    """ adds up (keys, weights) bincounts of different lengths """
+    total = np.zeros(0)
+    for keys, weights in pairs:
+        counts = np.bincount(keys, weights).astype(np.float64, copy=False)
+        if len(counts) > len(total):
+            counts[:len(total)] += total
+            total = counts
+        else:
+            total[:len(counts)] += counts
+    return total
+
+
+def _rates(store, table, key, value, where=None):
+    """ (key, rows, mean of value) for every key that occurs """
+    pairs, weights = [], []
+    for columns in store.columns(table, key, value, *([where[0]] if where else [])):
+        keys, values = columns[0], columns[1]
+        if where:
+            mask = columns[2] == where[1]
+            keys, values = keys[mask], values[mask]
+        pairs.append((keys, None))
+        weights.append((keys, values.astype(np.float64)))
+    counts, sums = _sum_counts(pairs), _sum_counts(weights)
+    return [(k, int(counts[k]), sums[k] / counts[k]) for k in np.flatnonzero(counts)]
+
+
+def bust_rate_by_drawn(store):
+    return _rates(store, "hands", "drawn", "busted")
+
+
+def round_score_by_round(store):
+    return _rates(store, "hands", "round", "score")
+
+
+def action_rates(store):
+    """ per hand: (7 unique, Second Chances used, Freezes aimed, Flip Threes aimed) """
+    rows = store.rows("hands")
+    sums = [0, 0, 0, 0]
+    for columns in store.columns("hands", "seven_unique", "second_chances", "freezes",
+                                 "flip_threes"):
+        for i, column in enumerate(columns):
+            sums[i] += int(column.sum(dtype=np.int64))
+    return [s / rows if rows else 0.0 for s in sums]
+
+
+def win_rate_by_seat(store, players):
+    games = 0
+    wins = np.zeros(players)
+    for counts, winner in store.columns("games", "players", "winner"):
+        mine = winner[counts == players]
+        games += len(mine)
+        won = np.bincount(mine[mine >= 0], minlength=players)
+        wins += won[:players]
+    return [(seat, wins[seat] / games if games else 0.0) for seat in range(players)]
+
+
+def format_report(store, players=None):
+    games, hands = store.rows("games"), store.rows("hands")
+    lines = [f"{games} games, {hands} hands in {len(store.shards)} shards under {store.root}",
+             "", "Bust rate by cards drawn:"]
+    lines += [f"  {drawn:>2} cards: {rate:7.2%} of {n} hands"
+              for drawn, n, rate in bust_rate_by_drawn(store)]
+    lines += ["", "Average round score by round:"]
+    lines += [f"  Round {rnd:>3}: {mean:6.2f} ({n} hands)"
+              for rnd, n, mean in round_score_by_round(store)]
+    seven, chances, freezes, flips = action_rates(store)
+    lines += ["", "Per hand:",
+              f"  7 unique {seven:.2%}  Second Chances used {chances:.3f}  "
+              f"Freezes aimed {freezes:.3f}  Flip Threes aimed {flips:.3f}"]
+    counts = sorted({int(n) for (column,) in store.columns("games", "players")
+                     for n in np.unique(column)})
+    for n in ([players] if players else counts):
+        lines += ["", f"Win rate by seat, {n} players:"]
+        lines += [f"  Seat {seat + 1:>3}: {rate:7.2%}" for seat, rate in win_rate_by_seat(store, n)]
+    return "\n".join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument("path", help="result directory written with simulate --columns")
+    parser.add_argument("--players", type=int, default=None,
+                        help="only show the seat table for this player count")
+
+
+def run(args):
+    try:
+        store = ColumnStore(args.path)
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f"cannot open {args.path}: {exc}")
+    print(format_report(store, args.players))
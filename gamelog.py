@@ -0,0 +1,355 @@
+"""
+Append-only binary game log and replayer.
+
+A log file is the magic header followed by length-prefixed records:
+
+    <H length> <B type> payload
+
+    GAME      starts a new game: player count and the card-name table
+    EVENT     one GameEvent packed into 12 bytes
+    SNAPSHOT  the full table state after a given number of events
+
+A record is at most 65535 bytes. A snapshot takes about 7 bytes per
+player plus 2 per card in hand, so this holds tables up to a few
+thousand players; the recorder raises ValueError past it.
+
+GameRecorder subscribes to a Flip7Game and appends its events, writing
+a snapshot at the first turn boundary after every SNAPSHOT_EVERY events.
+Many games can be appended to the same file. GameLog indexes a file by
+walking the length prefixes and rebuilds the state at any event by
+decoding the nearest earlier snapshot and replaying forward with
+Flip7Game.apply_event.
+"""
+import mmap
+import os
+import struct
+from bisect import bisect_right
+
+from Flip7 import Flip7Game, GameEvent, Hand, deck_of_cards
+
+MAGIC = b"F7LOG\x01"
+SNAPSHOT_EVERY = 256
+
+GAME, EVENT, SNAPSHOT = range(3)
+
+EVENT_KINDS = (
+    "round_start", "turn", "frozen", "draw", "flip", "second_chance_used",
+    "bust", "seven_unique", "stay", "action", "freeze", "flip_three",
+    "bank", "round_end", "winner",
+)
+KIND_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+SCORED_KINDS = frozenset(("draw", "flip", "second_chance_used", "bust",
+                          "seven_unique", "stay", "bank", "winner"))
+
+NO_SEAT = 0xFFFF
+NO_VALUE = -0x8000
+
+_LENGTH = struct.Struct("<H")
+MAX_RECORD = 0xFFFF
+_EVENT = struct.Struct("<BBHHhi")
+_SNAPSHOT_HEAD = struct.Struct("<BIIHHBhH")
+
+
+# ---------------------------
+# Value encoding
+# ---------------------------
+class _Codec:
+    """ maps card values to int16: ints as themselves, named cards to negatives """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.codes = {name: -1 - i for i, name in enumerate(self.names)}
+
+    def encode(self, value):
+        if value is None:
+            return NO_VALUE
+        if isinstance(value, int):
+            return value
+        return self.codes[value]
+
+    def decode(self, code):
+        if code == NO_VALUE:
+            return None
+        if code >= 0:
+            return code
+        return self.names[-1 - code]
+
+
+def _card_names():
+    names = []
+    for value in deck_of_cards:
+        if isinstance(value, str) and value not in names:
+            names.append(value)
+    return names
+
+
+def _seat(p):
+    return NO_SEAT if p is None else p
+
+
+def _unseat(p):
+    return None if p == NO_SEAT else p
+
+
+def _mask_bytes(players, num_players):
+    mask = 0
+    for p in players:
+        mask |= 1 << p
+    return mask.to_bytes((num_players + 7) // 8, "little")
+
+
+def _mask_set(data, num_players):
+    mask = int.from_bytes(data, "little")
+    return {p for p in range(num_players) if mask >> p & 1}
+
+
+# ---------------------------
+# Snapshots
+# ---------------------------
+def encode_state(game, codec, event_index):
+    """ packs everything apply_event can change into a SNAPSHOT payload """
+    n = game.num_players
+    pending_value, pending_source = NO_VALUE, NO_SEAT
+    if game.pending_action is not None:
+        pending_value = codec.encode(game.pending_action[0])
+        pending_source = game.pending_action[1]
+    parts = [
+        _SNAPSHOT_HEAD.pack(SNAPSHOT, event_index, game.round_number, game.current_player,
+                            _seat(game.winner), game.round_active, pending_value, pending_source),
+        struct.pack(f"<h{n}i", codec.encode(game.last_drawn),
+                    *(game.player_scores[p] for p in range(n))),
+        _mask_bytes(game.finished_players, n),
+        _mask_bytes(game.busted_players, n),
+        _mask_bytes(game.stayed_players, n),
+        _mask_bytes(game.skip_turn, n),
+    ]
+    for p in range(n):
+        hand = game.cards_in_hand[p]
+        parts.append(struct.pack(f"<H{len(hand)}h", len(hand), *map(codec.encode, hand)))
+    return b"".join(parts)
+
+
+def decode_state(payload, codec, num_players):
+    """ builds a Flip7Game from a SNAPSHOT payload; returns (game, event_index) """
+    n = num_players
+    (_, event_index, round_number, current, winner, round_active,
+     pending_value, pending_source) = _SNAPSHOT_HEAD.unpack_from(payload)
+    game = Flip7Game(n)
+    game.round_number = round_number
+    game.current_player = current
+    game.winner = _unseat(winner)
+    game.round_active = bool(round_active)
+    if pending_value != NO_VALUE:
+        game.pending_action = (codec.decode(pending_value), pending_source)
+
+    offset = _SNAPSHOT_HEAD.size
+    values = struct.unpack_from(f"<h{n}i", payload, offset)
+    offset += struct.calcsize(f"<h{n}i")
+    game.last_drawn = codec.decode(values[0])
+    game.player_scores = dict(enumerate(values[1:]))
+
+    width = (n + 7) // 8
+    sets = []
+    for _ in range(4):
+        sets.append(_mask_set(payload[offset:offset + width], n))
+        offset += width
+    game.finished_players, game.busted_players, game.stayed_players, game.skip_turn = sets
+    game.active_players = set(range(n))
+    game.resync()
+
+    for p in range(n):
+        (size,) = _LENGTH.unpack_from(payload, offset)
+        codes = struct.unpack_from(f"<{size}h", payload, offset + 2)
+        offset += 2 + 2 * size
+        game.cards_in_hand[p] = Hand(map(codec.decode, codes))
+    return game, event_index
+
+
+# ---------------------------
+# Writing
+# ---------------------------
+class GameRecorder:
+    """ appends the events of one game after another to a log file """
+
+    def __init__(self, path, snapshot_every=SNAPSHOT_EVERY):
+        self.snapshot_every = snapshot_every
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.codec = _Codec(_card_names())
+        self.game = None
+        self.events = 0
+        self.since_snapshot = 0
+
+    def _write(self, payload):
+        if len(payload) > MAX_RECORD:
+            raise ValueError(f"a {len(payload)}-byte record does not fit a game log "
+                             f"(at most {MAX_RECORD}); the table is too big to record")
+        self.file.write(_LENGTH.pack(len(payload)) + payload)
+
+    def record(self, game):
+        """ starts logging `game`; stops logging the previous one """
+        self.stop()
+        self.game = game
+        self.events = 0
+        self.since_snapshot = 0
+        names = b"".join(bytes([len(raw)]) + raw
+                         for raw in (name.encode() for name in self.codec.names))
+        self._write(struct.pack("<BHB", GAME, game.num_players, len(self.codec.names)) + names)
+        self._write(encode_state(game, self.codec, 0))
+        game.subscribe(self.on_event)
+
+    def on_event(self, event):
+        codec = self.codec
+        self._write(_EVENT.pack(EVENT, KIND_CODES[event.kind], _seat(event.player),
+                                _seat(event.target), codec.encode(event.value),
+                                event.score or 0))
+        self.events += 1
+        self.since_snapshot += 1
+        # turn boundaries are the points where the live state equals the replayed one
+        if (self.since_snapshot >= self.snapshot_every
+                and event.kind in ("turn", "round_start")):
+            self._write(encode_state(self.game, codec, self.events))
+            self.since_snapshot = 0
+        elif event.kind == "round_end":
+            self.file.flush()
+
+    def mark(self):
+        """ snapshot now: the game was set back (an undo), so replay picks up from here """
+        if self.game is not None:
+            self._write(encode_state(self.game, self.codec, self.events))
+            self.since_snapshot = 0
+
+    def stop(self):
+        if self.game is not None:
+            self.game.unsubscribe(self.on_event)
+            self.game = None
+            self.file.flush()
+
+    def close(self):
+        self.stop()
+        self.file.close()
+
+
+# ---------------------------
+# Reading / replay
+# ---------------------------
+class _GameIndex:
+    __slots__ = ("num_players", "codec", "start", "end", "events",
+                 "snapshot_events", "snapshot_offsets")
+
+    def __init__(self, num_players, codec, start):
+        self.num_players = num_players
+        self.codec = codec
+        self.start = start
+        self.end = start
+        self.events = 0
+        self.snapshot_events = []
+        self.snapshot_offsets = []
+
+
+class GameLog:
+    """ read-only view of a log file; indexing only touches the length prefixes """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"{path} is empty")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a Flip 7 game log")
+        self.games = []
+        self._index()
+
+    def _index(self):
+        data = self.data
+        offset = len(MAGIC)
+        end = len(data)
+        game = None
+        while offset + 3 <= end:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            body = offset + 2
+            if body + length > end:
+                break  # torn final record from an interrupted write
+            kind = data[body]
+            if game is None and kind != GAME:
+                raise ValueError(f"damaged game log: a record at byte {offset} comes before any game")
+            if kind == EVENT:
+                game.events += 1
+            elif kind == SNAPSHOT:
+                game.snapshot_events.append(game.events)
+                game.snapshot_offsets.append(body)
+            elif kind == GAME:
+                num_players, count = struct.unpack_from("<HB", data, body + 1)
+                names, pos = [], body + 4
+                for _ in range(count):
+                    size = data[pos]
+                    names.append(data[pos + 1:pos + 1 + size].decode())
+                    pos += 1 + size
+                game = _GameIndex(num_players, _Codec(names), body + length)
+                self.games.append(game)
+            offset = body + length
+            if game is not None:
+                game.end = offset
+
+    def __len__(self):
+        return len(self.games)
+
+    def _read_events(self, game, offset, count):
+        data = self.data
+        codec = game.codec
+        while count and offset < game.end:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            body = offset + 2
+            offset = body + length
+            if data[body] != EVENT:
+                continue
+            _, kind, player, target, value, score = _EVENT.unpack_from(data, body)
+            kind = EVENT_KINDS[kind]
+            yield GameEvent(kind, _unseat(player), codec.decode(value), _unseat(target),
+                            score if kind in SCORED_KINDS else None)
+            count -= 1
+
+    def events(self, game_index=0):
+        """ every event of one game, in order """
+        game = self.games[game_index]
+        return self._read_events(game, game.start, game.events)
+
+    def state_at(self, game_index=0, event_index=None):
+        """ the game's state after its first `event_index` events (default: all) """
+        game = self.games[game_index]
+        if event_index is None or event_index > game.events:
+            event_index = game.events
+        i = bisect_right(game.snapshot_events, event_index) - 1
+        body = game.snapshot_offsets[i]
+        (length,) = _LENGTH.unpack_from(self.data, body - 2)
+        state, done = decode_state(self.data[body:body + length], game.codec, game.num_players)
+        for event in self._read_events(game, body + length, event_index - done):
+            state.apply_event(event)
+        return state
+
+    def close(self):
+        self.data.close()
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def add_arguments(parser):
+    parser.add_argument("path", help="game log written with --record")
+    parser.add_argument("--game", type=int, default=0, help="game number in the file")
+    parser.add_argument("--event", type=int, default=None,
+                        help="show the state after this many events (default: the end)")
+
+
+def run(args):
+    log = GameLog(args.path)
+    if not 0 <= args.game < len(log):
+        raise SystemExit(f"{args.path} holds {len(log)} games")
+    game = log.state_at(args.game, args.event)
+    print(f"Game {args.game} of {len(log)}: {log.games[args.game].events} events")
+    print(f"Round {game.round_number}, Player {game.current_player + 1} to act"
+          + (f", Player {game.winner + 1} won" if game.winner is not None else ""))
+    for p in range(game.num_players):
+        print(f"  Player {p + 1}: total {game.player_scores[p]}, hand {game.cards_in_hand[p]}")
+    log.close()
@@ -0,0 +1,286 @@
+"""
+Immutable game states with structural sharing, for search and undo.
+
+A GameState is a namedtuple that is never changed in place. Moves
+(hit, stay, resolve, start_round) return a new state that shares
+everything the move did not touch with the old one:
+
+    hands, scores   persistent vectors: a tuple of CHUNK-sized tuples, so
+                    changing one seat copies one chunk and the spine
+    player sets     finished / busted / stayed / frozen as int bitmasks
+    deck            the draw pile is a shared tuple plus a count of cards
+                    left on it; cards in play are a linked list of keys
+
+so forking a state for a hypothetical draw allocates a handful of small
+tuples whatever the table size. The moves follow Flip7Game's rules
+without emitting events. A reshuffle takes the discards in key order,
+as Deck does, so a forked line matches the live game through
+reshuffles too.
+
+capture() takes a state from a live Flip7Game, reusing the hands of the
+seats that did not change since the previous capture, and restore()
+puts a state back into one; UndoHistory keeps the states the GUI can
+step back and forth through.
+"""
+import random
+from collections import namedtuple
+
+from Flip7 import TARGET_SCORE, Hand, calculate_round_score, check_round_end
+
+CHUNK = 32
+UNDO_LIMIT = 500
+
+
+# ---------------------------
+# Persistent vectors
+# ---------------------------
+def pvec(items):
+    items = tuple(items)
+    return tuple(items[i:i + CHUNK] for i in range(0, len(items), CHUNK))
+
+
+def pget(vec, i):
+    return vec[i // CHUNK][i % CHUNK]
+
+
+def pset(vec, i, value):
+    """ a copy of vec with item i replaced; shares every other chunk """
+    c, j = divmod(i, CHUNK)
+    chunk = vec[c]
+    return vec[:c] + (chunk[:j] + (value,) + chunk[j + 1:],) + vec[c + 1:]
+
+
+def pitems(vec):
+    for chunk in vec:
+        yield from chunk
+
+
+def _mask(seats):
+    mask = 0
+    for p in seats:
+        mask |= 1 << p
+    return mask
+
+
+def _seats(mask):
+    return {p for p in range(mask.bit_length()) if mask >> p & 1}
+
+
+def _keys(chain):
+    while chain is not None:
+        key, chain = chain
+        yield key
+
+
+# ---------------------------
+# States
+# ---------------------------
+class DeckState(namedtuple("DeckState", "cards pile top in_play discard rng")):
+    __slots__ = ()
+
+    def exhausted(self):
+        return not self.top and not self.discard
+
+
+class GameState(namedtuple("GameState",
+                           "num_players scores hands finished busted stayed frozen current "
+                           "round_number round_active pending flip_target flips_left winner "
+                           "deck")):
+    __slots__ = ()
+
+    def hand(self, p):
+        return pget(self.hands, p)
+
+    def score(self, p):
+        return pget(self.scores, p)
+
+    # moves
+    def start_round(self):
+        if self.winner is not None:
+            raise ValueError("the game is already over")
+        deck = self.deck
+        if deck.in_play is not None:
+            deck = deck._replace(in_play=None, discard=deck.discard | frozenset(_keys(deck.in_play)))
+        return self._replace(hands=pvec(() for _ in range(self.num_players)), finished=0,
+                             busted=0, stayed=0, frozen=0, current=0, round_active=True,
+                             pending=None, flip_target=None, flips_left=0, deck=deck)
+
+    def hit(self):
+        """ the state after the current player hits (or loses a frozen turn) """
+        p = self.current
+        bit = 1 << p
+        if self.frozen & bit:
+            return self._replace(frozen=self.frozen & ~bit)._next_turn()
+        if self.deck.exhausted():
+            return self._end_round()
+        state, value, done = self._deal(p)
+        if not done and value in ("Freeze", "Flip Three"):
+            return state._replace(pending=(value, p))
+        return state._next_turn()
+
+    def stay(self):
+        bit = 1 << self.current
+        return self._replace(stayed=self.stayed | bit, finished=self.finished | bit)._next_turn()
+
+    def resolve(self, target):
+        """ aims the pending action at `target`; a Flip Three is dealt in full """
+        if self.pending is None:
+            raise ValueError("no action to resolve")
+        if self.finished >> target & 1:
+            raise ValueError(f"Player {target + 1} already finished this round")
+        action = self.pending[0]
+        state = self._replace(pending=None)
+        if action == "Freeze":
+            return state._replace(frozen=state.frozen | 1 << target)._next_turn()
+        for _ in range(3):
+            if state.deck.exhausted():
+                return state._end_round()
+            state, _, done = state._deal(target)
+            if done:
+                break
+        return state._next_turn()
+
+    # rules
+    def _draw(self):
+        deck = self.deck
+        if not deck.top:
+            deck = _reshuffle(deck)
+        key = deck.pile[deck.top - 1]
+        return deck.cards[key], deck._replace(top=deck.top - 1, in_play=(key, deck.in_play))
+
+    def _deal(self, p):
+        """ (state, card, whether p busted or finished with 7 unique) """
+        value, deck = self._draw()
+        hand = list(pget(self.hands, p))
+        hand.append(value)
+        is_busted, is_7_unique, _ = check_round_end(p, hand)
+        state = self._replace(hands=pset(self.hands, p, tuple(hand)), deck=deck)
+        bit = 1 << p
+        if is_busted:
+            state = state._replace(busted=state.busted | bit, finished=state.finished | bit)
+        elif is_7_unique:
+            state = state._replace(finished=state.finished | bit)
+        return state, value, is_busted or is_7_unique
+
+    def _next_turn(self):
+        playing = ((1 << self.num_players) - 1) & ~self.finished
+        if not playing:
+            return self._end_round()
+        later = playing & ~((2 << self.current) - 1)
+        pick = later or playing
+        return self._replace(current=(pick & -pick).bit_length() - 1)
+
+    def _end_round(self):
+        totals = list(pitems(self.scores))
+        for p in range(self.num_players):
+            if not self.busted >> p & 1:
+                totals[p] += calculate_round_score(pget(self.hands, p))
+        best = max(totals)
+        winner = totals.index(best) if best >= TARGET_SCORE else None
+        return self._replace(scores=pvec(totals), round_active=False, winner=winner,
+                             round_number=self.round_number + 1)
+
+
+def _reshuffle(deck):
+    if not deck.discard:
+        raise IndexError("no cards left to draw")
+    keys = sorted(deck.discard)
+    rng = random.Random()
+    rng.setstate(deck.rng)
+    rng.shuffle(keys)
+    return deck._replace(pile=tuple(keys), top=len(keys), discard=frozenset(),
+                         rng=rng.getstate())
+
+
+# ---------------------------
+# Live games
+# ---------------------------
+def capture(game, previous=None, changed=None):
+    """
+    GameState of a live Flip7Game. Given the previous capture and the
+    seats changed since, the other seats' hands and scores are shared.
+    """
+    n = game.num_players
+    if previous is None or changed is None or previous.num_players != n:
+        hands = pvec(tuple(game.cards_in_hand[p]) for p in range(n))
+        scores = pvec(game.player_scores[p] for p in range(n))
+    else:
+        hands, scores = previous.hands, previous.scores
+        for p in changed:
+            hands = pset(hands, p, tuple(game.cards_in_hand[p]))
+            scores = pset(scores, p, game.player_scores[p])
+    deck = game.deck
+    in_play = None
+    for key in deck.in_play:
+        in_play = (key, in_play)
+    return GameState(
+        n, scores, hands, _mask(game.finished_players), _mask(game.busted_players),
+        _mask(game.stayed_players), _mask(game.skip_turn), game.current_player,
+        game.round_number, game.round_active, game.pending_action, game.flip_target,
+        game.flips_left, game.winner,
+        DeckState(deck.cards, tuple(deck.draw_pile), len(deck.draw_pile), in_play,
+                  frozenset(deck.discard_pile), deck.rng.getstate()),
+    )
+
+
+def restore(state, game):
+    """ puts `state` back into the live `game` """
+    game.player_scores = dict(enumerate(pitems(state.scores)))
+    game.cards_in_hand = {p: Hand(hand) for p, hand in enumerate(pitems(state.hands))}
+    game.finished_players = _seats(state.finished)
+    game.busted_players = _seats(state.busted)
+    game.stayed_players = _seats(state.stayed)
+    game.skip_turn = _seats(state.frozen)
+    game.active_players = set(range(state.num_players)) if state.round_active else set()
+    game.current_player = state.current
+    game.round_number = state.round_number
+    game.round_active = state.round_active
+    game.pending_action = state.pending
+    game.flip_target = state.flip_target
+    game.flips_left = state.flips_left
+    game.winner = state.winner
+    game.resync()
+    deck = game.deck
+    deck.draw_pile = list(state.deck.pile[:state.deck.top])
+    deck.in_play = set(_keys(state.deck.in_play))
+    deck.discard_pile = set(state.deck.discard)
+    deck.rng.setstate(state.deck.rng)
+
+
+class UndoHistory:
+    """ past states (the last one is the present) and undone ones to redo """
+
+    def __init__(self, limit=UNDO_LIMIT):
+        self.limit = limit
+        self.past = []
+        self.future = []
+
+    @property
+    def present(self):
+        return self.past[-1] if self.past else None
+
+    def push(self, state):
+        """ a new position: anything undone can no longer be redone """
+        self.past.append(state)
+        self.future.clear()
+        if len(self.past) > self.limit:
+            del self.past[0]
+
+    def can_undo(self):
+        return len(self.past) > 1
+
+    def can_redo(self):
+        return bool(self.future)
+
+    def undo(self):
+        if not self.can_undo():
+            return None
+        self.future.append(self.past.pop())
+        return self.past[-1]
+
+    def redo(self):
+        if not self.future:
+            return None
+        state = self.future.pop()
+        self.past.append(state)
+        return state
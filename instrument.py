@@ -0,0 +1,265 @@
+"""
+Opt-in latency histograms and event counters for the engine and GUI.
+
+Nothing is wrapped until enable() is called: it swaps the methods named
+in HOOKS for timing wrappers and wraps Flip7Game._emit to count events,
+and disable() puts the originals back. When instrumentation is off,
+the game runs its own unmodified code.
+
+Latencies go into log-linear histograms in nanoseconds, HDR style:
+SUB_BITS bits of precision per power of two, so any recorded value is
+within 1/2**SUB_BITS of its bucket's bounds whatever its magnitude.
+Memory does not grow with the number of samples.
+
+ProfileRound captures one round with cProfile.
+"""
+import cProfile
+import functools
+import json
+import time
+from collections import Counter
+
+import Flip7
+
+SUB_BITS = 4
+SUB = 1 << SUB_BITS
+
+# (owner, attribute, histogram name)
+HOOKS = [
+    (Flip7.Deck, "draw", "draw"),
+    (Flip7, "check_round_end", "score"),
+    (Flip7, "calculate_round_score", "score_hand"),
+    (Flip7.Flip7Game, "hit", "game.hit"),
+    (Flip7.Flip7Game, "stay", "game.stay"),
+    (Flip7.Flip7Game, "resolve_action", "game.resolve_action"),
+    (Flip7.Flip7Game, "next_turn", "next_turn"),
+    (Flip7.Flip7Game, "end_round_and_bank", "end_round_and_bank"),
+    (Flip7.Flip7GUI, "hit_action", "gui.hit_action"),
+    (Flip7.Flip7GUI, "stay_action", "gui.stay_action"),
+    (Flip7.Flip7GUI, "resolve_action_target", "gui.resolve_action_target"),
+    (Flip7.Flip7GUI, "update_player_status", "status_update"),
+    (Flip7.Flip7GUI, "repaint_dirty_panels", "panel_repaint"),
+]
+
+enabled = False
+histograms = {}
+counters = Counter()
+_originals = []
+
+
+# ---------------------------
+# Histogram
+# ---------------------------
+def bucket_index(value):
+    if value < SUB:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return ((shift + 1) << SUB_BITS) + (value >> shift) - SUB
+
+
+def bucket_bounds(index):
+    """ (lowest, highest) value that lands in bucket `index` """
+    if index < SUB:
+        return index, index
+    shift = (index >> SUB_BITS) - 1
+    low = ((index & (SUB - 1)) + SUB) << shift
+    return low, low + (1 << shift) - 1
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = []
+        self.count = self.total = self.max = 0
+
+    def record(self, value):
+        index = bucket_index(value)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, n in enumerate(other.counts):
+            self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        """ highest value equivalent to the given quantile """
+        if not self.count:
+            return 0
+        rank = max(1, fraction * self.count)
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def summary(self):
+        """ microseconds, rounded for display and JSON """
+        def us(ns):
+            return round(ns / 1000, 3)
+        return {
+            "count": self.count,
+            "mean_us": us(self.total / self.count) if self.count else 0.0,
+            "p50_us": us(self.percentile(0.50)),
+            "p90_us": us(self.percentile(0.90)),
+            "p99_us": us(self.percentile(0.99)),
+            "max_us": us(self.max),
+        }
+
+    def to_dict(self):
+        return {"counts": self.counts, "count": self.count, "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.count, histogram.total, histogram.max = data["count"], data["total"], data["max"]
+        return histogram
+
+
+# ---------------------------
+# Switching on and off
+# ---------------------------
+def _timed(func, histogram):
+    clock = time.perf_counter_ns
+    record = histogram.record
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(clock() - started)
+    return wrapper
+
+
+def _counted(emit):
+    @functools.wraps(emit)
+    def wrapper(self, kind, *args, **kwargs):
+        counters[kind] += 1
+        return emit(self, kind, *args, **kwargs)
+    return wrapper
+
+
+def enable():
+    """ installs the timing wrappers; bound methods taken earlier keep the old code """
+    global enabled
+    if enabled:
+        return
+    for owner, attribute, name in HOOKS:
+        original = getattr(owner, attribute)
+        _originals.append((owner, attribute, original))
+        histogram = histograms.setdefault(name, Histogram())
+        setattr(owner, attribute, _timed(original, histogram))
+    emit = Flip7.Flip7Game._emit
+    _originals.append((Flip7.Flip7Game, "_emit", emit))
+    Flip7.Flip7Game._emit = _counted(emit)
+    enabled = True
+
+
+def disable():
+    global enabled
+    while _originals:
+        owner, attribute, original = _originals.pop()
+        setattr(owner, attribute, original)
+    enabled = False
+
+
+def reset():
+    histograms.clear()
+    counters.clear()
+    if enabled:
+        # the installed wrappers still point at the old histograms
+        disable()
+        enable()
+
+
+# ---------------------------
+# Snapshots
+# ---------------------------
+def export():
+    """ raw, mergeable state (e.g. to send back from a worker process) """
+    return {"histograms": {name: h.to_dict() for name, h in histograms.items()},
+            "counters": dict(counters)}
+
+
+def merge(exports):
+    total = {"histograms": {}, "counters": Counter()}
+    for data in exports:
+        for name, raw in data["histograms"].items():
+            histogram = Histogram.from_dict(raw)
+            if name in total["histograms"]:
+                total["histograms"][name].merge(histogram)
+            else:
+                total["histograms"][name] = histogram
+        total["counters"].update(data["counters"])
+    return {"histograms": {name: h.to_dict() for name, h in total["histograms"].items()},
+            "counters": dict(total["counters"])}
+
+
+def snapshot(data=None):
+    """ per-histogram summaries plus counters, from `data` or the live state """
+    data = export() if data is None else data
+    return {
+        "latency": {name: Histogram.from_dict(raw).summary()
+                    for name, raw in sorted(data["histograms"].items()) if raw["count"]},
+        "counters": dict(sorted(data["counters"].items())),
+    }
+
+
+def format_snapshot(snap):
+    lines = [f"{'timer':<28}{'count':>9}{'mean':>11}{'p50':>11}{'p90':>11}{'p99':>11}{'max':>11}"]
+    for name, s in snap["latency"].items():
+        lines.append(f"{name:<28}{s['count']:>9}{s['mean_us']:>9.1f}us{s['p50_us']:>9.1f}us"
+                     f"{s['p90_us']:>9.1f}us{s['p99_us']:>9.1f}us{s['max_us']:>9.1f}us")
+    lines.append("events: " + ", ".join(f"{kind} {n}" for kind, n in snap["counters"].items()))
+    return "\n".join(lines)
+
+
+def dump(path, data=None):
+    """ writes a snapshot as JSON and returns it """
+    snap = snapshot(data)
+    with open(path, "w") as f:
+        json.dump(snap, f, indent=2)
+    return snap
+
+
+# ---------------------------
+# One-round profile
+# ---------------------------
+class ProfileRound:
+    """ runs cProfile from the next round_start of `game` to its round_end """
+
+    def __init__(self, game, path, on_done=None):
+        self.game = game
+        self.path = path
+        self.on_done = on_done
+        self.profile = cProfile.Profile()
+        self.state = "waiting"
+        game.subscribe(self.on_event)
+
+    def on_event(self, event):
+        # stays subscribed when done: removing a listener while the game
+        # is calling its listeners would skip the next one
+        if event.kind == "round_start" and self.state == "waiting":
+            self.state = "running"
+            self.profile.enable()
+        elif event.kind == "round_end" and self.state == "running":
+            self.state = "done"
+            self.profile.disable()
+            self.profile.dump_stats(self.path)
+            if self.on_done is not None:
+                self.on_done(self.path)
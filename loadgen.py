@@ -0,0 +1,232 @@
+"""
+Load generator for the Flip 7 server.
+
+Opens a few connections, spreads many tables over them and plays every
+seat with a simple threshold strategy as fast as the server answers.
+When a table's game ends it leaves and creates a fresh one, so the table
+count stays constant. Prints throughput, request latency percentiles
+and how much the server's memory grew per table opened. Use a fresh
+server for that figure: memory an earlier run freed gets reused, so the
+growth then reads low.
+
+    python Flip7.py serve --port 7777 &
+    python Flip7.py loadtest --port 7777 --tables 5000 --connections 20
+"""
+import asyncio
+import json
+import random
+import time
+from collections import deque
+
+from Flip7 import MAX_PLAYERS, MIN_PLAYERS
+from server import HOST, PORT
+
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+
+class _Table:
+    __slots__ = ("scores", "finished", "round_over", "winner")
+
+    def __init__(self, players):
+        self.scores = [0] * players
+        self.finished = set()
+        self.round_over = False
+        self.winner = False
+
+
+class LoadConnection:
+    """ one socket playing every seat of its tables """
+
+    def __init__(self, stats, players, stay_at, rng):
+        self.stats = stats
+        self.players = players
+        self.stay_at = stay_at
+        self.rng = rng
+        self.tables = {}
+        self.writer = None
+        self.running = True
+        # the server answers every request in order, so replies pop these
+        self.sent_at = deque()
+        self.outgoing = []
+
+    def send(self, request, table_id=None):
+        if table_id is not None:
+            request["table"] = table_id
+        self.outgoing.append(_dumps(request))
+        self.sent_at.append(time.perf_counter())
+        self.stats["requests"] += 1
+
+    def join(self):
+        self.send({"op": "join", "players": self.players, "seats": "all"})
+
+    def play(self, table_id, seat):
+        table = self.tables[table_id]
+        op = "stay" if table.scores[seat] >= self.stay_at else "hit"
+        self.send({"op": op, "seat": seat}, table_id)
+
+    def on_event(self, message):
+        self.stats["events"] += 1
+        table_id, kind = message["table"], message["event"]
+        table = self.tables[table_id]
+        if kind in ("draw", "flip", "second_chance_used"):
+            table.scores[message["player"]] = message.get("score", 0)
+        elif kind in ("bust", "stay", "seven_unique"):
+            table.finished.add(message["player"])
+        elif kind == "round_start":
+            table.scores = [0] * self.players
+            table.finished = set()
+            table.round_over = False
+        elif kind == "round_end":
+            table.round_over = True
+            self.stats["rounds"] += 1
+        elif kind == "winner":
+            table.winner = True
+            self.stats["games"] += 1
+
+        if not self.running:
+            return
+        if kind in ("turn", "round_start"):
+            self.play(table_id, message.get("player", 0))
+        elif kind == "action":
+            targets = [p for p in range(self.players) if p not in table.finished]
+            self.send({"op": "target", "seat": message["player"],
+                       "target": self.rng.choice(targets)}, table_id)
+
+    def on_reply(self, message):
+        table_id = message.get("table")
+        self.stats["latency"].append(time.perf_counter() - self.sent_at.popleft())
+        if "error" in message:
+            self.stats["errors"] += 1
+        if "state" in message:
+            self.tables[table_id] = _Table(self.players)
+            if self.running:
+                self.send({"op": "next_round"}, table_id)
+            return
+        table = self.tables.get(table_id)
+        if table is None:
+            return
+        if not self.running or not table.round_over:
+            return
+        if table.winner:
+            # keep the table count steady: swap the finished game for a new one
+            self.send({"op": "leave"}, table_id)
+            del self.tables[table_id]
+            self.join()
+        else:
+            self.send({"op": "next_round"}, table_id)
+
+    async def run(self, host, port, tables):
+        reader, self.writer = await asyncio.open_connection(host, port)
+        for _ in range(tables):
+            self.join()
+        partial = b""
+        try:
+            while True:
+                if self.outgoing:
+                    self.writer.write(("\n".join(self.outgoing) + "\n").encode())
+                    self.outgoing = []
+                    await self.writer.drain()
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                lines = (partial + data).split(b"\n")
+                partial = lines.pop()
+                for line in lines:
+                    message = json.loads(line)
+                    if "event" in message:
+                        self.on_event(message)
+                    else:
+                        self.on_reply(message)
+        finally:
+            self.writer.close()
+
+
+async def request(host, port, message):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((_dumps(message) + "\n").encode())
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply
+
+
+async def load_test(host, port, tables, connections, players, seconds, stay_at=20, seed=0):
+    """ runs the load for `seconds` and returns the collected stats """
+    stats = {"requests": 0, "events": 0, "rounds": 0, "games": 0, "errors": 0,
+             "latency": []}
+    rng = random.Random(seed)
+    conns = [LoadConnection(stats, players, stay_at, random.Random(rng.random()))
+             for _ in range(connections)]
+    share = [tables // connections + (i < tables % connections) for i in range(connections)]
+    # memory before the tables open, so the report counts only what they cost
+    stats["server_before"] = await request(host, port, {"op": "stats"})
+    tasks = [asyncio.create_task(conn.run(host, port, n)) for conn, n in zip(conns, share)]
+    started = time.perf_counter()
+    await asyncio.sleep(seconds)
+    stats["seconds"] = time.perf_counter() - started
+    stats["server"] = await request(host, port, {"op": "stats"})
+    for conn in conns:
+        conn.running = False
+        conn.writer.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def format_report(stats, tables, connections, players):
+    seconds = stats["seconds"]
+    lines = [
+        f"Tables: {tables} over {connections} connections, {players} seats each, "
+        f"{seconds:.1f}s",
+        f"Requests: {stats['requests']} ({stats['requests'] / seconds:.0f}/s)  "
+        f"Events: {stats['events']} ({stats['events'] / seconds:.0f}/s)",
+        f"Rounds: {stats['rounds']}  Games: {stats['games']}  Errors: {stats['errors']}",
+    ]
+    latency = sorted(stats["latency"])
+    if latency:
+        lines.append("Latency: " + "  ".join(
+            f"p{int(q * 100)} {_percentile(latency, q) * 1000:.2f} ms"
+            for q in (0.5, 0.9, 0.99)))
+    server, before = stats["server"], stats["server_before"]
+    if server.get("rss_kb"):
+        line = f"Server: {server['tables']} tables, peak RSS {server['rss_kb'] / 1024:.1f} MB"
+        # current RSS where the server has it; a peak left by an earlier run hides growth
+        key = "rss_now_kb" if server.get("rss_now_kb") and before.get("rss_now_kb") else "rss_kb"
+        opened = server["tables"] - before["tables"]
+        if opened > 0:
+            grown = server[key] - before[key]
+            line += (f", {grown / 1024:+.1f} MB for {opened} tables opened "
+                     f"({grown / opened:.1f} KB per table)")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def add_arguments(parser):
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--tables", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--stay-at", type=int, default=20,
+                        help="round score at which the load bots stay")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def run(args):
+    if args.tables < 1 or args.connections < 1:
+        raise SystemExit("--tables and --connections must be at least 1")
+    if not MIN_PLAYERS <= args.players <= MAX_PLAYERS:
+        raise SystemExit(f"--players must be between {MIN_PLAYERS} and {MAX_PLAYERS}")
+    connections = min(args.connections, args.tables)
+    try:
+        stats = asyncio.run(load_test(args.host, args.port, args.tables, connections,
+                                      args.players, args.seconds, args.stay_at, args.seed))
+    except ConnectionError as exc:
+        raise SystemExit(f"cannot reach the server at {args.host}:{args.port}: {exc}")
+    print(format_report(stats, args.tables, connections, args.players))
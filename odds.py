@@ -0,0 +1,154 @@
+"""
+Exact hit / stay odds for one player's hand.
+
+Given the hand and the multiset of cards the player has not seen yet
+(the draw pile), this works out the chance that the next card busts the
+hand and the expected round score of hitting versus staying. The hit
+value assumes the player keeps choosing the better of hit and stay for
+up to `depth` more cards of their own; opponents' draws in between are
+not modelled. Freeze and Flip Three are counted as cards that use up a
+draw without changing the score.
+
+States are memoized on (hand counters, packed deck counts, depth) behind
+an LRU bound, so repeated lookups from the GUI are cache hits.
+"""
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+from Flip7 import (ADD, DOUBLE, MASK_COUNT, MASK_SUM, MAX_PLAYERS, NUMBER, SECOND_CHANCE,
+                   SEVEN_UNIQUE_BONUS, decks_for, deck_of_cards, effect_of, pack_hand)
+
+DEPTH = 3
+CACHE_SIZE = 1 << 18
+
+Odds = namedtuple("Odds", "bust_probability stay_score hit_score advice")
+
+# ---------------------------
+# Compact deck-state keys
+# ---------------------------
+KINDS = sorted(set(deck_of_cards),
+               key=lambda card: (not isinstance(card, int), str(card).zfill(3)))
+KIND_INDEX = {card: k for k, card in enumerate(KINDS)}
+# wide enough for the most common card in a shoe of MAX_PLAYERS' worth of
+# decks (8 bits for the standard rules)
+BITS = max(8, (max(Counter(deck_of_cards).values()) * decks_for(MAX_PLAYERS)).bit_length())
+FIELD = (1 << BITS) - 1
+
+EFFECTS = [(k * BITS, 1 << (k * BITS)) + effect_of(card) for k, card in enumerate(KINDS)]
+
+
+def deck_key(cards):
+    """ packs a multiset of card values into one int, BITS bits per kind """
+    return _counts_key(Counter(cards))
+
+
+def _counts_key(counts):
+    key = 0
+    for card, count in counts.items():
+        if count > FIELD:
+            raise ValueError(f"{count} copies of {card!r} do not fit the {BITS}-bit deck key")
+        key += count << (KIND_INDEX[card] * BITS)
+    return key
+
+
+def unseen_cards(deck):
+    """ card values the players cannot see: the draw pile, or the discards it will be rebuilt from """
+    keys = deck.draw_pile or deck.discard_pile
+    return [deck.cards[key] for key in keys]
+
+
+# ---------------------------
+# Memoized DP
+# ---------------------------
+def _stay(mask, modifier_sum, x2_count):
+    final = (MASK_SUM[mask] + modifier_sum) << x2_count
+    if MASK_COUNT[mask] == 7:
+        final += SEVEN_UNIQUE_BONUS
+    return final
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _value(mask, modifier_sum, x2_count, second_chances, key, total, depth):
+    stay = _stay(mask, modifier_sum, x2_count)
+    if depth == 0 or total == 0:
+        return stay
+    return max(stay, _hit(mask, modifier_sum, x2_count, second_chances, key, total, depth))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _hit(mask, modifier_sum, x2_count, second_chances, key, total, depth):
+    """ expected score of drawing one card, then playing on for depth - 1 draws """
+    expected = 0
+    rest = total - 1
+    for shift, unit, kind, amount in EFFECTS:
+        count = (key >> shift) & FIELD
+        if not count:
+            continue
+        next_key = key - unit
+        if kind == NUMBER:
+            bit = 1 << amount
+            if mask & bit:
+                if not second_chances:
+                    continue
+                value = _value(mask, modifier_sum, x2_count, second_chances - 1,
+                               next_key, rest, depth - 1)
+            elif MASK_COUNT[mask | bit] == 7:
+                value = _stay(mask | bit, modifier_sum, x2_count)
+            else:
+                value = _value(mask | bit, modifier_sum, x2_count, second_chances,
+                               next_key, rest, depth - 1)
+        elif kind == ADD:
+            value = _value(mask, modifier_sum + amount, x2_count, second_chances,
+                           next_key, rest, depth - 1)
+        elif kind == DOUBLE:
+            value = _value(mask, modifier_sum, x2_count + 1, second_chances,
+                           next_key, rest, depth - 1)
+        elif kind == SECOND_CHANCE:
+            value = _value(mask, modifier_sum, x2_count, second_chances + 1,
+                           next_key, rest, depth - 1)
+        else:
+            value = _value(mask, modifier_sum, x2_count, second_chances,
+                           next_key, rest, depth - 1)
+        expected += count * value
+    return expected / total
+
+
+def clear_cache():
+    _value.cache_clear()
+    _hit.cache_clear()
+
+
+# ---------------------------
+# Public helpers
+# ---------------------------
+def hand_odds(hand, unseen, depth=DEPTH):
+    """ Odds for hitting `hand` when `unseen` (card values) is what is left to draw """
+    if hasattr(hand, "pack"):
+        mask, _, _, modifier_sum, x2_count = hand.pack()
+        second_chances = hand.second_chances
+    else:
+        mask, _, _, modifier_sum, x2_count = pack_hand(hand)
+        second_chances = sum(1 for card in hand if card == "Second Chance")
+
+    counts = Counter(unseen)
+    total = sum(counts.values())
+    stay = _stay(mask, modifier_sum, x2_count)
+    if total == 0:
+        return Odds(0.0, stay, stay, "stay")
+
+    if second_chances:
+        bust = 0.0
+    else:
+        bust = sum(count for card, count in counts.items()
+                   if isinstance(card, int) and mask >> card & 1) / total
+
+    hit = _hit(mask, modifier_sum, x2_count, second_chances,
+               _counts_key(counts), total, max(depth, 1))
+    # a risk-free draw is never worse, and it keeps an empty hand from stalling
+    advice = "hit" if hit > stay or (hit == stay and bust == 0) else "stay"
+    return Odds(bust, stay, hit, advice)
+
+
+def player_odds(game, player, depth=DEPTH):
+    """ hand_odds for a seat of a Flip7Game, using its draw pile as the unseen cards """
+    return hand_odds(game.cards_in_hand[player], unseen_cards(game.deck), depth)
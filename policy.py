@@ -0,0 +1,394 @@
+"""
+Precomputed hit / stay policy.
+
+`python Flip7.py solve` works out the best decision for every situation
+one player can be in during their own turns. A situation is:
+
+    mask          13-bit set of the distinct numbers held
+    modifiers     which additive modifiers are held, one digit per kind
+                  counting its copies (32 states for the standard deck)
+    x2            how many x2 are held, up to the copies in one deck
+    second chance whether a Second Chance is held
+    bucket        how thick the unseen cards are with copies of the held
+                  numbers compared with a fresh deck, in DENSITY_STEP steps
+                  (0 = none left, 2 = as in a fresh deck, 4 = twice that)
+
+Values follow calculate_round_score and the bust rule of check_round_end:
+a repeated number busts to 0 unless a Second Chance absorbs it, and a
+seventh distinct number ends the turn with the bonus. Draws come from a
+single deck minus the player's own cards, with the held numbers' copies
+scaled by the bucket; a held modifier is not drawn again. Freeze and Flip Three use up a draw without
+changing the hand, as in the odds module.
+
+Hands only grow, so masks are solved from six numbers down to none; a
+level's masks are independent and are spread over a process pool.
+Within a mask the modifiers and x2 only grow too. What is left are the
+cycles: draws that leave the state unchanged (Freeze, Flip Three, a
+second Second Chance) and drawing a Second
+Chance that a repeat then uses up. Each pair of states with and without
+a Second Chance is value-iterated until it settles.
+
+The table is one bit per state (1 = hit), directly indexed:
+
+    MAGIC, <B version> <B buckets> <I rules>, then 8192 * STATES_PER_MASK bits
+
+A table only fits the rules it was solved for, so a rule variant gets
+its own default file name and the header carries the rules' fingerprint.
+
+so decide() is an index computation and one byte read from an mmap.
+"""
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from Flip7 import (ADDITIVE_MODIFIERS, MASK_COUNT, MASK_SUM, RULES, SEVEN_UNIQUE_BONUS,
+                   STANDARD_FINGERPRINT, data_path, deck_of_cards, make_data_dir, pack_hand)
+
+MAGIC = b"F7POL"
+VERSION = 3
+DEFAULT_PATH = data_path("flip7.policy" if RULES.fingerprint == STANDARD_FINGERPRINT
+                         else f"flip7-{RULES.fingerprint:08x}.policy")
+
+BUCKETS = 5
+DENSITY_STEP = 0.5
+MASKS = 1 << 13
+TOLERANCE = 1e-9
+
+_HEAD = struct.Struct("<5sBBI")
+
+COPIES = Counter(deck_of_cards)
+NUMBERS = [card for card in COPIES if isinstance(card, int)]
+
+
+def _held_modifiers():
+    """
+    the held additive modifiers as a mixed-radix number, one digit per kind
+    counting 0 to its copies: (radix per card, then per state its total and
+    the draws that grow it as (copies left, radix))
+    """
+    radix, size = {}, 1
+    for card in sorted(ADDITIVE_MODIFIERS, key=ADDITIVE_MODIFIERS.get):
+        if COPIES[card]:
+            radix[card] = size
+            size *= COPIES[card] + 1
+    states = []
+    for state in range(size):
+        total, draws = 0, []
+        for card, step in radix.items():
+            held = state // step % (COPIES[card] + 1)
+            total += held * ADDITIVE_MODIFIERS[card]
+            if held < COPIES[card]:
+                draws.append((COPIES[card] - held, step))
+        states.append((total, tuple(draws)))
+    return radix, states
+
+
+MODIFIER_RADIX, HELD_MODIFIERS = _held_modifiers()
+# cards that take up a draw and change nothing
+IDLE_CARDS = COPIES["Freeze"] + COPIES["Flip Three"]
+# 0 to every x2 in the deck; the standard deck's single x2 makes this a flag
+X2_LEVELS = COPIES["x2"] + 1
+# strides between neighbouring states within a mask
+X2_STRIDE = 2 * BUCKETS
+MODIFIER_STRIDE = X2_LEVELS * X2_STRIDE
+STATES_PER_MASK = len(HELD_MODIFIERS) * MODIFIER_STRIDE
+
+
+def modifier_state(cards):
+    """ the held-modifier state of a hand; copies past one deck's are clamped """
+    counts = Counter(card for card in cards if card in MODIFIER_RADIX)
+    return sum(MODIFIER_RADIX[card] * min(n, COPIES[card]) for card, n in counts.items())
+
+
+def state_index(mask, modifiers, x2_count, second_chances, bucket):
+    """ position of a state's bit, for a modifier_state(); x2 past one deck's is clamped """
+    x2 = min(x2_count, X2_LEVELS - 1)
+    return ((((mask * len(HELD_MODIFIERS) + modifiers) * X2_LEVELS + x2) << 1
+             | (second_chances > 0)) * BUCKETS + bucket)
+
+
+def depletion_bucket(mask, unseen):
+    """ bucket for how often a card from `unseen` would repeat a number in `mask` """
+    left = sum(1 for card in unseen if isinstance(card, int) and mask >> card & 1)
+    return _bucket(mask, left, len(unseen))
+
+
+@lru_cache(maxsize=None)
+def _fresh_share(mask):
+    """ share of a fresh deck, less the held numbers, that repeats one of them """
+    full = sum(COPIES[n] - 1 for n in NUMBERS if mask >> n & 1)
+    return full / (len(deck_of_cards) - MASK_COUNT[mask])
+
+
+def _bucket(mask, left, unseen):
+    """ the bucket for `left` copies of the held numbers among `unseen` cards """
+    fresh = _fresh_share(mask)
+    if not fresh or not unseen:
+        return round(1 / DENSITY_STEP)
+    # share of repeats among the unseen cards, against the share in a fresh deck
+    density = (left / unseen) / fresh
+    return min(int(density / DENSITY_STEP + 0.5), BUCKETS - 1)
+
+
+class Depletion:
+    """
+    Unseen copies of each number for one game, kept up to date from its
+    draw and flip events, so a bucket costs a pass over the held numbers
+    instead of over the unseen cards. Anything else that changes the draw
+    pile (a reshuffle, a restore, a mirrored deck) shows up as a pile of
+    another length or identity and triggers a recount.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.pile = None
+        self.size = 0
+        self.unseen = 0
+        self.left = [0] * 13
+        game.subscribe(self.on_event)
+
+    def on_event(self, event):
+        if event.kind == "draw" or event.kind == "flip":
+            self.size -= 1
+            if type(event.value) is int:
+                self.left[event.value] -= 1
+
+    def _recount(self):
+        deck = self.game.deck
+        pile = deck.draw_pile
+        if pile is self.pile and len(pile) == self.size and pile:
+            return
+        # an empty draw pile means the discards are what is left to see
+        keys = pile or deck.discard_pile
+        left = [0] * 13
+        for key in keys:
+            value = deck.cards[key]
+            if type(value) is int:
+                left[value] += 1
+        self.left, self.pile, self.size = left, pile, len(pile)
+        self.unseen = len(keys)
+
+    def bucket(self, mask):
+        self._recount()
+        left = self.left
+        held = 0
+        bits = mask
+        while bits:
+            low = bits & -bits
+            held += left[low.bit_length() - 1]
+            bits ^= low
+        return _bucket(mask, held, self.size or self.unseen)
+
+    def close(self):
+        self.game.unsubscribe(self.on_event)
+
+
+# ---------------------------
+# Solver
+# ---------------------------
+def _stay(mask, modifier_sum, x2):
+    final = (MASK_SUM[mask] + modifier_sum) << x2
+    if MASK_COUNT[mask] == 7:
+        final += SEVEN_UNIQUE_BONUS
+    return final
+
+
+def solve_mask(mask, upper):
+    """
+    (values, hits) for every state with numbers `mask`, given the values
+    of each mask with one more number in `upper`
+    """
+    values = array("d", bytes(8 * STATES_PER_MASK))
+    hits = bytearray(STATES_PER_MASK)
+    held = [n for n in NUMBERS if mask >> n & 1]
+    fresh = [(n, mask | 1 << n) for n in NUMBERS if not mask >> n & 1]
+    for bucket in range(BUCKETS):
+        density = bucket * DENSITY_STEP
+        repeats = sum((COPIES[n] - 1) * density for n in held)
+        new = sum(COPIES[n] for n, _ in fresh)
+        # more x2 and modifiers are solved before fewer
+        for x2 in range(X2_LEVELS - 1, -1, -1):
+            extra_x2 = COPIES["x2"] - x2
+            # drawing a modifier only ever moves to a higher state
+            for modifiers in range(len(HELD_MODIFIERS) - 1, -1, -1):
+                modifier_sum, draws = HELD_MODIFIERS[modifiers]
+                modifiers_left = sum(left for left, _ in draws)
+                stay = _stay(mask, modifier_sum, x2)
+                # per Second Chance held: (expected value of the draws that leave
+                # this pair of states, chance of drawing back into the same state)
+                settled = []
+                for second in (0, 1):
+                    local = modifiers * MODIFIER_STRIDE + x2 * X2_STRIDE + second * BUCKETS + bucket
+                    extra_second = COPIES["Second Chance"] - second
+                    total = (repeats + new + modifiers_left + extra_x2 + extra_second
+                             + IDLE_CARDS)
+                    loop = IDLE_CARDS + (extra_second if second else 0)
+                    expected = 0.0
+                    for n, grown in fresh:
+                        if MASK_COUNT[grown] == 7:
+                            expected += COPIES[n] * _stay(grown, modifier_sum, x2)
+                        else:
+                            expected += COPIES[n] * upper[grown][local]
+                    for left, step in draws:
+                        expected += left * values[local + step * MODIFIER_STRIDE]
+                    if extra_x2:
+                        expected += extra_x2 * values[local + X2_STRIDE]
+                    # without a Second Chance: drawing one moves to the other state;
+                    # with one: a repeat spends it and moves back
+                    across = (repeats if second else extra_second) / total
+                    settled.append((local, expected / total, loop / total, across))
+
+                (plain, e0, l0, a0), (saved, e1, l1, a1) = settled
+                v0 = v1 = stay
+                while True:
+                    n0 = max(stay, e0 + l0 * v0 + a0 * v1)
+                    n1 = max(stay, e1 + l1 * v1 + a1 * n0)
+                    if n0 - v0 < TOLERANCE and n1 - v1 < TOLERANCE:
+                        break
+                    v0, v1 = n0, n1
+                values[plain], values[saved] = n0, n1
+                hits[plain], hits[saved] = n0 > stay, n1 > stay
+    return values, hits
+
+
+def solve_chunk(masks, upper):
+    return {mask: solve_mask(mask, upper) for mask in masks}
+
+
+def levels():
+    """ masks that can still be played, grouped by how many numbers they hold, fullest first """
+    by_count = {}
+    for mask in range(MASKS):
+        if MASK_COUNT[mask] < 7:
+            by_count.setdefault(MASK_COUNT[mask], []).append(mask)
+    return [by_count[count] for count in sorted(by_count, reverse=True)]
+
+
+def solve(workers=None, progress=None):
+    """ the whole table as bytes, ready for write_table """
+    workers = workers or os.cpu_count() or 1
+    bits = bytearray(MASKS * STATES_PER_MASK // 8)
+    upper = {}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for masks in levels():
+            size = -(-len(masks) // (workers * 4))
+            chunks = [masks[i:i + size] for i in range(0, len(masks), size)]
+            # each chunk only gets the next level's values it reads
+            jobs = [(chunk, {grown: upper[grown] for mask in chunk for n in NUMBERS
+                             if (grown := mask | 1 << n) in upper})
+                    for chunk in chunks]
+            if pool is None:
+                results = [solve_chunk(*job) for job in jobs]
+            else:
+                results = list(pool.map(solve_chunk, *zip(*jobs)))
+            upper = {}
+            for result in results:
+                for mask, (values, hits) in result.items():
+                    upper[mask] = values
+                    base = mask * STATES_PER_MASK
+                    for local, hit in enumerate(hits):
+                        if hit:
+                            index = base + local
+                            bits[index >> 3] |= 1 << (index & 7)
+            if progress is not None:
+                progress(MASK_COUNT[masks[0]], len(masks))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return _HEAD.pack(MAGIC, VERSION, BUCKETS, RULES.fingerprint) + bytes(bits)
+
+
+def write_table(path, data):
+    make_data_dir(path)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# ---------------------------
+# Lookups
+# ---------------------------
+class Policy:
+    """ read-only view of a solved table; the file is mapped, not read """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, buckets, rules = _HEAD.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Flip 7 policy table")
+        if version != VERSION or buckets != BUCKETS:
+            raise ValueError(f"{path} was solved by another version; run `Flip7.py solve` again")
+        if rules != RULES.fingerprint:
+            raise ValueError(f"{path} was solved for other rules; run `Flip7.py solve` with them")
+        if len(self.map) != _HEAD.size + MASKS * STATES_PER_MASK // 8:
+            raise ValueError(f"{path} is truncated")
+
+    def hits(self, mask, modifiers, x2_count, second_chances, bucket=0):
+        index = state_index(mask, modifiers, x2_count, second_chances, bucket)
+        return self.map[_HEAD.size + (index >> 3)] >> (index & 7) & 1
+
+    def decide(self, hand, unseen=None, bucket=None):
+        """
+        "hit" or "stay" for `hand` with `unseen` card values left to draw;
+        callers that track the deck (Depletion) pass its bucket instead
+        """
+        if hasattr(hand, "pack"):
+            mask, x2_count, second_chances = hand.mask, hand.x2_count, hand.second_chances
+        else:
+            mask, _, _, _, x2_count = pack_hand(hand)
+            second_chances = sum(1 for card in hand if card == "Second Chance")
+        if bucket is None:
+            bucket = depletion_bucket(mask, unseen)
+        if self.hits(mask, modifier_state(hand), x2_count, second_chances, bucket):
+            return "hit"
+        return "stay"
+
+    def close(self):
+        self.map.close()
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        return Policy(path)
+    except ValueError as exc:
+        return exc
+
+
+def get_policy(path=DEFAULT_PATH):
+    """
+    maps the table on first use; None if it has not been solved yet. A table
+    that does not fit raises ValueError, from a check made once per path
+    """
+    table = _load(path)
+    if isinstance(table, ValueError):
+        raise ValueError(str(table))
+    return table
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def add_arguments(parser):
+    parser.add_argument("--output", default=DEFAULT_PATH, metavar="PATH",
+                        help="where to write the table (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes to solve with (default: one per CPU)")
+
+
+def run(args):
+    started = time.perf_counter()
+    data = solve(args.workers, progress=lambda count, masks: print(
+        f"{masks:>5} hands holding {count} numbers solved", flush=True))
+    write_table(args.output, data)
+    print(f"Wrote {args.output} ({len(data) // 1024} KB) in {time.perf_counter() - started:.1f}s")
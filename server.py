@@ -0,0 +1,514 @@
+"""
+Multi-table Flip 7 server over line-delimited JSON.
+
+One asyncio process hosts many tables, each a Flip7Game with its own
+deck. Clients talk to it over TCP, one JSON object per line. A
+connection can sit at any number of tables, so a load generator can
+drive thousands of tables over a handful of sockets.
+
+Requests (every field but "op" is optional; "ref" is echoed back):
+
+    {"op": "join", "table": null, "players": 4, "seats": 1}
+                        create a table (or join table N) and claim seats
+    {"op": "next_round", "table": N}
+    {"op": "hit", "table": N, "seat": S}
+    {"op": "stay", "table": N, "seat": S}
+    {"op": "target", "table": N, "seat": S, "target": T}
+    {"op": "leave", "table": N}
+    {"op": "stats"}
+
+Replies carry "ok" or "error". Every GameEvent of a table is pushed to
+all of its clients as {"table": N, "event": kind, ...}, encoded once per
+table rather than once per client. A client that stops reading is
+dropped once its write buffer passes MAX_BUFFER, so a table's memory is
+its game state plus a bounded buffer per client.
+
+    python Flip7.py serve --port 7777
+    python Flip7.py --connect 127.0.0.1:7777
+"""
+import asyncio
+import json
+import os
+import queue
+import socket
+import threading
+
+from Flip7 import (MAX_PLAYERS, MIN_PLAYERS, RULES, Deck, Flip7Game, GameEvent, Hand,
+                   decks_for, deck_of_cards, shoe)
+
+HOST = "127.0.0.1"
+PORT = 7777
+MAX_TABLES = 20000
+MAX_BUFFER = 1 << 16
+MAX_LINE = 1 << 12
+READ_SIZE = 1 << 16
+
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+
+# ---------------------------
+# Wire format
+# ---------------------------
+def encode_event(table_id, event):
+    """ one JSON line for a GameEvent, leaving out empty fields """
+    message = {"table": table_id, "event": event.kind}
+    if event.player is not None:
+        message["player"] = event.player
+    if event.value is not None:
+        message["value"] = event.value
+    if event.target is not None:
+        message["target"] = event.target
+    if event.score is not None:
+        message["score"] = event.score
+    return (_dumps(message) + "\n").encode()
+
+
+def decode_event(message):
+    return GameEvent(message["event"], message.get("player"), message.get("value"),
+                     message.get("target"), message.get("score"))
+
+
+# numbers first, then the named cards, in a fixed order
+_CARD_RANK = {value: rank for rank, value in enumerate(sorted(
+    set(deck_of_cards), key=lambda card: (not isinstance(card, int), str(card).zfill(3))))}
+
+
+def game_state(game):
+    """
+    everything a client needs to mirror a table; piles are sent as sorted
+    multisets so the draw order stays on the server
+    """
+    deck = game.deck
+    return {
+        "players": game.num_players,
+        "rules": RULES.fingerprint,
+        "scores": [game.player_scores[p] for p in range(game.num_players)],
+        "hands": [list(game.cards_in_hand[p]) for p in range(game.num_players)],
+        "finished": sorted(game.finished_players),
+        "busted": sorted(game.busted_players),
+        "stayed": sorted(game.stayed_players),
+        "frozen": sorted(game.skip_turn),
+        "current": game.current_player,
+        "round": game.round_number,
+        "active": game.round_active,
+        "pending": list(game.pending_action) if game.pending_action else None,
+        "winner": game.winner,
+        "draw_pile": sorted((deck.cards[key] for key in deck.draw_pile), key=_CARD_RANK.__getitem__),
+        "discard": sorted((deck.cards[key] for key in deck.discard_pile), key=_CARD_RANK.__getitem__),
+        "in_play": sorted((deck.cards[key] for key in deck.in_play), key=_CARD_RANK.__getitem__),
+    }
+
+
+# ---------------------------
+# Server
+# ---------------------------
+class Table:
+    __slots__ = ("table_id", "game", "owners", "clients")
+
+    def __init__(self, table_id, game):
+        self.table_id = table_id
+        self.game = game
+        self.owners = [None] * game.num_players
+        self.clients = []
+        game.subscribe(self.on_event)
+
+    def on_event(self, event):
+        line = encode_event(self.table_id, event)
+        for client in self.clients:
+            client.send(line)
+
+
+class Client:
+    """
+    One connection. Lines sent while a request runs are queued and written
+    with a single flush() afterwards, so a move that emits ten events
+    costs one socket write per watching client, not ten.
+    """
+    __slots__ = ("writer", "tables", "closed", "pending", "outbox")
+
+    def __init__(self, writer, outbox):
+        self.writer = writer
+        self.tables = set()
+        self.closed = False
+        self.pending = []
+        self.outbox = outbox
+
+    def send(self, data):
+        if not self.pending:
+            self.outbox.append(self)
+        self.pending.append(data)
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        if self.closed or self.writer.is_closing():
+            return
+        self.writer.write(b"".join(pending))
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            # a client that does not read must not grow the server without bound
+            self.closed = True
+            self.writer.transport.abort()
+
+
+def _current_rss_kb():
+    """ resident memory now, where /proc has it; None elsewhere """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Flip7Server:
+    """ hosts the tables; handle() serves one connection """
+
+    def __init__(self, max_tables=MAX_TABLES, seed=None):
+        self.max_tables = max_tables
+        self.seed = seed
+        self.tables = {}
+        self.next_id = 0
+        self.clients = 0
+        self.outbox = []
+
+    async def handle(self, reader, writer):
+        client = Client(writer, self.outbox)
+        self.clients += 1
+        partial = b""
+        try:
+            while not client.closed:
+                # whatever requests have arrived are run back to back and
+                # answered with one write per client
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                lines = (partial + data).split(b"\n")
+                partial = lines.pop()
+                if len(partial) > MAX_LINE:
+                    break
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    client.send((_dumps(self.dispatch(client, line)) + "\n").encode())
+                self.flush()
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            client.closed = True
+            for table_id in list(client.tables):
+                self.leave(client, table_id)
+            writer.close()
+
+    def flush(self):
+        outbox = self.outbox
+        for client in outbox:
+            client.flush()
+        outbox.clear()
+
+    def dispatch(self, client, line):
+        """ runs one request line and returns the reply """
+        request = None
+        try:
+            request = json.loads(line)
+            handler = getattr(self, "op_" + str(request.get("op")), None)
+            if handler is None:
+                raise ValueError(f"unknown op {request.get('op')!r}")
+            reply = handler(client, request) or {}
+            reply["ok"] = True
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+            reply = {"error": str(exc)}
+            if isinstance(request, dict) and "table" in request:
+                reply["table"] = request["table"]
+        if isinstance(request, dict) and "ref" in request:
+            reply["ref"] = request["ref"]
+        return reply
+
+    def _table(self, client, request):
+        table = self.tables.get(request.get("table"))
+        if table is None or client not in table.clients:
+            raise ValueError(f"not at table {request.get('table')!r}")
+        return table
+
+    def _seat(self, client, table, request, default=None):
+        seat = request.get("seat", table.game.current_player if default is None else default)
+        if (type(seat) is not int or not 0 <= seat < len(table.owners)
+                or table.owners[seat] is not client):
+            raise ValueError(f"seat {seat!r} is not yours")
+        return seat
+
+    def _target(self, table, request):
+        """ an open seat to aim at, checked before the game sees it """
+        target = request.get("target")
+        game = table.game
+        if type(target) is not int or not 0 <= target < game.num_players:
+            raise ValueError(f"no seat {target!r} to target")
+        if target in game.finished_players:
+            raise ValueError(f"seat {target} already finished this round")
+        return target
+
+    # ---------------------------
+    # Requests
+    # ---------------------------
+    def op_join(self, client, request):
+        table_id = request.get("table")
+        if table_id is None:
+            if len(self.tables) >= self.max_tables:
+                raise ValueError("server is full")
+            players = int(request.get("players", 4))
+            if not MIN_PLAYERS <= players <= MAX_PLAYERS:
+                raise ValueError(f"players must be between {MIN_PLAYERS} and {MAX_PLAYERS}")
+            table_id = self.next_id
+            self.next_id += 1
+            seed = None if self.seed is None else (self.seed << 32) | table_id
+            self.tables[table_id] = Table(table_id, Flip7Game(players, seed=seed))
+        table = self.tables.get(table_id)
+        if table is None:
+            raise ValueError(f"no table {table_id!r}")
+
+        free = [seat for seat, owner in enumerate(table.owners) if owner is None]
+        wanted = request.get("seats", 1)
+        if wanted == "all":
+            wanted = len(free)
+        claimed = free[:int(wanted)]
+        for seat in claimed:
+            table.owners[seat] = client
+        if client not in table.clients:
+            table.clients.append(client)
+        client.tables.add(table_id)
+        return {"table": table_id, "seats": claimed, "state": game_state(table.game)}
+
+    def op_leave(self, client, request):
+        self._table(client, request)
+        self.leave(client, request["table"])
+        return {"table": request["table"]}
+
+    def op_next_round(self, client, request):
+        table = self._table(client, request)
+        if client not in table.owners:
+            raise ValueError("spectators cannot start rounds")
+        if table.game.round_active:
+            raise ValueError("the round is still in progress")
+        table.game.start_round()
+        return {"table": table.table_id}
+
+    def op_hit(self, client, request):
+        table = self._table(client, request)
+        table.game.hit(self._seat(client, table, request))
+        return {"table": table.table_id}
+
+    def op_stay(self, client, request):
+        table = self._table(client, request)
+        table.game.stay(self._seat(client, table, request))
+        return {"table": table.table_id}
+
+    def op_target(self, client, request):
+        table = self._table(client, request)
+        game = table.game
+        if game.pending_action is None:
+            raise ValueError("no action to resolve")
+        source = self._seat(client, table, request, game.pending_action[1])
+        game.resolve_action(source, self._target(table, request))
+        return {"table": table.table_id}
+
+    def op_stats(self, client, request):
+        try:
+            import resource
+            rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            rss_kb = None
+        return {"tables": len(self.tables), "clients": self.clients, "rss_kb": rss_kb,
+                "rss_now_kb": _current_rss_kb()}
+
+    def leave(self, client, table_id):
+        client.tables.discard(table_id)
+        table = self.tables.get(table_id)
+        if table is None:
+            return
+        if client in table.clients:
+            table.clients.remove(client)
+        table.owners = [None if owner is client else owner for owner in table.owners]
+        if not table.clients:
+            # nobody left to play or watch: free the table
+            table.game.unsubscribe(table.on_event)
+            del self.tables[table_id]
+
+
+async def serve(host=HOST, port=PORT, max_tables=MAX_TABLES, seed=None, ready=None):
+    server = Flip7Server(max_tables, seed)
+    listener = await asyncio.start_server(server.handle, host, port)
+    if ready is not None:
+        ready(listener.sockets[0].getsockname())
+    async with listener:
+        await listener.serve_forever()
+
+
+# ---------------------------
+# Client side: a mirrored game for the GUI
+# ---------------------------
+class MirrorDeck(Deck):
+    """
+    Client copy of a table's deck. It holds the same multiset of cards in
+    the same piles as the server's deck, but not their order, which is
+    all the odds and bots ever look at.
+    """
+
+    def __init__(self, draw_pile=(), discard=(), in_play=(), cards=None):
+        super().__init__(cards)
+        free = {}
+        for key, value in enumerate(self.cards):
+            free.setdefault(value, []).append(key)
+        self.draw_pile = [free[value].pop() for value in draw_pile]
+        self.discard_pile = {free[value].pop() for value in discard}
+        self.in_play = {free[value].pop() for value in in_play}
+
+    def take(self, value):
+        """ the server drew `value`: move a matching key into play """
+        if not self.draw_pile:
+            self.reshuffle()
+        pile = self.draw_pile
+        for i in range(len(pile) - 1, -1, -1):
+            key = pile[i]
+            if self.cards[key] == value:
+                pile[i] = pile[-1]
+                pile.pop()
+                self.in_play.add(key)
+                return
+
+
+class RemoteGame(Flip7Game):
+    """
+    A Flip7Game mirrored from a server table. Moves are sent to the
+    server; the events it pushes back are applied with apply_event and
+    passed to subscribers, so the GUI treats it like a local game.
+    Call poll() from the GUI thread to deliver them.
+    """
+
+    def __init__(self, sock, table_id, seats, state):
+        deck = MirrorDeck(state["draw_pile"], state["discard"], state["in_play"],
+                          shoe(decks_for(state["players"])))
+        super().__init__(state["players"], deck=deck)
+        self.sock = sock
+        self.table_id = table_id
+        self.seats = set(seats)
+        self.player_scores = dict(enumerate(state["scores"]))
+        self.cards_in_hand = {p: Hand(cards) for p, cards in enumerate(state["hands"])}
+        self.active_players = set(range(self.num_players))
+        self.finished_players = set(state["finished"])
+        self.busted_players = set(state["busted"])
+        self.stayed_players = set(state["stayed"])
+        self.skip_turn = set(state["frozen"])
+        self.current_player = state["current"]
+        self.round_number = state["round"]
+        self.round_active = state["active"]
+        self.pending_action = tuple(state["pending"]) if state["pending"] else None
+        self.winner = state["winner"]
+        self.resync()
+        self.inbox = queue.Queue()
+        threading.Thread(target=self._read, args=(sock.makefile("rb"),), daemon=True).start()
+
+    @classmethod
+    def connect(cls, host, port, players=4, table=None, seats="all"):
+        """ joins (or creates) a table and claims seats; blocks until the reply """
+        sock = socket.create_connection((host, port))
+        sock.sendall((_dumps({"op": "join", "table": table, "players": players,
+                              "seats": seats}) + "\n").encode())
+        reader = sock.makefile("rb")
+        reply = json.loads(reader.readline() or b"{}")
+        if not reply.get("ok"):
+            sock.close()
+            raise ValueError(reply.get("error", "the server closed the connection"))
+        if reply["state"].get("rules") != RULES.fingerprint:
+            sock.close()
+            raise ValueError("the server plays other rules; start with the same --rules file")
+        return cls(sock, reply["table"], reply["seats"], reply["state"])
+
+    def _read(self, reader):
+        for line in reader:
+            self.inbox.put(json.loads(line))
+        self.inbox.put(None)
+
+    def _send(self, op, **fields):
+        fields["op"] = op
+        fields["table"] = self.table_id
+        self.sock.sendall((_dumps(fields) + "\n").encode())
+        return []
+
+    def controls(self, seat):
+        return seat in self.seats
+
+    def poll(self):
+        """ applies and publishes whatever the server sent; False once disconnected """
+        while True:
+            try:
+                message = self.inbox.get_nowait()
+            except queue.Empty:
+                return True
+            if message is None:
+                self._publish(GameEvent("error", value="disconnected from the server"))
+                return False
+            if "event" in message:
+                event = decode_event(message)
+                if event.kind in ("draw", "flip"):
+                    self.deck.take(event.value)
+                elif event.kind == "round_start":
+                    self.deck.discard_in_play()
+                self.apply_event(event)
+                self._publish(event)
+            elif "error" in message:
+                self._publish(GameEvent("error", value=message["error"]))
+
+    def _publish(self, event):
+        for callback in self.listeners:
+            callback(event)
+
+    # moves go to the server; their events come back through poll()
+    def start_round(self):
+        if self.round_active:
+            # joined mid-round: just let the view draw the current state
+            self._publish(GameEvent("round_start", value=self.round_number))
+            return []
+        return self._send("next_round")
+
+    def hit(self, player=None):
+        return self._send("hit", seat=self.current_player if player is None else player)
+
+    def stay(self, player=None):
+        return self._send("stay", seat=self.current_player if player is None else player)
+
+    def resolve_action(self, source_player, target_player, stepwise=False):
+        # the server always resolves a Flip Three in one go
+        return self._send("target", seat=source_player, target=target_player)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def parse_address(text):
+    """ "host:port", ":port" or "port" -> (host, port) """
+    host, _, port = text.rpartition(":")
+    return host or HOST, int(port)
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def add_arguments(parser):
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-tables", type=int, default=MAX_TABLES)
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed every table's deck from this and the table number")
+
+
+def run(args):
+    def ready(address):
+        print(f"Flip 7 server on {address[0]}:{address[1]}")
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_tables, args.seed, ready))
+    except KeyboardInterrupt:
+        pass
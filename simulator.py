@@ -0,0 +1,280 @@
+"""
+Monte Carlo tournament simulator for Flip 7.
+
+Plays complete headless games to 200 points with Flip7Game, with a bot
+from the bots module in every seat, and fans them out over a process
+pool. Every game gets its own seed derived from the master seed and the
+game's index, and per-worker results are plain counters that are
+summed, so the report is identical whatever the worker count.
+
+    python Flip7.py simulate --games 100000 --players 6 --workers 8
+"""
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from Flip7 import MAX_PLAYERS, MIN_PLAYERS, Flip7Game
+from bots import apply_decision, make_bot
+from gamelog import GameRecorder
+
+
+# ---------------------------
+# Lock-step tables
+# ---------------------------
+CHUNK_SIZE = 100
+# bots that never score (e.g. threshold:0) would otherwise loop forever
+MAX_ROUNDS = 1000
+
+
+def game_seed(master_seed, index):
+    """ independent, reproducible seed for game number `index` """
+    return (master_seed << 32) | index
+
+
+def play_tables(num_players, seeds, seat_bots, recorder=None, collector=None, columns=None):
+    """
+    Plays one game per seed side by side. Each step collects the tables
+    waiting on the same seat and asks that seat's bot for all of their
+    decisions in one decide_batch() call.
+    Returns a list of (winner, rounds, busts, player_rounds) per game;
+    winner is None for games abandoned after MAX_ROUNDS.
+    With a recorder, games are played one after another instead so each
+    one is logged as a contiguous block. A statsdb.StatsCollector gets
+    the rounds and results of every game, a columnstore.ShardWriter a
+    row per seat for every round.
+    """
+    if recorder is not None and len(seeds) > 1:
+        results = []
+        for seed in seeds:
+            results += play_tables(num_players, [seed], seat_bots, recorder, collector,
+                                   columns)
+        return results
+
+    games = [Flip7Game(num_players, seed=seed) for seed in seeds]
+    if recorder is not None:
+        recorder.record(games[0])
+    if collector is not None:
+        for game, seed in zip(games, seeds):
+            collector.watch(game, seed)
+    if columns is not None:
+        for game, seed in zip(games, seeds):
+            columns.watch(game, seed)
+    busts = [0] * len(games)
+    live = list(range(len(games)))
+    for game in games:
+        game.start_round()
+
+    while live:
+        waiting = {}
+        for i in live:
+            game = games[i]
+            seat = game.pending_action[1] if game.pending_action else game.current_player
+            waiting.setdefault(seat, []).append(i)
+        for seat, tables in waiting.items():
+            decisions = seat_bots[seat].decide_batch([games[i].snapshot() for i in tables])
+            for i, decision in zip(tables, decisions):
+                apply_decision(games[i], decision)
+
+        still_live = []
+        for i in live:
+            game = games[i]
+            if not game.round_active:
+                busts[i] += len(game.busted_players)
+                if game.winner is not None or game.round_number > MAX_ROUNDS:
+                    continue
+                game.start_round()
+            still_live.append(i)
+        live = still_live
+
+    if recorder is not None:
+        recorder.stop()
+    return [(game.winner, game.round_number - 1, busts[i],
+             num_players * (game.round_number - 1))
+            for i, game in enumerate(games)]
+
+
+# ---------------------------
+# Worker fan-out
+# ---------------------------
+def chunk_bots(bot_specs, num_players, master_seed, start):
+    """ the bot per seat for the chunk of games beginning at `start`, seeded for that chunk """
+    return [make_bot(bot_specs[seat % len(bot_specs)], seed=game_seed(master_seed, start) + seat)
+            for seat in range(num_players)]
+
+
+def run_chunk(num_players, master_seed, start, stop, bot_specs, record_dir=None,
+              instrumented=False, stats=False, columns_dir=None):
+    """ plays games [start, stop) and returns mergeable counters """
+    if instrumented:
+        import instrument
+        instrument.enable()
+        instrument.reset()
+    seat_bots = chunk_bots(bot_specs, num_players, master_seed, start)
+    result = {
+        "wins": Counter(),
+        "rounds": Counter(),
+        "busts": 0,
+        "player_rounds": 0,
+    }
+    seeds = [game_seed(master_seed, index) for index in range(start, stop)]
+    recorder = None
+    if record_dir is not None:
+        recorder = GameRecorder(os.path.join(record_dir, f"games-{start:09d}.f7log"))
+    collector = None
+    if stats:
+        from statsdb import StatsCollector
+        collector = StatsCollector()
+    columns = None
+    if columns_dir is not None:
+        from columnstore import shard_writer
+        # one shard per process, kept open from chunk to chunk
+        columns = shard_writer(columns_dir)
+    outcomes = play_tables(num_players, seeds, seat_bots, recorder, collector, columns)
+    if recorder is not None:
+        recorder.close()
+    if columns is not None:
+        for seed, (winner, rounds, busts, _) in zip(seeds, outcomes):
+            columns.add_game(seed, num_players, winner, rounds, busts)
+        columns.sync()
+    for winner, rounds, busts, player_rounds in outcomes:
+        result["wins"][winner] += 1
+        result["rounds"][rounds] += 1
+        result["busts"] += busts
+        result["player_rounds"] += player_rounds
+    if instrumented:
+        result["instrument"] = instrument.export()
+        instrument.disable()
+    if collector is not None:
+        result["stats"] = collector
+    return result
+
+
+def merge_results(results):
+    """ sums per-worker counters into one result """
+    total = {"wins": Counter(), "rounds": Counter(), "busts": 0, "player_rounds": 0}
+    for result in results:
+        total["wins"].update(result["wins"])
+        total["rounds"].update(result["rounds"])
+        total["busts"] += result["busts"]
+        total["player_rounds"] += result["player_rounds"]
+    if any("instrument" in result for result in results):
+        import instrument
+        total["instrument"] = instrument.merge(result["instrument"] for result in results
+                                               if "instrument" in result)
+    return total
+
+
+def chunk_ranges(games, chunk_size=CHUNK_SIZE):
+    """
+    splits range(games) into fixed-size index ranges; the chunking must
+    not depend on the worker count because bots with their own RNG are
+    seeded per chunk
+    """
+    return [(start, min(start + chunk_size, games))
+            for start in range(0, games, chunk_size)]
+
+
+def simulate(games, num_players, workers=None, master_seed=0, bot_specs=("threshold",),
+             record_dir=None, instrumented=False, stats_path=None, columns_dir=None):
+    """ runs `games` games and returns the merged result """
+    workers = workers or os.cpu_count() or 1
+    ranges = chunk_ranges(games)
+    if record_dir is not None:
+        os.makedirs(record_dir, exist_ok=True)
+    store = None
+    if stats_path is not None:
+        from statsdb import StatsStore
+        store = StatsStore(stats_path)
+
+    def collect(result):
+        # one transaction per chunk, written as chunks finish, so rows never pile up
+        if store is not None:
+            store.ingest(result.pop("stats"))
+        return result
+
+    stats = store is not None
+    try:
+        if workers == 1:
+            results = [collect(run_chunk(num_players, master_seed, a, b, bot_specs, record_dir,
+                                         instrumented, stats, columns_dir))
+                       for a, b in ranges]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(run_chunk, num_players, master_seed, a, b, bot_specs,
+                                       record_dir, instrumented, stats, columns_dir)
+                           for a, b in ranges]
+                results = [collect(f.result()) for f in futures]
+    finally:
+        if store is not None:
+            store.close()
+    return merge_results(results)
+
+
+# ---------------------------
+# Report / CLI
+# ---------------------------
+def format_report(result, games, num_players, seconds, bot_specs=("threshold",)):
+    rounds_played = sum(r * n for r, n in result["rounds"].items())
+    lines = [
+        f"Games: {games}  Players: {num_players}  "
+        f"Time: {seconds:.2f}s  ({games / seconds if seconds else 0:.0f} games/s)",
+        f"Average rounds per game: {rounds_played / games:.2f}",
+        f"Bust rate: {result['busts'] / result['player_rounds']:.2%} of player-rounds",
+        "Win rate by seat:",
+    ]
+    if result["wins"][None]:
+        lines.insert(3, f"Abandoned after {MAX_ROUNDS} rounds: {result['wins'][None]} games")
+    for seat in range(num_players):
+        bot = bot_specs[seat % len(bot_specs)]
+        lines.append(f"  Player {seat + 1} ({bot}): {result['wins'][seat] / games:.2%}")
+    return "\n".join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--bots", default="threshold",
+                        help="comma-separated bot per seat, repeated around the table, "
+                             "e.g. threshold:25,probability,random")
+    parser.add_argument("--record", metavar="DIR", default=None,
+                        help="write a binary game log per chunk of games into DIR")
+    parser.add_argument("--stats", metavar="DB", default=None,
+                        help="store every game, round and hand in this SQLite database")
+    parser.add_argument("--columns", metavar="DIR", default=None,
+                        help="write a row per hand and per game into memory-mapped column "
+                             "shards in DIR")
+    parser.add_argument("--instrument", metavar="PATH", default=None,
+                        help="time engine calls and count events; write the JSON snapshot "
+                             "to PATH")
+
+
+def run(args):
+    if args.games < 1:
+        raise SystemExit("--games must be at least 1")
+    if not MIN_PLAYERS <= args.players <= MAX_PLAYERS:
+        raise SystemExit(f"--players must be between {MIN_PLAYERS} and {MAX_PLAYERS}")
+    if args.workers is not None and args.workers < 1:
+        raise SystemExit("--workers must be at least 1")
+    if args.seed < 0:
+        raise SystemExit("--seed must not be negative")
+    bot_specs = tuple(spec.strip() for spec in args.bots.split(",") if spec.strip())
+    if not bot_specs:
+        raise SystemExit("--bots needs at least one bot")
+    try:
+        for spec in bot_specs:
+            make_bot(spec)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    started = time.perf_counter()
+    result = simulate(args.games, args.players, args.workers, args.seed, bot_specs,
+                      args.record, args.instrument is not None, args.stats, args.columns)
+    print(format_report(result, args.games, args.players,
+                        time.perf_counter() - started, bot_specs))
+    if args.instrument is not None:
+        import instrument
+        snap = instrument.dump(args.instrument, result["instrument"])
+        print(instrument.format_snapshot(snap))
@@ -0,0 +1,353 @@
+"""
+Persistent game statistics in SQLite.
+
+StatsCollector watches games through their events and keeps plain
+tuples of rows plus running totals; it does no I/O, so simulator
+workers can fill one each and send it back to the parent. StatsStore
+owns the database and writes a collected batch in one transaction
+(WAL journal, executemany per table).
+
+    games   one row per game: player count, seed, winner, rounds, and
+            the game's uid, which a save carries, so a GUI game that is
+            closed, resumed and finished updates its row
+    rounds  one row per round: busts and best round score
+    hands   one row per player per round: cards held, round score,
+            busted / stayed
+    events  every event, only when the collector keeps them (GUI games)
+
+Leaderboard queries read small summary tables that ingest() updates
+with upserts, so they cost the same however many games are stored;
+the indexes on the raw tables serve filtered drill-downs.
+
+    python Flip7.py simulate --games 100000 --stats flip7.db
+    python Flip7.py stats flip7.db --players 4
+"""
+import sqlite3
+import time
+from collections import Counter
+
+from Flip7 import data_path, make_data_dir
+
+DEFAULT_PATH = data_path("flip7.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    players INTEGER NOT NULL,
+    seed INTEGER,
+    winner INTEGER,
+    rounds INTEGER NOT NULL,
+    recorded REAL NOT NULL,
+    uid INTEGER
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    game_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    busts INTEGER NOT NULL,
+    best INTEGER NOT NULL,
+    PRIMARY KEY (game_id, round)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hands (
+    game_id INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    busted INTEGER NOT NULL,
+    stayed INTEGER NOT NULL,
+    PRIMARY KEY (game_id, round, seat)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    game_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    player INTEGER,
+    value,
+    target INTEGER,
+    score INTEGER,
+    PRIMARY KEY (game_id, seq)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS games_by_players ON games (players, winner);
+CREATE INDEX IF NOT EXISTS hands_by_size ON hands (size, busted);
+CREATE INDEX IF NOT EXISTS hands_by_seat ON hands (seat, score);
+CREATE INDEX IF NOT EXISTS events_by_kind ON events (kind, player);
+
+CREATE TABLE IF NOT EXISTS size_summary (
+    size INTEGER PRIMARY KEY,
+    hands INTEGER NOT NULL,
+    busts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players_summary (
+    players INTEGER PRIMARY KEY,
+    games INTEGER NOT NULL,
+    rounds INTEGER NOT NULL,
+    hands INTEGER NOT NULL,
+    score INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seat_summary (
+    players INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    PRIMARY KEY (players, seat)
+) WITHOUT ROWID;
+"""
+
+
+# ---------------------------
+# Collecting
+# ---------------------------
+class StatsCollector:
+    """ rows and summary totals for the games it watches; picklable """
+
+    def __init__(self, keep_events=False):
+        self.keep_events = keep_events
+        self.games = []
+        self.rounds = []
+        self.hands = []
+        self.events = []
+        self.sizes = Counter()
+        self.size_busts = Counter()
+        self.banked = {}
+        # rounds taken back by an undo, kept in case they are redone
+        self.parked = {}
+
+    def watch(self, game, seed=None):
+        """ records `game` from now on; its rows refer to it by its position in this batch """
+        local = len(self.games)
+        self.games.append([local, game.num_players, seed, None, 0, game.uid])
+        # a resumed game has banked points already
+        banked = self.banked[local] = list(game.player_scores.values())
+        seq = [0]
+
+        def on_event(event):
+            kind = event.kind
+            if self.keep_events:
+                self.events.append((local, seq[0], game.round_number, kind, event.player,
+                                    event.value, event.target, event.score))
+                seq[0] += 1
+            if kind == "round_end":
+                self.round_over(local, game, banked)
+            elif kind == "winner":
+                self.games[local][3] = event.player
+
+        game.subscribe(on_event)
+        return local
+
+    def round_over(self, local, game, banked):
+        """ after end_round_and_bank: the hands are still on the table, the totals banked """
+        busted, stayed, hands = game.busted_players, game.stayed_players, game.cards_in_hand
+        rnd = game.round_number
+        best = 0
+        for seat, total in game.player_scores.items():
+            score = total - banked[seat]
+            banked[seat] = total
+            size = len(hands[seat])
+            bust = seat in busted
+            self.hands.append((local, rnd, seat, size, score, bust, seat in stayed))
+            self.sizes[size] += 1
+            if bust:
+                self.size_busts[size] += 1
+            if score > best:
+                best = score
+        self.rounds.append((local, rnd, len(busted), best))
+        self.games[local][4] = rnd
+        # a round played after an undo replaces whatever was parked
+        self.parked.pop(local, None)
+
+    def rewind(self, local, game):
+        """
+        after an undo or redo has moved game `local`: rounds it has not reached
+        any more are parked, parked rounds it has reached again come back
+        """
+        rnd = game.round_number
+        parked_hands, parked_rounds = self.parked.pop(local, ([], []))
+        hands = [row for row in self.hands if row[0] == local] + parked_hands
+        rounds = [row for row in self.rounds if row[0] == local] + parked_rounds
+        self.hands = [row for row in self.hands if row[0] != local]
+        self.rounds = [row for row in self.rounds if row[0] != local]
+        self.hands += [row for row in hands if row[1] < rnd]
+        self.rounds += [row for row in rounds if row[1] < rnd]
+        self.parked[local] = ([row for row in hands if row[1] >= rnd],
+                              [row for row in rounds if row[1] >= rnd])
+        self.sizes = Counter(row[3] for row in self.hands)
+        self.size_busts = Counter(row[3] for row in self.hands if row[5])
+        entry = self.games[local]
+        entry[3] = game.winner
+        entry[4] = rnd - 1
+        # scores only change when a round is banked, so these are the round's starting totals
+        self.banked[local][:] = game.player_scores.values()
+
+    def summary(self, stored=None):
+        """
+        ({players: [games, rounds, hands, score]}, {(players, seat): wins});
+        stored maps the local games already in the database to the rounds
+        they were stored with, so only what is new is counted
+        """
+        stored = stored or {}
+        by_players = {}
+        seat_wins = Counter()
+        for local, players, _, winner, rounds, _ in self.games:
+            totals = by_players.setdefault(players, [0, 0, 0, 0])
+            if local in stored:
+                totals[1] += rounds - stored[local]
+            else:
+                totals[0] += 1
+                totals[1] += rounds
+            if winner is not None:
+                seat_wins[players, winner] += 1
+        players_of = [game[1] for game in self.games]
+        for local, _, _, _, score, _, _ in self.hands:
+            totals = by_players[players_of[local]]
+            totals[2] += 1
+            totals[3] += score
+        return by_players, seat_wins
+
+
+# ---------------------------
+# Storage
+# ---------------------------
+class StatsStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        make_data_dir(path)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps a committed batch safe; NORMAL skips the fsync per commit
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        if "uid" not in [row[1] for row in self.db.execute("PRAGMA table_info(games)")]:
+            # a database from before games had uids
+            self.db.execute("ALTER TABLE games ADD COLUMN uid INTEGER")
+        self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS games_by_uid ON games (uid)")
+
+    def ingest(self, collector):
+        """
+        writes everything `collector` gathered in one transaction; returns
+        the game ids. A game whose uid is stored already (a resumed game)
+        keeps its id and row, and only its new rounds are added.
+        """
+        if not collector.games:
+            return []
+        recorded = time.time()
+        with self.db:
+            (last,) = self.db.execute("SELECT IFNULL(MAX(id), 0) FROM games").fetchone()
+            ids, stored, seqs = [], {}, {}
+            for local, _, _, _, _, uid in collector.games:
+                row = None if uid is None else self.db.execute(
+                    "SELECT id, rounds FROM games WHERE uid = ?", (uid,)).fetchone()
+                if row is None:
+                    last += 1
+                    ids.append(last)
+                    continue
+                ids.append(row[0])
+                stored[local] = row[1]
+                (seqs[local],) = self.db.execute(
+                    "SELECT IFNULL(MAX(seq) + 1, 0) FROM events WHERE game_id = ?",
+                    (row[0],)).fetchone()
+            by_players, seat_wins = collector.summary(stored)
+
+            self.db.executemany(
+                "INSERT INTO games (id, players, seed, winner, rounds, recorded, uid) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "winner = excluded.winner, rounds = excluded.rounds, recorded = excluded.recorded",
+                [(ids[local], players, seed, winner, rounds, recorded, uid)
+                 for local, players, seed, winner, rounds, uid in collector.games])
+            self.db.executemany(
+                "INSERT INTO rounds VALUES (?, ?, ?, ?)",
+                [(ids[local], rnd, busts, best) for local, rnd, busts, best in collector.rounds])
+            self.db.executemany(
+                "INSERT INTO hands VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(ids[row[0]],) + row[1:] for row in collector.hands])
+            if collector.events:
+                self.db.executemany(
+                    "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(ids[row[0]], seqs.get(row[0], 0) + row[1]) + row[2:]
+                     for row in collector.events])
+
+            self.db.executemany(
+                "INSERT INTO size_summary VALUES (?, ?, ?) ON CONFLICT (size) DO UPDATE SET "
+                "hands = hands + excluded.hands, busts = busts + excluded.busts",
+                [(size, n, collector.size_busts[size]) for size, n in collector.sizes.items()])
+            self.db.executemany(
+                "INSERT INTO players_summary VALUES (?, ?, ?, ?, ?) ON CONFLICT (players) "
+                "DO UPDATE SET games = games + excluded.games, rounds = rounds + excluded.rounds, "
+                "hands = hands + excluded.hands, score = score + excluded.score",
+                [(players,) + tuple(totals) for players, totals in by_players.items()])
+            seats = Counter({(players, seat): 0 for players, totals in by_players.items()
+                             for seat in range(players)})
+            seats.update(seat_wins)
+            self.db.executemany(
+                "INSERT INTO seat_summary VALUES (?, ?, ?, ?) ON CONFLICT (players, seat) "
+                "DO UPDATE SET games = games + excluded.games, wins = wins + excluded.wins",
+                [(players, seat, by_players[players][0], wins)
+                 for (players, seat), wins in seats.items()])
+        return ids
+
+    # leaderboards, from the summaries
+    def bust_rate_by_size(self):
+        """ [(hand size, hands, bust rate)] """
+        return [(size, hands, busts / hands) for size, hands, busts in self.db.execute(
+            "SELECT size, hands, busts FROM size_summary ORDER BY size")]
+
+    def round_score_by_players(self):
+        """ [(player count, games, average round score)] """
+        return [(players, games, score / hands if hands else 0.0)
+                for players, games, hands, score in self.db.execute(
+                    "SELECT players, games, hands, score FROM players_summary ORDER BY players")]
+
+    def win_rate_by_seat(self, players):
+        """ [(seat, games, win rate)] for tables of `players` """
+        return [(seat, games, wins / games) for seat, games, wins in self.db.execute(
+            "SELECT seat, games, wins FROM seat_summary WHERE players = ? ORDER BY seat",
+            (players,))]
+
+    # drill-downs, from the indexed raw tables
+    def bust_rate_for_size(self, size, players=None):
+        if players is None:
+            row = self.db.execute("SELECT COUNT(*), TOTAL(busted) FROM hands WHERE size = ?",
+                                  (size,)).fetchone()
+        else:
+            row = self.db.execute(
+                "SELECT COUNT(*), TOTAL(busted) FROM hands JOIN games ON games.id = game_id "
+                "WHERE size = ? AND players = ?", (size, players)).fetchone()
+        return row[1] / row[0] if row[0] else 0.0
+
+    def game_count(self):
+        return self.db.execute("SELECT IFNULL(MAX(id), 0) FROM games").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+
+# ---------------------------
+# Report / CLI
+# ---------------------------
+def format_report(store, players=None):
+    lines = [f"{store.game_count()} games in {store.path}", "", "Bust rate by hand size:"]
+    lines += [f"  {size:>2} cards: {rate:7.2%} of {hands} hands"
+              for size, hands, rate in store.bust_rate_by_size()]
+    lines += ["", "Average round score by player count:"]
+    counts = store.round_score_by_players()
+    lines += [f"  {n:>3} players: {average:6.2f} ({games} games)" for n, games, average in counts]
+    for n in ([players] if players else [n for n, _, _ in counts]):
+        lines += ["", f"Win rate by seat, {n} players:"]
+        lines += [f"  Seat {seat + 1:>3}: {rate:7.2%}" for seat, _, rate in store.win_rate_by_seat(n)]
+    return "\n".join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH,
+                        help="statistics database (default: %(default)s)")
+    parser.add_argument("--players", type=int, default=None,
+                        help="only show the seat table for this player count")
+
+
+def run(args):
+    store = StatsStore(args.path)
+    try:
+        print(format_report(store, args.players))
+    finally:
+        store.close()
@@ -0,0 +1,59 @@
+import random
+
+import advisor
+from bots import SearchBot, apply_decision
+from Flip7 import Flip7Game
+
+
+def pending_snapshot(seed):
+    """ the first snapshot of a seeded game with a Freeze or Flip Three to aim """
+    game = Flip7Game(4, seed=seed)
+    game.start_round()
+    while game.pending_action is None:
+        if not game.round_active:
+            game.start_round()
+        else:
+            game.hit(game.current_player)
+    return game.snapshot()
+
+
+def test_rollout_table_keeps_who_busted_and_who_stayed():
+    game = Flip7Game(3, seed=0)
+    game.start_round()
+    game.finished_players = {1, 2}
+    game.busted_players = {1}
+    game.stayed_players = {2}
+    table = advisor.table_from_snapshot(game.snapshot(), random.Random(0))
+    assert table.busted_players == {1}
+    assert table.stayed_players == {2}
+    assert table.turns.after(0) == 0
+
+
+def test_counted_rollouts_are_reproducible():
+    snapshot = pending_snapshot(3)
+    targets = [p for p in range(snapshot.num_players) if p not in snapshot.finished]
+    first = advisor.run_rollouts(snapshot, targets, 7, rollouts=25)
+    assert sum(n for n, _, _ in first.values()) == 25
+    assert advisor.run_rollouts(snapshot, targets, 7, rollouts=25) == first
+
+
+def test_search_bot_plays_the_same_game_twice():
+    def play(seed):
+        game = Flip7Game(4, seed=seed)
+        bots = [SearchBot(rollouts=20, seed=seat) for seat in range(4)]
+        events = []
+        while game.winner is None and game.round_number <= 10:
+            events += game.start_round()
+            while game.round_active:
+                seat = game.pending_action[1] if game.pending_action else game.current_player
+                events += apply_decision(game, bots[seat].decide(game.snapshot()))
+        return events
+    assert play(11) == play(11)
+
+
+def test_one_rollout_gives_no_interval():
+    (single,) = advisor.rank({0: [1, 4.0, 16.0]})
+    assert single.mean == 4.0
+    assert single.low == float("-inf") and single.high == float("inf")
+    (pair,) = advisor.rank({0: [2, 6.0, 20.0]})
+    assert pair.low < pair.mean < pair.high
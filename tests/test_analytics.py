@@ -0,0 +1,73 @@
+import random
+from collections import Counter
+
+import pytest
+
+from analytics import P2Quantile, Quantiles, simulated_records, tag
+from Flip7 import GameEvent
+from simulator import simulate
+
+
+@pytest.mark.parametrize("draw", [
+    lambda rng: rng.random(),
+    lambda rng: rng.gauss(10, 3),
+    lambda rng: rng.expovariate(0.1),
+])
+def test_p2_quantiles_track_the_exact_ones(draw):
+    rng = random.Random(0)
+    values = [draw(rng) for _ in range(20000)]
+    ordered = sorted(values)
+    spread = ordered[int(0.99 * len(values))] - ordered[int(0.01 * len(values))]
+    for p in (0.1, 0.5, 0.9):
+        sketch = P2Quantile(p)
+        for x in values:
+            sketch.add(x)
+        exact = ordered[int(p * len(values))]
+        assert abs(sketch.result() - exact) < 0.02 * spread
+
+
+def test_few_values_give_exact_order_statistics():
+    sketch = P2Quantile(0.5)
+    assert sketch.result() is None
+    for x in (5, 1, 3):
+        sketch.add(x)
+    assert sketch.result() == 3
+    count, mean, (median,) = _fed(Quantiles((0.5,)), [2, 4, 4, 4, 5, 5, 7, 9])
+    assert (count, mean) == (8, 5.0)
+    assert median == pytest.approx(4.5, abs=0.5)
+
+
+def _fed(sink, values):
+    for x in values:
+        sink.add(x)
+    return sink.result()
+
+
+def test_tag_tracks_hand_sizes_from_the_events_alone():
+    events = [
+        GameEvent("round_start", value=1),
+        GameEvent("draw", 0, 5),
+        GameEvent("draw", 0, "Second Chance"),
+        GameEvent("draw", 0, 5),
+        GameEvent("second_chance_used", 0, 5),
+        GameEvent("stay", 0, score=5),
+        GameEvent("draw", 1, 3),
+        GameEvent("draw", 1, 3),
+        GameEvent("bust", 1, 3),
+        GameEvent("flip", 2, 8),
+        GameEvent("bank", 0, 5, score=5),
+        GameEvent("round_start", value=2),
+        GameEvent("draw", 0, 4),
+    ]
+    records = list(tag(events, 7, 3))
+    assert [r.size for r in records] == [None, 0, 1, 2, 2, 1, 0, 1, 1, 0, 1, None, 0]
+    assert {r.game for r in records} == {7}
+    assert [r.round for r in records] == [1] * 11 + [2, 2]
+
+
+def test_analyze_sees_the_games_simulate_plays():
+    # random bots draw from their own RNG, so this only holds with the simulator's seeding
+    bots = ("random", "threshold:25", "random:0.7")
+    wins = Counter(r.player for r in simulated_records(230, 3, 4, bots) if r.kind == "winner")
+    result = simulate(230, 3, workers=1, master_seed=4, bot_specs=bots)
+    assert wins == +result["wins"]
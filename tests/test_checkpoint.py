@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+import checkpoint
+import Flip7
+from bots import ThresholdBot
+from Flip7 import Flip7Game
+
+
+def step(game, rng):
+    """ one random move for whoever is to act; the events it produced """
+    if not game.round_active:
+        return game.start_round()
+    if game.pending_action is not None:
+        source = game.pending_action[1]
+        targets = [p for p in range(game.num_players) if p not in game.finished_players]
+        return game.resolve_action(source, rng.choice(targets))
+    if rng.random() < 0.3:
+        return game.stay(game.current_player)
+    return game.hit(game.current_player)
+
+
+def play_out(game, rng):
+    events = []
+    while game.winner is None and game.round_number <= 30:
+        events += step(game, rng)
+    return events
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_resumed_game_plays_on_like_the_original(seed):
+    game = Flip7Game(3 + seed % 5, seed=seed)
+    rng = random.Random(seed)
+    for _ in range(40 + 17 * seed):
+        step(game, rng)
+        if game.winner is not None:
+            break
+    data = checkpoint.encode_game(game, {1: ThresholdBot(25)})
+    copy, bots = checkpoint.decode_game(data)
+    assert bots == {1: "threshold:25"}
+    assert checkpoint.encode_game(copy, {1: ThresholdBot(25)}) == data
+
+    state = rng.getstate()
+    expected = play_out(game, rng)
+    rng.setstate(state)
+    assert play_out(copy, rng) == expected
+    assert copy.player_scores == game.player_scores
+    assert copy.winner == game.winner
+
+
+def test_save_and_load_through_a_file(tmp_path):
+    game = Flip7Game(4, seed=1)
+    game.start_round()
+    game.hit(0)
+    path = str(tmp_path / "game.sav")
+    checkpoint.save(path, game)
+    loaded, bots = checkpoint.load(path)
+    assert bots == {}
+    assert checkpoint.encode_game(loaded) == checkpoint.encode_game(game)
+
+
+def test_damaged_saves_raise_value_error():
+    game = Flip7Game(4, seed=2)
+    game.start_round()
+    data = checkpoint.encode_game(game, {3: ThresholdBot(25)})
+    for size in (0, 3, len(checkpoint.MAGIC) + 1, len(checkpoint.MAGIC) + 3, 40,
+                 len(data) // 2, len(data) - 1):
+        with pytest.raises(ValueError):
+            checkpoint.decode_game(data[:size])
+
+
+def test_autosaver_hands_over_a_failed_write_once(tmp_path):
+    saver = checkpoint.Autosaver(str(tmp_path / "missing" / "game.sav"))
+    try:
+        saver.submit(b"data")
+        saver.flush()
+        assert isinstance(saver.take_error(), OSError)
+        assert saver.take_error() is None
+    finally:
+        saver.close()
+
+
+def test_autosaver_makes_the_data_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(Flip7, "DATA_DIR", str(tmp_path / "home"))
+    saver = checkpoint.Autosaver(Flip7.data_path("game.sav"))
+    try:
+        saver.submit(b"data")
+        saver.flush()
+        assert saver.take_error() is None
+    finally:
+        saver.close()
+    assert (tmp_path / "home" / "game.sav").read_bytes() == b"data"
+
+
+def test_piles_that_do_not_add_up_are_refused():
+    def damaged(change):
+        game = Flip7Game(4, seed=5)
+        game.start_round()
+        change(game, game.deck)
+        with pytest.raises(ValueError, match="damaged"):
+            checkpoint.decode_game(checkpoint.encode_game(game))
+
+    damaged(lambda game, deck: deck.discard_pile.add(deck.draw_pile[0]))
+    damaged(lambda game, deck: deck.draw_pile.append(deck.draw_pile[0]))
+    damaged(lambda game, deck: deck.draw_pile.__setitem__(0, len(deck.cards)))
+    damaged(lambda game, deck: deck.draw_pile.pop())
+
+    def number_not_in_play(game, deck):
+        key = next(key for key in deck.draw_pile if type(deck.cards[key]) is int)
+        game.cards_in_hand[0].append(deck.cards[key])
+    damaged(number_not_in_play)
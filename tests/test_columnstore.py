@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import columnstore
+from columnstore import ColumnStore, ShardWriter
+from simulator import simulate
+
+
+def test_rows_survive_growth_and_syncs(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnstore, "GROW", 3)
+    writer = ShardWriter(str(tmp_path))
+    for i in range(10):
+        writer.add_game(i, 4, None if i % 3 == 0 else i % 4, i + 1, 2 * i)
+        if i % 4 == 3:
+            writer.sync()
+    writer.sync()
+    store = ColumnStore(str(tmp_path))
+    assert store.rows("games") == 10
+    assert list(store.column("games", "seed")) == list(range(10))
+    assert list(store.column("games", "winner")) == [-1 if i % 3 == 0 else i % 4 for i in range(10)]
+    assert store.column("games", "busts").dtype == np.dtype("<u4")
+    assert store.rows("hands") == 0
+
+
+def test_unsynced_rows_are_not_seen(tmp_path):
+    writer = ShardWriter(str(tmp_path))
+    writer.add_game(1, 3, 0, 5, 1)
+    assert ColumnStore(str(tmp_path)).rows("games") == 0
+    writer.sync()
+    writer.add_game(2, 3, 1, 6, 2)
+    assert ColumnStore(str(tmp_path)).rows("games") == 1
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_simulated_results_match_the_simulator(tmp_path, workers):
+    path = str(tmp_path / f"w{workers}")
+    result = simulate(250, 4, workers=workers, master_seed=3, columns_dir=path)
+    store = ColumnStore(path)
+    assert store.rows("games") == 250
+    assert sorted(store.column("games", "seed")) == [(3 << 32) | i for i in range(250)]
+    assert store.rows("hands") == result["player_rounds"]
+    assert int(store.column("hands", "busted").sum()) == result["busts"]
+    assert int(store.column("games", "busts").sum()) == result["busts"]
+    winners = store.column("games", "winner")
+    assert {seat: int((winners == seat).sum()) for seat in range(4)} == \
+        {seat: result["wins"][seat] for seat in range(4)}
+    # every hand row belongs to a stored game and round
+    rounds = dict(zip(store.column("games", "seed"), store.column("games", "rounds")))
+    seeds, numbers = store.column("hands", "seed"), store.column("hands", "round")
+    assert all(1 <= n <= rounds[seed] for seed, n in zip(seeds, numbers))
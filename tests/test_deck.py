@@ -0,0 +1,91 @@
+from Flip7 import Deck, Flip7Game, calculate_round_score
+from gamestate import capture
+
+
+def test_draws_every_card_once_before_reshuffling():
+    deck = Deck(seed=1)
+    keys = [deck.draw() for _ in range(len(deck.cards))]
+    assert sorted(keys) == list(range(len(deck.cards)))
+    assert deck.exhausted()
+
+
+def test_reshuffle_ignores_discard_set_history():
+    # 1, 9, 17 and 33 share a slot in a small set, so their iteration
+    # order follows insertion order
+    piles = []
+    for order in ((17, 1, 9, 33), (1, 9, 17, 33), (33, 17, 9, 1)):
+        deck = Deck(cards=[1, 2, 3, 4] * 10, seed=5)
+        deck.draw_pile = []
+        for key in order:
+            deck.discard_pile.add(key)
+        deck.reshuffle()
+        piles.append(deck.draw_pile)
+    assert piles[0] == piles[1] == piles[2]
+
+
+def test_reshuffle_brings_back_discards_only():
+    deck = Deck(seed=2)
+    held = [deck.draw() for _ in range(len(deck.cards) - 5)]
+    deck.discard_in_play()
+    kept = [deck.draw() for _ in range(5)]
+    assert deck.draw_pile == []
+    deck.draw()
+    assert set(deck.draw_pile) | deck.in_play == set(held) | set(kept)
+    assert not deck.discard_pile
+
+
+def test_round_ends_cleanly_when_every_card_is_in_play():
+    cards = [1, 2, 3, 4, 5, 6]
+    game = Flip7Game(3, deck=Deck(cards=cards, seed=0))
+    game.start_round()
+    for _ in range(len(cards)):
+        game.hit(game.current_player)
+    assert game.round_active and game.deck.exhausted()
+    events = game.hit(game.current_player)
+    assert not game.round_active
+    assert [e.kind for e in events] == ["bank"] * 3 + ["round_end"]
+    assert sum(game.player_scores.values()) == sum(cards)
+    # the next round draws the same cards again
+    game.start_round()
+    game.hit(game.current_player)
+    assert len(game.cards_in_hand[0]) == 1
+
+
+def test_flip_three_stops_when_the_cards_run_out():
+    game = Flip7Game(3, deck=Deck(cards=[1, 2, "Flip Three"], seed=0))
+    game.deck.draw_pile = [0, 1, 2]  # Flip Three comes first, then only two cards
+    game.start_round()
+    game.hit(0)
+    assert game.pending_action == ("Flip Three", 0)
+    game.resolve_action(0, 1)
+    assert not game.round_active
+    assert game.flip_target is None
+    assert game.player_scores[1] == calculate_round_score([2, 1])
+
+
+def test_crowded_table_plays_through_exhaustion():
+    # 18 players on one deck who hit to 60 routinely empty it mid-round
+    for seed in range(20):
+        game = Flip7Game(18, seed=seed)
+        while game.winner is None and game.round_number < 40:
+            game.start_round()
+            while game.round_active:
+                if game.pending_action is not None:
+                    game.resolve_action(game.pending_action[1], game.pending_action[1])
+                elif calculate_round_score(game.cards_in_hand[game.current_player]) >= 60:
+                    game.stay(game.current_player)
+                else:
+                    game.hit(game.current_player)
+        assert game.winner is not None
+
+
+def test_state_moves_match_the_engine_through_exhaustion():
+    cards = [1, 2, 3, 4, 5, 6]
+    game = Flip7Game(3, deck=Deck(cards=cards, seed=0))
+    game.start_round()
+    state = capture(game)
+    for _ in range(len(cards) + 1):
+        game.hit(game.current_player)
+        state = state.hit()
+    assert not state.round_active and not game.round_active
+    assert list(state.scores[0]) == [game.player_scores[p] for p in range(3)]
@@ -0,0 +1,36 @@
+import pytest
+
+from Flip7 import Flip7Game
+from gamestate import capture
+
+
+def pending(action, num_players=4):
+    """ a fresh round with `action` waiting for Player 1 to aim it """
+    game = Flip7Game(num_players, seed=0)
+    game.start_round()
+    game.pending_action = (action, 0)
+    return game
+
+
+@pytest.mark.parametrize("action", ["Freeze", "Flip Three"])
+@pytest.mark.parametrize("target", [4, 7, -1, "1", None, 1.0])
+def test_a_bad_target_changes_nothing(action, target):
+    game = pending(action)
+    before = capture(game)
+    seen = []
+    game.subscribe(seen.append)
+    with pytest.raises(ValueError):
+        game.resolve_action(0, target)
+    assert seen == []
+    assert capture(game) == before
+    # the action can still be aimed, and play goes on
+    game.resolve_action(0, 1)
+    assert game.pending_action is None
+
+
+def test_a_finished_seat_cannot_be_targeted():
+    game = pending("Freeze")
+    game._finish(2)
+    with pytest.raises(ValueError):
+        game.resolve_action(0, 2)
+    assert game.pending_action == ("Freeze", 0)
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from gamelog import _LENGTH, EVENT, MAGIC, MAX_RECORD, GameLog, GameRecorder
+from Flip7 import Flip7Game
+
+
+def table(game):
+    """ everything replay rebuilds: scores, hands and turn state """
+    return (dict(game.player_scores), {p: list(hand) for p, hand in game.cards_in_hand.items()},
+            set(game.finished_players), set(game.busted_players), set(game.stayed_players),
+            set(game.skip_turn), game.current_player, game.round_number, game.round_active, game.winner)
+
+
+def play_recorded(recorder, seed):
+    """ a random game; its events and the table after each move, by event count """
+    game = Flip7Game(3 + seed % 4, seed=seed)
+    rng = random.Random(seed)
+    recorder.record(game)
+    events, tables = [], {0: table(game)}
+    while game.winner is None and game.round_number <= 30:
+        if not game.round_active:
+            events += game.start_round()
+        elif game.pending_action is not None:
+            source = game.pending_action[1]
+            events += game.resolve_action(source, rng.choice(
+                [p for p in range(game.num_players) if p not in game.finished_players]))
+        elif rng.random() < 0.3:
+            events += game.stay(game.current_player)
+        else:
+            events += game.hit(game.current_player)
+        tables[len(events)] = table(game)
+    return events, tables
+
+
+def test_replay_matches_the_live_games(tmp_path):
+    path = str(tmp_path / "games.f7log")
+    # snapshots every few events, so state_at starts from many of them
+    recorder = GameRecorder(path, snapshot_every=16)
+    played = [play_recorded(recorder, seed) for seed in range(4)]
+    recorder.close()
+
+    log = GameLog(path)
+    try:
+        assert len(log) == len(played)
+        for g, (events, tables) in enumerate(played):
+            assert list(log.events(g)) == events
+            for count, expected in tables.items():
+                assert table(log.state_at(g, count)) == expected
+    finally:
+        log.close()
+
+
+def test_records_before_the_first_game_are_refused(tmp_path):
+    path = tmp_path / "bad.f7log"
+    path.write_bytes(MAGIC + _LENGTH.pack(12) + bytes([EVENT]) + bytes(11))
+    with pytest.raises(ValueError, match="before any game"):
+        GameLog(str(path))
+
+
+def test_a_record_too_long_for_its_length_is_refused(tmp_path):
+    recorder = GameRecorder(str(tmp_path / "big.f7log"))
+    try:
+        with pytest.raises(ValueError, match="does not fit"):
+            recorder._write(bytes(MAX_RECORD + 1))
+    finally:
+        recorder.close()
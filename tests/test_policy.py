@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import policy
+from Flip7 import MASK_COUNT, Flip7Game, calculate_round_score
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_state_index_covers_the_table_once():
+    seen = set()
+    mask = 0b1011
+    for held in range(len(policy.HELD_MODIFIERS)):
+        for x2 in range(policy.X2_LEVELS):
+            for second in (0, 1):
+                for bucket in range(policy.BUCKETS):
+                    seen.add(policy.state_index(mask, held, x2, second, bucket))
+    base = mask * policy.STATES_PER_MASK
+    assert seen == set(range(base, base + policy.STATES_PER_MASK))
+
+
+def test_six_numbers_hit_for_the_bonus_and_stay_when_it_is_hopeless():
+    mask = sum(1 << n for n in (7, 8, 9, 10, 11, 12))
+    assert MASK_COUNT[mask] == 6
+    values, hits = policy.solve_mask(mask, {})
+    bucket = round(1 / policy.DENSITY_STEP)
+    low = policy.state_index(mask, 0, 0, 0, bucket) - mask * policy.STATES_PER_MASK
+    held = policy.state_index(mask, 0, 0, 1, bucket) - mask * policy.STATES_PER_MASK
+    # 57 points in hand: a repeat is likely, so stay without a Second Chance...
+    assert not hits[low]
+    assert values[low] == policy._stay(mask, 0, 0)
+    # ...and hit with one, since a repeat only costs the Second Chance
+    assert hits[held]
+    assert values[held] > values[low]
+
+
+def test_solved_values_are_the_better_of_hit_and_stay():
+    for numbers in ((0, 1, 2, 3, 4, 5), (3, 5, 7, 9, 11, 12)):
+        mask = sum(1 << n for n in numbers)
+        values, hits = policy.solve_mask(mask, {})
+        base = mask * policy.STATES_PER_MASK
+        for held, (modifier_sum, _) in enumerate(policy.HELD_MODIFIERS):
+            for x2 in range(policy.X2_LEVELS):
+                stay = policy._stay(mask, modifier_sum, x2)
+                for bucket in range(policy.BUCKETS):
+                    plain, saved = (policy.state_index(mask, held, x2, second, bucket) - base
+                                    for second in (0, 1))
+                    for i in (plain, saved):
+                        assert values[i] > stay if hits[i] else values[i] == stay
+                    # a Second Chance never makes a hand worth less
+                    assert values[saved] >= values[plain]
+
+
+def test_held_modifiers_are_not_drawn_again():
+    every = policy.modifier_state(["+2", "+4", "+6", "+8", "+10"])
+    assert policy.HELD_MODIFIERS[every] == (30, ())
+    low, high = policy.modifier_state([3, "+2", "+8"]), policy.modifier_state(["+10", 5])
+    assert policy.HELD_MODIFIERS[low][0] == policy.HELD_MODIFIERS[high][0] == 10
+    # the same total, but +10 is still to come for one and +2 and +8 for the other
+    left = {card for card, step in policy.MODIFIER_RADIX.items()
+            if step in {step for _, step in policy.HELD_MODIFIERS[low][1]}}
+    assert left == {"+4", "+6", "+10"}
+
+
+def test_a_table_that_does_not_fit_is_checked_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.policy")
+    with open(path, "wb") as f:
+        f.write(policy._HEAD.pack(policy.MAGIC, policy.VERSION - 1, policy.BUCKETS, 0))
+    opened = []
+    real = policy.Policy
+    monkeypatch.setattr(policy, "Policy", lambda p: opened.append(p) or real(p))
+    for _ in range(3):
+        with pytest.raises(ValueError, match="another version"):
+            policy.get_policy(path)
+    assert opened == [path]
+
+
+def test_several_x2_cards_are_counted(tmp_path):
+    rules = tmp_path / "x2.json"
+    rules.write_text('{"modifiers": {"+2": 1, "+4": 1, "x2": 3}}')
+    script = (
+        "import policy\n"
+        "assert policy.X2_LEVELS == 4\n"
+        "mask = sum(1 << n for n in (1, 2, 3, 4, 5, 6))\n"
+        "values, hits = policy.solve_mask(mask, {})\n"
+        "base = mask * policy.STATES_PER_MASK\n"
+        "got = [values[policy.state_index(mask, 0, x2, 0, 2) - base] for x2 in range(4)]\n"
+        "assert all(a < b for a, b in zip(got, got[1:])), got\n"
+        "assert all(v >= policy._stay(mask, 0, x2) for x2, v in enumerate(got)), got\n"
+    )
+    env = dict(os.environ, FLIP7_RULES=str(rules))
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, check=True)
+
+
+def test_tracked_bucket_matches_a_rescan():
+    from odds import unseen_cards
+    from gamestate import capture, restore
+    checked = 0
+    for seed in range(30):
+        game = Flip7Game(12, seed=seed)
+        depletion = policy.Depletion(game)
+        saved = None
+        while game.winner is None and game.round_number < 30:
+            game.start_round()
+            while game.round_active:
+                if game.pending_action is not None:
+                    game.resolve_action(game.pending_action[1], game.pending_action[1])
+                    continue
+                hand = game.cards_in_hand[game.current_player]
+                assert depletion.bucket(hand.mask) == policy.depletion_bucket(
+                    hand.mask, unseen_cards(game.deck))
+                checked += 1
+                if saved is None and game.round_number == 3:
+                    saved = capture(game)
+                if calculate_round_score(hand) >= 25:
+                    game.stay()
+                else:
+                    game.hit()
+        if saved is not None:
+            # a restored deck is recounted
+            restore(saved, game)
+            hand = game.cards_in_hand[game.current_player]
+            assert depletion.bucket(hand.mask) == policy.depletion_bucket(
+                hand.mask, unseen_cards(game.deck))
+    assert checked > 1000
@@ -0,0 +1,48 @@
+import pytest
+
+from Flip7 import DOUBLE, NUMBER, STANDARD_FINGERPRINT, Rules
+
+
+def test_standard_deck():
+    rules = Rules()
+    assert len(rules.cards) == 79 + 6 + 9
+    assert rules.counts[12] == 12 and rules.counts[0] == 1
+    assert rules.effects[7] == (NUMBER, 7)
+    assert rules.effects["x2"] == (DOUBLE, 0)
+    assert rules.additive == {"+2": 2, "+4": 4, "+6": 6, "+8": 8, "+10": 10}
+    assert sum(1 for bonus in rules.mask_bonus if bonus) == 1716  # 13 choose 7
+    assert set(rules.mask_bonus) == {0, 15}
+    assert rules.fingerprint == STANDARD_FINGERPRINT
+
+
+@pytest.mark.parametrize("config, message", [
+    ({"colour": "red"}, "unknown rules"),
+    ({"min_players": 5, "max_players": 4}, "min_players <= max_players"),
+    ({"min_players": 0}, "min_players <= max_players"),
+    ({"players_per_deck": 0}, "players_per_deck"),
+    ({"numbers": {"13": 1}}, "between 0 and 12"),
+    ({"modifiers": {"x3": 1}}, "modifiers must be"),
+    ({"actions": {"Steal": 1}}, "action cards"),
+    ({"numbers": {"5": -1, "6": 3}}, "must not be negative"),
+    ({"numbers": {"5": 1}}, "at least two number cards"),
+])
+def test_bad_configs_are_rejected(config, message):
+    with pytest.raises(ValueError, match=message):
+        Rules(config)
+
+
+def test_fingerprint_follows_the_rules_not_how_they_are_written():
+    assert Rules({"target_score": 200}).fingerprint == STANDARD_FINGERPRINT
+    # JSON files give number keys as strings
+    numbers = {str(n): max(n, 1) for n in reversed(range(13))}
+    assert Rules({"numbers": numbers}).fingerprint == STANDARD_FINGERPRINT
+    assert Rules({"target_score": 150}).fingerprint != STANDARD_FINGERPRINT
+    assert Rules({"modifiers": {"x2": 2}}).fingerprint != STANDARD_FINGERPRINT
+
+
+def test_variant_deck_is_compiled():
+    rules = Rules({"numbers": {"3": 2, "9": 4}, "modifiers": {"+5": 2}, "actions": {},
+                   "seven_unique_bonus": 20})
+    assert sorted(rules.cards, key=str) == sorted([3, 3, 9, 9, 9, 9, "+5", "+5"], key=str)
+    assert rules.additive == {"+5": 5}
+    assert set(rules.mask_bonus) == {0, 20}
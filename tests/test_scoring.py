@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from Flip7 import Hand, calculate_round_score, check_round_end, pack_hand, shoe
+
+
+def dealt_hands(count, seed=0):
+    """ every hand along `count` random deals, card by card, as the engine checks them """
+    rng = random.Random(seed)
+    cards = shoe(1)
+    for _ in range(count):
+        hand = []
+        while True:
+            hand.append(rng.choice(cards))
+            yield list(hand)
+            busted, seven_unique, _ = check_round_end(0, hand)
+            if busted or seven_unique:
+                break
+
+
+def test_hand_matches_the_list_scoring():
+    hand = Hand()
+    for cards in dealt_hands(400):
+        if len(cards) == 1:
+            hand = Hand()
+        hand.append(cards[-1])
+        assert hand.pack() == pack_hand(cards)
+        assert calculate_round_score(hand) == calculate_round_score(cards)
+        assert check_round_end(0, hand) == check_round_end(0, cards)
+        # a Second Chance takes the same cards out of both
+        assert hand == cards
+        assert hand.pack() == pack_hand(cards)
+
+
+def test_batch_scoring_matches_check_round_end():
+    np = pytest.importorskip("numpy")
+    import batch_scoring
+
+    hands = list(dealt_hands(300, seed=2))
+    mask, dup_sum, dup_count, modifier_sum, x2 = batch_scoring.pack_hands(hands)
+    second_chance = np.array([hand.count("Second Chance") for hand in hands])
+    assert list(batch_scoring.round_scores(mask, modifier_sum, x2, dup_sum)) == \
+        [calculate_round_score(hand) for hand in hands]
+
+    scores, busted, seven_unique = batch_scoring.score_hands(mask, modifier_sum, x2, dup_count,
+                                                             second_chance)
+    for i, hand in enumerate(hands):
+        assert (bool(busted[i]), bool(seven_unique[i]), int(scores[i])) == \
+            check_round_end(0, list(hand))
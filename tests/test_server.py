@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from server import Client, Flip7Server
+
+
+def request(server, client, **fields):
+    return server.dispatch(client, json.dumps(fields).encode())
+
+
+@pytest.fixture
+def table():
+    """ a server, a client holding every seat of a 4-player table, and the table's game """
+    server = Flip7Server(seed=0)
+    client = Client(None, server.outbox)
+    reply = request(server, client, op="join", players=4, seats="all")
+    assert reply["ok"]
+    return server, client, server.tables[reply["table"]].game
+
+
+@pytest.mark.parametrize("action", ["Freeze", "Flip Three"])
+@pytest.mark.parametrize("target", [99, 4, -1, "2", None])
+def test_bad_targets_are_refused_and_the_table_plays_on(table, action, target):
+    server, client, game = table
+    game.start_round()
+    game.pending_action = (action, 0)
+    reply = request(server, client, op="target", table=0, seat=0, target=target)
+    assert "error" in reply
+    assert game.pending_action == (action, 0)
+    assert game.flip_target is None
+    assert request(server, client, op="target", table=0, seat=0, target=1)["ok"]
+    assert game.pending_action is None
+
+
+def test_finished_seats_are_refused(table):
+    server, client, game = table
+    game.start_round()
+    game._finish(2)
+    game.pending_action = ("Freeze", 0)
+    assert "error" in request(server, client, op="target", table=0, seat=0, target=2)
+    assert game.pending_action == ("Freeze", 0)
+
+
+@pytest.mark.parametrize("seat", [-1, 4, "0", 1.0])
+def test_seats_outside_the_table_are_refused(table, seat):
+    server, client, game = table
+    game.start_round()
+    assert "error" in request(server, client, op="hit", table=0, seat=seat)
+    game.pending_action = ("Freeze", game.num_players - 1)
+    # -1 must not reach the last seat through negative indexing
+    assert "error" in request(server, client, op="target", table=0, seat=seat, target=0)
+    assert game.pending_action == ("Freeze", game.num_players - 1)
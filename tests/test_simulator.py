@@ -0,0 +1,42 @@
+import argparse
+
+import pytest
+
+import simulator
+
+
+def parse(*argv):
+    parser = argparse.ArgumentParser()
+    simulator.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_results_do_not_depend_on_the_worker_count():
+    # random bots draw from their own RNG, seeded per chunk
+    bots = ("random", "threshold:25", "probability")
+    results = [simulator.simulate(230, 3, workers=workers, master_seed=9, bot_specs=bots)
+               for workers in (1, 2, 3)]
+    assert results[0] == results[1] == results[2]
+    assert sum(results[0]["wins"].values()) == 230
+
+
+def test_the_seed_changes_the_games():
+    first = simulator.simulate(100, 4, workers=1, master_seed=1)
+    again = simulator.simulate(100, 4, workers=1, master_seed=1)
+    other = simulator.simulate(100, 4, workers=1, master_seed=2)
+    assert first == again
+    assert first != other
+
+
+@pytest.mark.parametrize("argv, message", [
+    (("--workers", "0"), "--workers"),
+    (("--workers", "-2"), "--workers"),
+    (("--games", "0"), "--games"),
+    (("--players", "1"), "--players"),
+    (("--seed", "-1"), "--seed"),
+    (("--bots", " , "), "--bots"),
+    (("--bots", "nobody"), "unknown bot"),
+])
+def test_bad_arguments_are_refused(argv, message):
+    with pytest.raises(SystemExit, match=message):
+        simulator.run(parse(*argv))
@@ -0,0 +1,73 @@
+import random
+
+import checkpoint
+import statsdb
+from Flip7 import Flip7Game
+
+
+def play(game, rng, moves=None):
+    """ random hits and stays until the game is won, or for `moves` moves """
+    while game.winner is None and moves != 0:
+        if moves is not None:
+            moves -= 1
+        if not game.round_active:
+            game.start_round()
+        elif game.pending_action is not None:
+            source = game.pending_action[1]
+            game.resolve_action(source, rng.choice(
+                [p for p in range(game.num_players) if p not in game.finished_players]))
+        elif rng.random() < 0.3:
+            game.stay(game.current_player)
+        else:
+            game.hit(game.current_player)
+
+
+def store_rows(store):
+    db = store.db
+    return (db.execute("SELECT id, players, winner, rounds, uid FROM games").fetchall(),
+            db.execute("SELECT * FROM hands ORDER BY round, seat").fetchall(),
+            db.execute("SELECT * FROM players_summary").fetchall(),
+            db.execute("SELECT * FROM seat_summary").fetchall(),
+            db.execute("SELECT * FROM size_summary").fetchall(),
+            db.execute("SELECT seq FROM events").fetchall())
+
+
+def test_resumed_game_is_stored_as_one_game(tmp_path):
+    whole = statsdb.StatsStore(str(tmp_path / "whole.db"))
+    game = Flip7Game(4, seed=5)
+    game.uid = 99
+    collector = statsdb.StatsCollector(keep_events=True)
+    collector.watch(game)
+    play(game, random.Random(5))
+    whole.ingest(collector)
+
+    split = statsdb.StatsStore(str(tmp_path / "split.db"))
+    game = Flip7Game(4, seed=5)
+    game.uid = 99
+    rng = random.Random(5)
+    collector = statsdb.StatsCollector(keep_events=True)
+    collector.watch(game)
+    play(game, rng, moves=60)
+    assert game.round_active and game.round_number > 2
+    first = split.ingest(collector)
+    # closed mid-round, resumed from the save and played to the end
+    game, _ = checkpoint.decode_game(checkpoint.encode_game(game))
+    assert game.uid == 99
+    collector = statsdb.StatsCollector(keep_events=True)
+    collector.watch(game)
+    play(game, rng)
+    assert split.ingest(collector) == first
+
+    assert split.game_count() == 1
+    assert store_rows(split) == store_rows(whole)
+
+
+def test_games_without_uid_get_rows_of_their_own(tmp_path):
+    store = statsdb.StatsStore(str(tmp_path / "stats.db"))
+    collector = statsdb.StatsCollector()
+    for seed in range(3):
+        game = Flip7Game(3, seed=seed)
+        collector.watch(game, seed)
+        play(game, random.Random(seed))
+    assert store.ingest(collector) == [1, 2, 3]
+    assert store.ingest(collector) == [4, 5, 6]
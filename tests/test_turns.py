@@ -0,0 +1,77 @@
+import random
+
+from Flip7 import Flip7Game, TurnRing
+
+
+def naive_after(p, n, finished):
+    """ the old search: the first unfinished seat after p, wrapping round """
+    for step in range(1, n + 1):
+        seat = (p + step) % n
+        if seat not in finished:
+            return seat
+    return None
+
+
+def test_after_walks_the_table_in_order():
+    ring = TurnRing(5)
+    assert [ring.after(p) for p in range(5)] == [1, 2, 3, 4, 0]
+
+
+def test_finished_seats_are_skipped():
+    finished = set()
+    ring = TurnRing(6, finished)
+    for p in (1, 2, 5):
+        finished.add(p)
+        ring.finish(p)
+    assert ring.after(0) == 3
+    assert ring.after(4) == 0
+    # a seat that has just finished still leads on to whoever plays next
+    assert ring.after(1) == 3
+    assert ring.after(5) == 0
+
+
+def test_last_seat_and_empty_ring():
+    ring = TurnRing(3)
+    ring.finish(0)
+    ring.finish(2)
+    assert ring.after(1) == 1
+    assert ring.after(0) == 1
+    ring.finish(1)
+    assert ring.after(1) is None
+
+
+def test_ring_matches_a_search_in_any_finishing_order():
+    rng = random.Random(0)
+    for _ in range(200):
+        n = rng.randint(1, 30)
+        finished = set()
+        ring = TurnRing(n, finished)
+        for p in rng.sample(range(n), n):
+            finished.add(p)
+            ring.finish(p)
+            for q in range(n):
+                assert ring.after(q) == naive_after(q, n, finished)
+
+
+def test_resync_picks_up_a_replaced_set():
+    game = Flip7Game(5, seed=0)
+    game.start_round()
+    game.finished_players = {1, 2}
+    game.resync()
+    assert game.turns.after(0) == 3
+    game.finished_players = {0, 1, 2, 3, 4}
+    game.resync()
+    assert game.turns.after(0) is None
+
+
+def test_a_frozen_seat_loses_its_turn_but_keeps_its_place():
+    game = Flip7Game(3, seed=0)
+    game.start_round()
+    game.skip_turn.add(1)
+    game.stay(0)
+    assert game.current_player == 1
+    events = game.hit(1)
+    assert [e.kind for e in events] == ["frozen", "turn"]
+    assert game.current_player == 2
+    assert game.skip_turn == set()
+    assert 1 not in game.finished_players